@@ -62,6 +62,66 @@ class LLM_query:
                         },
                     )
                 ),
+                glm.FunctionDeclaration(
+                    name='search_nearest_stops',
+                    description="Returns the stops closest to a coordinate, closest first.",
+                    parameters=glm.Schema(
+                        type=glm.Type.OBJECT,
+                        properties={
+                            'lng':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The longitude of the point, e.g. 106.6983.'),
+                            'lat':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The latitude of the point, e.g. 10.7721.'),
+                            'k':glm.Schema(
+                                type=glm.Type.INTEGER,
+                                description='The number of stops to return, 1 if not given.')
+                        },
+                        required=['lng', 'lat']
+                    )
+                ),
+                glm.FunctionDeclaration(
+                    name='search_stops_within',
+                    description="Returns the stops within a distance of a coordinate, closest first.",
+                    parameters=glm.Schema(
+                        type=glm.Type.OBJECT,
+                        properties={
+                            'lng':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The longitude of the point, e.g. 106.6983.'),
+                            'lat':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The latitude of the point, e.g. 10.7721.'),
+                            'radius':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The distance from the point, must be converted to meters when parsing.')
+                        },
+                        required=['lng', 'lat', 'radius']
+                    )
+                ),
+                glm.FunctionDeclaration(
+                    name='search_stops_in_bbox',
+                    description="Returns the stops inside a longitude/latitude bounding box.",
+                    parameters=glm.Schema(
+                        type=glm.Type.OBJECT,
+                        properties={
+                            'min_lng':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The west edge of the box.'),
+                            'min_lat':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The south edge of the box.'),
+                            'max_lng':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The east edge of the box.'),
+                            'max_lat':glm.Schema(
+                                type=glm.Type.NUMBER,
+                                description='The north edge of the box.')
+                        },
+                        required=['min_lng', 'min_lat', 'max_lng', 'max_lat']
+                    )
+                ),
                 glm.FunctionDeclaration(
                     name='search_routes_by',
                     description="Returns a list of routes satisfying some given criteria.",
@@ -160,7 +220,7 @@ class LLM_query:
 
             print()
             print("Result:")
-            if fc.name == 'search_stops_by':
+            if fc.name in ('search_stops_by', 'search_nearest_stops', 'search_stops_within', 'search_stops_in_bbox'):
                 query_list = getattr(self.stop_query, fc.name)(**fc.args)
                 for stop in query_list:
                     print('+', stop)
@@ -0,0 +1,263 @@
+import math
+from heapq import heappop, heappush
+
+import numpy as np
+
+from csr import CSRGraph
+from graph import shortest_path_tree
+
+
+class Landmarks:
+    """
+    Landmark (ALT) lower bounds on travel time for A*.
+
+    For a landmark L the triangle inequality gives d(v, t) >= d(L, t) - d(L, v) and
+    d(v, t) >= d(v, L) - d(t, L). The largest of these bounds over all landmarks is an
+    admissible and consistent heuristic in the same unit as the 'Time' weights.
+
+    Attributes:
+        ids (list): Dense id -> StopId of the graph the landmarks were computed on.
+        landmarks (numpy.ndarray): Dense ids of the landmarks.
+        from_landmark (numpy.ndarray): k x n times d(L, v).
+        to_landmark (numpy.ndarray): k x n times d(v, L).
+        checksum (str): CSRGraph.checksum of that graph, a_star refuses any other graph.
+    """
+
+    def __init__(self, ids, landmarks, from_landmark, to_landmark, checksum):
+        self.ids = list(ids)
+        self.checksum = checksum
+        self.landmarks = np.asarray(landmarks, dtype=np.int32)
+        self.from_landmark = np.asarray(from_landmark, dtype=np.float64)
+        self.to_landmark = np.asarray(to_landmark, dtype=np.float64)
+        self._node_lists = None
+
+    @classmethod
+    def build(cls, G, k=16, method='farthest'):
+        """
+        Selects landmarks and precomputes travel times to and from each of them.
+
+        Args:
+            G (CSRGraph): The bus network.
+            k (int): Number of landmarks.
+            method (str): 'farthest' repeatedly picks the node farthest in travel time from the
+                landmarks chosen so far, moving on to a strongly connected component without
+                a landmark once every node of the reached ones is taken, 'planar' splits the
+                map into k sectors around the center and picks the stop farthest from the
+                center in each.
+
+        Returns:
+            Landmarks: The precomputed landmarks.
+        """
+
+        reverse = G.reverse()
+        k = min(k, len(G))
+
+        from_landmark = []
+        to_landmark = []
+
+        def add(landmark):
+            from_landmark.append(shortest_path_tree(G, landmark)[0])
+            to_landmark.append(shortest_path_tree(reverse, landmark)[0])
+
+        if method == 'farthest':
+            landmarks = []
+            # Round trip from every node to its closest landmark, inf outside the strongly
+            # connected components holding one
+            closest = np.full(len(G), math.inf)
+            while len(landmarks) < k:
+                reachable = np.where(np.isfinite(closest), closest, -1)
+                reachable[landmarks] = -1
+                landmark = int(np.argmax(reachable))
+                if reachable[landmark] < 0:
+                    # Every node of those components is a landmark already (or there is none
+                    # yet), start over in an unreached component from the node farthest from
+                    # an arbitrary one of it
+                    unreached = np.flatnonzero(np.isinf(closest))
+                    if not len(unreached):
+                        break
+                    start = int(unreached[0])
+                    round_trip = (np.array(shortest_path_tree(G, start)[0])
+                                  + np.array(shortest_path_tree(reverse, start)[0]))
+                    landmark = int(np.argmax(np.where(np.isfinite(round_trip), round_trip, -1)))
+                landmarks.append(landmark)
+                add(landmark)
+                closest = np.minimum(closest, np.array(from_landmark[-1]) + np.array(to_landmark[-1]))
+        elif method == 'planar':
+            dx = G.x - np.nanmean(G.x)
+            dy = G.y - np.nanmean(G.y)
+            sector = ((np.arctan2(dy, dx) + math.pi) / (2*math.pi) * k).astype(np.int64) % k
+            radius = np.hypot(dx, dy)
+            landmarks = []
+            for i in range(k):
+                members = np.flatnonzero(sector == i)
+                if len(members):
+                    landmarks.append(int(members[np.argmax(radius[members])]))
+            for landmark in landmarks:
+                add(landmark)
+        else:
+            raise ValueError(f"Unknown landmark selection method: {method}")
+
+        return cls(G.ids, landmarks, from_landmark, to_landmark, G.checksum())
+
+    def save(self, file_path):
+        """
+        Writes the landmarks to a .npz file.
+
+        Args:
+            file_path (str): The path to the output file.
+        """
+
+        with open(file_path, 'wb') as file:
+            np.savez(file, ids=np.array(self.ids, dtype=np.int64), landmarks=self.landmarks,
+                     from_landmark=self.from_landmark, to_landmark=self.to_landmark,
+                     checksum=np.array(self.checksum))
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Reads landmarks written by save.
+
+        Args:
+            file_path (str): The path to the .npz file.
+
+        Returns:
+            Landmarks: The landmarks.
+        """
+
+        with np.load(file_path) as data:
+            return cls(data['ids'].tolist(), data['landmarks'], data['from_landmark'], data['to_landmark'],
+                       str(data['checksum']))
+
+    def heuristic(self, target):
+        """
+        Returns the lower bound on the travel time from a node to a target.
+
+        Bounds are computed only for the nodes a search asks about and remembered, so a
+        point-to-point query costs O(k) per touched node rather than O(k * n) up front.
+
+        Args:
+            target (int): Dense id of the destination.
+
+        Returns:
+            callable: h(v) for a dense id v, inf where the target cannot be reached.
+        """
+
+        if self._node_lists is None:
+            # Per-node rows as Python lists, indexing them is cheaper than numpy scalar access
+            self._node_lists = (self.from_landmark.T.tolist(), self.to_landmark.T.tolist())
+        from_node, to_node = self._node_lists
+        from_target, to_target = from_node[target], to_node[target]
+        bounds = {}
+
+        def h(v):
+            bound = bounds.get(v)
+            if bound is None:
+                bound = 0
+                for lt, lv, vl, tl in zip(from_target, from_node[v], to_node[v], to_target):
+                    # inf - inf is nan when neither the node nor the target is connected to
+                    # that landmark, nan > bound is False so it gives no bound
+                    if lt - lv > bound:
+                        bound = lt - lv
+                    if vl - tl > bound:
+                        bound = vl - tl
+                bounds[v] = bound
+            return bound
+
+        return h
+
+    def a_star(self, G, start_stop, end_stop, stats=None, queue=None):
+        """
+        A* search guided by the landmark bounds, always returning the fastest path.
+
+        Args:
+            G (CSRGraph): The graph the landmarks were computed on.
+            start_stop: StopId of the origin.
+            end_stop: StopId of the destination.
+            stats (dict): If given, 'settled' is set to the number of nodes the search settled.
+            queue: Priority queue following the protocol in priority_queue.py, None runs on an
+                inline heapq.
+
+        Returns:
+            tuple: (predecessors, time) like a_star, predecessors maps every StopId to
+            (StopId, (route_id, var_id)) or None.
+        """
+
+        if not isinstance(G, CSRGraph):
+            G = CSRGraph.from_graph(G)
+        # Same stops but changed weights would make the bounds inadmissible, compare the
+        # whole graph rather than the ids
+        if G.checksum() != self.checksum:
+            raise ValueError("Landmarks were computed on a different graph")
+
+        offsets, targets, weights = G.adjacency()
+        source = G.index[start_stop]
+        target = G.index[end_stop]
+        h = self.heuristic(target)
+
+        distances = [math.inf] * len(G)
+        distances[source] = 0
+        pred_node = [-1] * len(G)
+        pred_edge = [-1] * len(G)
+
+        settled = 0
+        if queue is None:
+            priority_queue = [(h(source), source)]
+            while priority_queue:
+                estimate, current_node = heappop(priority_queue)
+                if current_node == target:
+                    settled += 1
+                    break
+
+                current_distance = distances[current_node]
+                if estimate > current_distance + h(current_node):
+                    continue
+                settled += 1
+
+                for edge in range(offsets[current_node], offsets[current_node+1]):
+                    neighbor = targets[edge]
+                    distance = current_distance + weights[edge]
+                    # A node is pushed again whenever its distance improves, so the search stays
+                    # exact even if rounding makes the bound slightly inconsistent
+                    if distance < distances[neighbor]:
+                        bound = h(neighbor)
+                        if bound == math.inf:
+                            continue
+                        distances[neighbor] = distance
+                        pred_node[neighbor] = current_node
+                        pred_edge[neighbor] = edge
+                        heappush(priority_queue, (distance + bound, neighbor))
+        else:
+            # The queue holds one entry per node, an improved node is decreased in place or
+            # put back if it was popped already
+            queue.clear()
+            queue.push(h(source), source)
+            while queue:
+                _, current_node = queue.pop()
+                settled += 1
+                if current_node == target:
+                    break
+
+                current_distance = distances[current_node]
+                for edge in range(offsets[current_node], offsets[current_node+1]):
+                    neighbor = targets[edge]
+                    distance = current_distance + weights[edge]
+                    if distance < distances[neighbor]:
+                        bound = h(neighbor)
+                        if bound == math.inf:
+                            continue
+                        distances[neighbor] = distance
+                        pred_node[neighbor] = current_node
+                        pred_edge[neighbor] = edge
+                        if neighbor in queue:
+                            queue.decrease_key(neighbor, distance + bound)
+                        else:
+                            queue.push(distance + bound, neighbor)
+
+        if stats is not None:
+            stats['settled'] = settled
+        predecessors = dict.fromkeys(G.ids)
+        ids, keys = G.ids, G.keys
+        for node, edge in enumerate(pred_edge):
+            if edge >= 0:
+                predecessors[ids[node]] = (ids[pred_node[node]], keys[edge])
+        return predecessors, distances[target]
@@ -0,0 +1,156 @@
+import math
+from heapq import heappop, heappush
+from itertools import count
+
+from csr import CSRGraph
+from graph import shortest_path_tree
+
+
+def k_shortest_paths(G, start_stop, end_stop, k=3):
+    """
+    Finds the k fastest loopless paths between two stops with Yen's algorithm, for offering
+    alternatives to the fastest route.
+
+    Every spur search of Yen's algorithm runs on the graph with a few nodes and edges
+    removed, which can only make distances to the destination longer. So one reverse
+    shortest-path tree towards end_stop, computed up front, serves every spur search: its
+    distances are an exact A* heuristic, and a spur search stops as soon as it pops a node
+    whose tree path to end_stop avoids everything removed, taking that tree path as the rest
+    of the route. A spur path whose tree path is not blocked needs no search at all.
+
+    Args:
+        G (CSRGraph or networkx.MultiDiGraph): The bus network, parallel edges are collapsed
+            to the fastest one as in CSRGraph.
+        start_stop: StopId of the origin.
+        end_stop: StopId of the destination.
+        k (int): Number of paths to return.
+
+    Returns:
+        list: [(edge path, time), ...] fastest first, fewer than k if there are no more
+        loopless paths. Each edge path is a distinct list of (StopId, (route_id, var_id)) in
+        the format of dijkstra_shortest_path_edge, so export_path can draw it with
+        search=lambda *_: paths[i].
+    """
+
+    if not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    source, target = G.index[start_stop], G.index[end_stop]
+    reverse = G.reverse()
+    to_target, next_node, next_edge = shortest_path_tree(reverse, target)
+    if k <= 0 or math.isinf(to_target[source]):
+        return []
+    if source == target:
+        return [([], 0)]
+
+    search = _SpurSearch(G, reverse, target, to_target, next_node, next_edge)
+    accepted = [search.tree_hops(source)]
+    seen = {_nodes(accepted[0], target)}
+    candidates = []
+    order = count()
+
+    while len(accepted) < k:
+        last = accepted[-1]
+        nodes = _nodes(last, target)
+        for i in range(len(last)):
+            # Every accepted path that shares this root leaves the spur node by an edge the
+            # new path must not take again
+            blocked_edges = {path[i][1] for path in accepted
+                             if len(path) > i and _nodes(path, target)[:i+1] == nodes[:i+1]}
+            spur = search.run(nodes[i], set(nodes[:i]), blocked_edges)
+            if spur is None:
+                continue
+            path = last[:i] + spur
+            path_nodes = _nodes(path, target)
+            if path_nodes not in seen:
+                seen.add(path_nodes)
+                heappush(candidates, (_time(path), next(order), path))
+        if not candidates:
+            break
+        accepted.append(heappop(candidates)[2])
+
+    ids = G.ids
+    return [([(ids[u], key) for u, _, _, key in path], _time(path)) for path in accepted]
+
+
+class _SpurSearch:
+    # A* towards the destination on the graph minus some nodes and spur edges, finishing
+    # along the shared reverse tree as soon as it is usable. Hops are (u, v, weight, key).
+
+    def __init__(self, G, reverse, target, to_target, next_node, next_edge):
+        self.adjacency = G.adjacency()
+        self.keys = G.keys
+        self.reverse_keys = reverse.keys
+        self.reverse_weights = reverse.adjacency()[2]
+        self.target = target
+        self.to_target = to_target
+        self.next_node = next_node
+        self.next_edge = next_edge
+
+    def tree_hops(self, node):
+        hops = []
+        while node != self.target:
+            edge = self.next_edge[node]
+            hops.append((node, self.next_node[node], self.reverse_weights[edge], self.reverse_keys[edge]))
+            node = self.next_node[node]
+        return hops
+
+    def _tree_usable(self, node, spur, blocked_nodes, blocked_edges):
+        if node == spur and self.next_node[node] in blocked_edges:
+            return False
+        while node != self.target:
+            node = self.next_node[node]
+            if node in blocked_nodes or node == spur:
+                return False
+        return True
+
+    def run(self, spur, blocked_nodes, blocked_edges):
+        offsets, targets, weights = self.adjacency
+        to_target = self.to_target
+        costs = {spur: 0}
+        predecessors = {spur: None}
+        closed = set()
+        heap = [(to_target[spur], spur)]
+        while heap:
+            _, node = heappop(heap)
+            if node in closed:
+                continue
+            closed.add(node)
+
+            if self._tree_usable(node, spur, blocked_nodes, blocked_edges):
+                hops = []
+                current = node
+                while predecessors[current] is not None:
+                    previous, edge = predecessors[current]
+                    hops.append((previous, current, weights[edge], self.keys[edge]))
+                    current = previous
+                hops.reverse()
+                hops += self.tree_hops(node)
+                # With zero-weight edges the tree may lead back into the searched prefix,
+                # such a path has a loop and the search goes on
+                if len({u for u, _, _, _ in hops}) == len(hops):
+                    return hops
+
+            for edge in range(offsets[node], offsets[node+1]):
+                neighbor = targets[edge]
+                if neighbor in blocked_nodes or (node == spur and neighbor in blocked_edges):
+                    continue
+                if math.isinf(to_target[neighbor]) or neighbor in closed:
+                    continue
+                cost = costs[node] + weights[edge]
+                if cost < costs.get(neighbor, math.inf):
+                    costs[neighbor] = cost
+                    predecessors[neighbor] = (node, edge)
+                    heappush(heap, (cost + to_target[neighbor], neighbor))
+        return None
+
+
+def _nodes(path, target):
+    return tuple(u for u, _, _, _ in path) + (target,)
+
+
+def _time(path):
+    # Summed from the origin, the order Dijkstra accumulates in
+    total = 0
+    for _, _, weight, _ in path:
+        total += weight
+    return total
@@ -0,0 +1,161 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from csr import CSRGraph
+from graph import shortest_path_tree
+
+
+class AllPairs:
+    """
+    All-pairs travel times and predecessors as two dense N x N matrices in shared memory.
+
+    Row s holds the single-source result of dense node s. predecessors[s, v] is the dense id
+    of the node before v on the fastest s -> v path, -1 if v is s or cannot be reached. The
+    edge key of a hop is the best CSR edge between the two nodes.
+
+    Attributes:
+        graph (CSRGraph): The graph the matrices were computed on.
+        distances (numpy.ndarray): float32 N x N travel times, inf where unreachable.
+        predecessors (numpy.ndarray): int32 N x N predecessor dense ids.
+    """
+
+    def __init__(self, graph, create=True, names=None):
+        n = len(graph)
+        self.graph = graph
+        if create:
+            self._distance_shm = shared_memory.SharedMemory(create=True, size=max(1, n*n*4))
+            self._predecessor_shm = shared_memory.SharedMemory(create=True, size=max(1, n*n*4))
+        else:
+            self._distance_shm = shared_memory.SharedMemory(name=names[0])
+            self._predecessor_shm = shared_memory.SharedMemory(name=names[1])
+        self._owner = create
+        self.distances = np.ndarray((n, n), dtype=np.float32, buffer=self._distance_shm.buf)
+        self.predecessors = np.ndarray((n, n), dtype=np.int32, buffer=self._predecessor_shm.buf)
+
+    @property
+    def names(self):
+        return self._distance_shm.name, self._predecessor_shm.name
+
+    def reopen_spec(self):
+        # How a worker process attaches to these matrices
+        return AllPairs, (self.graph, False, self.names)
+
+    def write_row(self, source, distances, predecessors):
+        self.distances[source] = distances
+        self.predecessors[source] = predecessors
+
+    def pending(self):
+        return list(range(len(self.graph)))
+
+    def distance(self, start_stop, end_stop):
+        index = self.graph.index
+        return float(self.distances[index[start_stop], index[end_stop]])
+
+    def path(self, start_stop, end_stop):
+        """
+        Rebuilds the fastest path from the predecessor matrix.
+
+        Args:
+            start_stop: StopId of the origin.
+            end_stop: StopId of the destination.
+
+        Returns:
+            list: [(StopId, (route_id, var_id)), ...] from the origin, like
+            dijkstra_shortest_path_edge, empty if there is no path.
+        """
+
+        G = self.graph
+        offsets, targets, _ = G.adjacency()
+        row = self.predecessors[G.index[start_stop]]
+        path = []
+        node = G.index[end_stop]
+        while row[node] >= 0:
+            u = int(row[node])
+            edge = next(e for e in range(offsets[u], offsets[u+1]) if targets[e] == node)
+            path.append((G.ids[u], G.keys[edge]))
+            node = u
+        path.reverse()
+        return path
+
+    def close(self):
+        """
+        Releases the shared memory, unlinking it if this object created it.
+        """
+
+        # Views must go before the buffers they point into can be closed
+        self.distances = self.predecessors = None
+        self._distance_shm.close()
+        self._predecessor_shm.close()
+        if self._owner:
+            self._distance_shm.unlink()
+            self._predecessor_shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def all_pair_shortest_paths_parallel(G, workers=None, progress=None, chunk_size=32, store=None):
+    """
+    Runs one Dijkstra per source across a process pool, every worker writing its rows
+    straight into the shared result matrices, so there is no merge step at the end.
+
+    With a DistanceStore as store the rows go to its memory-mapped file instead, and only
+    the sources it has not completed yet are run, so an interrupted run can be resumed.
+
+    Args:
+        G (CSRGraph or networkx.MultiDiGraph): The bus network.
+        workers (int or None): Number of worker processes, None for one per core.
+        progress (callable): Called as progress(rows_done, rows_total) as chunks finish.
+        chunk_size (int): Number of sources per task.
+        store (DistanceStore): Store to fill, with ids in the dense order of G.
+
+    Returns:
+        AllPairs or DistanceStore: The filled matrices.
+    """
+
+    if not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    if store is not None and store.ids != G.ids:
+        raise ValueError("The store was created for a different set of stops")
+    result = store if store is not None else AllPairs(G)
+    sources = result.pending()
+    chunks = [sources[lo:lo+chunk_size] for lo in range(0, len(sources), chunk_size)]
+
+    workers = workers or os.cpu_count() or 1
+    done = len(G) - len(sources)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(G, result.reopen_spec())) as executor:
+        futures = [executor.submit(_fill_rows, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            done += future.result()
+            if progress is not None:
+                progress(done, len(G))
+
+    if store is not None:
+        store.flush()
+    return result
+
+
+# Per-process state of the all-pairs worker pool
+_worker = {}
+
+
+def _init_worker(G, spec):
+    opener, args = spec
+    _worker['graph'] = G
+    _worker['result'] = opener(*args)
+
+
+def _fill_rows(sources):
+    G = _worker['graph']
+    result = _worker['result']
+    for source in sources:
+        distances, pred_node, _ = shortest_path_tree(G, source)
+        result.write_row(source, distances, pred_node)
+    return len(sources)
@@ -0,0 +1,224 @@
+import json
+import math
+import os
+import platform
+import random
+import time
+
+import numpy as np
+
+from csr import CSRGraph
+from graph import (bidirectional_dijkstra, dijkstra_shortest_path_edge, dijkstra_shortest_path_fibo,
+                   floyd_warshall_blocked, stress_centrality)
+from priority_queue import LazyHeap
+
+
+# Single-pair algorithms: name -> query returning (path or predecessors, time). The plain
+# graph.a_star is left out, its heuristic is inadmissible and can fail to finish.
+PAIR_ALGORITHMS = {
+    'dijkstra': lambda G, s, t, **_: dijkstra_shortest_path_edge(G, s, t),
+    'bidirectional': lambda G, s, t, **_: bidirectional_dijkstra(G, s, t),
+    'a_star_landmarks': lambda G, s, t, landmarks, **_: landmarks.a_star(G, s, t),
+    'ch': lambda G, s, t, hierarchy, **_: hierarchy.query(s, t),
+    'raptor': lambda G, s, t, raptor, **_: raptor.shortest_path_edge(s, t),
+    'transfer_penalty': lambda G, s, t, state_graph, **_: state_graph.shortest_path_edge(s, t),
+}
+
+# Single-pair algorithms that can count the nodes they settle: name -> query on the CSRGraph
+# returning the count. They run again, untimed, so counting does not slow the timed query.
+SETTLED_COUNTS = {
+    'dijkstra': lambda G, s, t, **_: _dijkstra_settled(G, s, t),
+    'a_star_landmarks': lambda G, s, t, landmarks, **_: _a_star_landmarks_settled(G, s, t, landmarks),
+}
+
+# Single-source algorithms, run once per distinct origin of the workload
+SOURCE_ALGORITHMS = {
+    'dijkstra_fibo': lambda G, s: dijkstra_shortest_path_fibo(G, s),
+}
+
+# Whole-graph algorithms, run repeat times
+GRAPH_ALGORITHMS = {
+    'floyd_warshall': lambda G: floyd_warshall_blocked(G),
+    'stress_centrality': lambda G: stress_centrality(G),
+}
+
+
+def od_pairs(G, n=1000, workload='random', seed=0, skew=2.0):
+    """
+    Draws origin-destination pairs of distinct stops.
+
+    Args:
+        G (CSRGraph): The bus network.
+        n (int): Number of pairs.
+        workload (str): 'random' draws every stop with the same probability. 'realistic'
+            draws stops in proportion to (in-degree + out-degree) ** skew, so trips start
+            and end mostly at the terminals and interchanges many routes pass through.
+        seed (int): Seed of the draw.
+        skew (float): Exponent of the 'realistic' weights.
+
+    Returns:
+        list: [(start StopId, end StopId), ...].
+    """
+
+    rng = random.Random(seed)
+    if workload == 'random':
+        weights = None
+    elif workload == 'realistic':
+        degree = np.diff(G.offsets) + np.bincount(G.targets, minlength=len(G))
+        weights = (degree.astype(np.float64) ** skew).tolist()
+    else:
+        raise ValueError(f"Unknown workload: {workload}")
+
+    pairs = []
+    while len(pairs) < n:
+        start, end = rng.choices(G.ids, weights=weights, k=2)
+        if start != end:
+            pairs.append((start, end))
+    return pairs
+
+
+def run_benchmark(G, algorithms=('dijkstra', 'bidirectional'), pairs=1000, workload='random', seed=0, repeat=1,
+                  landmarks=None, hierarchy=None, raptor=None, state_graph=None, file_path=None):
+    """
+    Times routing algorithms on a seeded workload and checks their travel times against Dijkstra.
+
+    Args:
+        G (CSRGraph or networkx.MultiDiGraph): The bus network.
+        algorithms (iterable): Names from PAIR_ALGORITHMS, SOURCE_ALGORITHMS and GRAPH_ALGORITHMS.
+        pairs (int or list): Number of OD pairs to draw, or the pairs themselves.
+        workload (str): Workload passed to od_pairs.
+        seed (int): Seed passed to od_pairs.
+        repeat (int): Runs of every whole-graph algorithm.
+        landmarks (Landmarks): Needed by 'a_star_landmarks'.
+        hierarchy (ContractionHierarchy): Needed by 'ch'.
+        raptor (RaptorRouter): Needed by 'raptor'.
+        state_graph (StateGraph): Needed by 'transfer_penalty', whose times are only expected
+            to match Dijkstra's with zero penalties.
+        file_path (str): Where to write the report as JSON, None to only return it.
+
+    Returns:
+        dict: The report. 'algorithms' maps every name to its 'latency' percentiles in
+        seconds, the 'settled' node percentiles for those in SETTLED_COUNTS and, for
+        single-pair algorithms, a 'validation' of its times against Dijkstra.
+    """
+
+    csr = G if isinstance(G, CSRGraph) else CSRGraph.from_graph(G)
+    if isinstance(pairs, int):
+        pairs = od_pairs(csr, pairs, workload, seed)
+    context = {'landmarks': landmarks, 'hierarchy': hierarchy, 'raptor': raptor, 'state_graph': state_graph}
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'nodes': csr.number_of_nodes(),
+            'edges': csr.number_of_edges(),
+            'workload': workload,
+            'seed': seed,
+            'pairs': len(pairs),
+        },
+        'algorithms': {},
+    }
+
+    reference = None
+    for name in algorithms:
+        if name in PAIR_ALGORITHMS:
+            query = PAIR_ALGORITHMS[name]
+            latencies, times = [], []
+            for start, end in pairs:
+                begin = time.perf_counter()
+                _, result_time = query(G, start, end, **context)
+                latencies.append(time.perf_counter() - begin)
+                times.append(result_time)
+            entry = {'latency': _summary(latencies)}
+            if name in SETTLED_COUNTS:
+                count = SETTLED_COUNTS[name]
+                entry['settled'] = _summary([count(csr, start, end, **context) for start, end in pairs])
+
+            if reference is None:
+                reference = [dijkstra_shortest_path_edge(csr, start, end)[1] for start, end in pairs]
+            entry['validation'] = _validation(times, reference)
+        elif name in SOURCE_ALGORITHMS:
+            run = SOURCE_ALGORITHMS[name]
+            latencies = []
+            for start in dict.fromkeys(start for start, _ in pairs):
+                begin = time.perf_counter()
+                run(G, start)
+                latencies.append(time.perf_counter() - begin)
+            entry = {'latency': _summary(latencies)}
+        elif name in GRAPH_ALGORITHMS:
+            run = GRAPH_ALGORITHMS[name]
+            latencies = []
+            for _ in range(repeat):
+                begin = time.perf_counter()
+                run(G)
+                latencies.append(time.perf_counter() - begin)
+            entry = {'latency': _summary(latencies)}
+        else:
+            raise ValueError(f"Unknown algorithm: {name}")
+        report['algorithms'][name] = entry
+
+    if file_path is not None:
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+def _summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+    return {'count': len(values), 'mean': float(values.mean()), 'min': float(values.min()),
+            'p50': p50, 'p95': p95, 'p99': p99, 'max': float(values.max()), 'total': float(values.sum())}
+
+
+def _validation(times, reference, tolerance=1e-9):
+    # A time counts as correct if it is within a relative tolerance of Dijkstra's, which
+    # allows for the same path being summed in another order
+    errors = []
+    correct = 0
+    for value, expected in zip(times, reference):
+        if math.isinf(expected) or math.isinf(value):
+            error = 0.0 if value == expected else math.inf
+        else:
+            error = abs(value - expected) / max(expected, 1e-12)
+        correct += error <= tolerance
+        errors.append(error)
+    finite = [error for error in errors if not math.isinf(error)]
+    return {'correct_ratio': correct / len(times) if times else 1.0,
+            'mean_error': float(np.mean(finite)) if finite else 0.0,
+            'max_error': max(errors, default=0.0)}
+
+
+def _dijkstra_settled(G, start_stop, end_stop):
+    # The same search as the timed one, on a queue that counts its pops
+    queue = _CountingQueue()
+    dijkstra_shortest_path_edge(G, start_stop, end_stop, queue=queue)
+    return queue.pops
+
+
+def _a_star_landmarks_settled(G, start_stop, end_stop, landmarks):
+    stats = {}
+    landmarks.a_star(G, start_stop, end_stop, stats=stats)
+    return stats['settled']
+
+
+class _CountingQueue(LazyHeap):
+    # Counts pops, one per settled node since LazyHeap skips stale entries
+    def __init__(self):
+        super().__init__()
+        self.pops = 0
+
+    def clear(self):
+        super().clear()
+        self.pops = 0
+
+    def pop(self):
+        self.pops += 1
+        return super().pop()
@@ -0,0 +1,160 @@
+import numpy as np
+
+from csr import CSRGraph
+from graph import _accumulate_csr, _stress_dijkstra_csr
+
+
+class IncrementalStress:
+    """
+    Stress centrality that is kept up to date as route variants are added, retimed or withdrawn.
+
+    The shortest-path DAG of every source is kept in compact form along with its distances.
+    A source whose DAG cannot change under an edge update is left alone: a removed or
+    slower edge only matters to a source if it was on one of its shortest paths, and a new or
+    faster edge u -> v only matters if d(s, u) + weight <= d(s, v). Every other source is run
+    again and its old contribution swapped for the new one, which gives the same stress as
+    running stress_centrality on the updated graph.
+
+    Attributes:
+        graph (CSRGraph): The graph the current state was computed on.
+        endpoint (bool): Whether paths are counted at their endpoints.
+        distances (numpy.ndarray): float64 n x n travel times, row s from dense source s.
+        dags (list): Per source (order, pred_offsets, preds, sigma), the settled nodes in
+            settle order, the predecessors of order[i] in preds[pred_offsets[i]:pred_offsets[i+1]]
+            and the number of shortest paths to order[i].
+    """
+
+    def __init__(self, G, endpoint=False):
+        if not isinstance(G, CSRGraph):
+            G = CSRGraph.from_graph(G)
+        n = len(G)
+        self.graph = G
+        self.endpoint = endpoint
+        self.distances = np.full((n, n), np.inf)
+        self.dags = [None] * n
+        # Integer sums, so adding and removing contributions is exact
+        self._stress = [0] * n
+        for s in range(n):
+            self._run(s)
+
+    def stress(self):
+        """
+        Returns the current stress centrality.
+
+        Returns:
+            dict: Stress per StopId, as returned by stress_centrality.
+        """
+
+        return dict(zip(self.graph.ids, map(float, self._stress)))
+
+    def update(self, G):
+        """
+        Brings the stress up to date with an updated graph.
+
+        Args:
+            G (CSRGraph or networkx.MultiDiGraph): The graph after the change, e.g. once
+                merge_variant or withdraw_variant has been applied.
+
+        Returns:
+            list: StopIds of the sources that had to be run again.
+        """
+
+        if not isinstance(G, CSRGraph):
+            G = CSRGraph.from_graph(G)
+        old = self.graph
+        n = len(old)
+
+        # Sources of the old graph whose DAG may change, removed stops included
+        affected = np.zeros(n, dtype=bool)
+        for u, v, weight in _edge_changes(old, G):
+            if u not in old.index:
+                continue
+            from_u = self.distances[:, old.index[u]]
+            if v in old.index:
+                affected |= np.isfinite(from_u) & (from_u + weight <= self.distances[:, old.index[v]])
+            else:
+                affected |= np.isfinite(from_u)
+        mapping = np.array([G.index.get(node, -1) for node in old.ids], dtype=np.int64)
+        affected |= mapping < 0
+
+        for s in np.flatnonzero(affected).tolist():
+            self._add(s, -1)
+
+        # Carry the unaffected state over to the dense ids of the new graph
+        kept = np.flatnonzero(~affected)
+        columns = np.flatnonzero(mapping >= 0)
+        distances = np.full((len(G), len(G)), np.inf)
+        distances[np.ix_(mapping[kept], mapping[columns])] = self.distances[np.ix_(kept, columns)]
+        dags = [None] * len(G)
+        for s in kept.tolist():
+            order, pred_offsets, preds, sigma = self.dags[s]
+            dags[mapping[s]] = (mapping[order].astype(np.int32), pred_offsets, mapping[preds].astype(np.int32), sigma)
+        stress = [0] * len(G)
+        for node, value in zip(mapping.tolist(), self._stress):
+            if node >= 0:
+                stress[node] = value
+
+        self.graph = G
+        self.distances = distances
+        self.dags = dags
+        self._stress = stress
+        rerun = [s for s in range(len(G)) if dags[s] is None]
+        for s in rerun:
+            self._run(s)
+        return [G.ids[s] for s in rerun]
+
+    def _run(self, s):
+        S, P, sigma, seen = _stress_dijkstra_csr(self.graph, s)
+        self.distances[s] = seen
+        pred_offsets = np.zeros(len(S)+1, dtype=np.int64)
+        np.cumsum([len(P[v]) for v in S], out=pred_offsets[1:])
+        preds = np.array([u for v in S for u in P[v]], dtype=np.int32)
+        sigma = [sigma[v] for v in S]
+        try:
+            sigma = np.array(sigma, dtype=np.int64)
+        except OverflowError:
+            # Path counts of large grids can outgrow int64
+            sigma = np.array(sigma, dtype=object)
+        self.dags[s] = (np.array(S, dtype=np.int32), pred_offsets, preds, sigma)
+        self._add(s, 1)
+
+    def _add(self, s, sign):
+        # Adds (sign 1) or removes (sign -1) the contribution of the stored DAG of s
+        order, pred_offsets, preds, sigma = self.dags[s]
+        n = len(self._stress)
+        S = order.tolist()
+        offsets = pred_offsets.tolist()
+        preds = preds.tolist()
+        P = [()] * n
+        sigmas = [0] * n
+        for i, (v, count) in enumerate(zip(S, sigma.tolist())):
+            P[v] = preds[offsets[i]:offsets[i+1]]
+            sigmas[v] = count
+
+        contribution = [0] * n
+        if self.endpoint:
+            contribution[s] += len(S)-1
+        _accumulate_csr(contribution, list(S), P, sigmas, s)
+        stress = self._stress
+        for v in S:
+            stress[v] += sign * contribution[v]
+
+
+def _edge_changes(old, new):
+    # (u, v, weight) for both the old and the new weight of every edge whose best 'Time'
+    # differs between the two graphs, StopIds for u and v
+    def weights(G):
+        offsets, targets, edge_weights = G.adjacency()
+        ids = G.ids
+        return {(ids[u], ids[targets[edge]]): edge_weights[edge]
+                for u in range(len(G)) for edge in range(offsets[u], offsets[u+1])}
+
+    before = weights(old)
+    after = weights(new)
+    changes = []
+    for pair in before.keys() | after.keys():
+        if before.get(pair) != after.get(pair):
+            for weight in (before.get(pair), after.get(pair)):
+                if weight is not None:
+                    changes.append((*pair, weight))
+    return changes
@@ -0,0 +1,318 @@
+import math
+from heapq import heappop, heappush
+
+import numpy as np
+
+from csr import CSRGraph
+
+
+class ContractionHierarchy:
+    """
+    A Contraction Hierarchy over the 'Time' weights of a CSRGraph.
+
+    Nodes are contracted one at a time in order of edge difference. Contracting a node adds
+    a shortcut u -> w for every pair of remaining neighbors whose only shortest path runs
+    through it, so a query only has to climb towards more important nodes from both ends.
+
+    Every edge, original or shortcut, has an id. Original edges keep their (route_id, var_id)
+    key, shortcuts point at the two edges they replace, which is how query paths are unpacked.
+
+    Attributes:
+        ids (list): Dense id -> StopId.
+        index (dict): StopId -> dense id.
+        rank (numpy.ndarray): Contraction order of every node, higher is more important.
+        tails, heads (numpy.ndarray): Endpoints of every edge.
+        weights (numpy.ndarray): 'Time' of every edge.
+        route_ids, var_ids (numpy.ndarray): Key of original edges, -1 for shortcuts.
+        first, second (numpy.ndarray): The two edges a shortcut replaces, -1 for original edges.
+        up_offsets, up_edges (numpy.ndarray): Edges u -> w with rank[w] > rank[u], grouped by u.
+        down_offsets, down_edges (numpy.ndarray): Edges u -> w with rank[u] > rank[w], grouped by w.
+    """
+
+    ARRAYS = ('ids', 'rank', 'tails', 'heads', 'weights', 'route_ids', 'var_ids', 'first', 'second',
+              'up_offsets', 'up_edges', 'down_offsets', 'down_edges')
+
+    def __init__(self, arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, np.asarray(arrays[name]))
+        self.ids = self.ids.tolist()
+        self.index = {node: i for i, node in enumerate(self.ids)}
+        self._lists = None
+
+    @classmethod
+    def build(cls, G, witness_limit=64):
+        """
+        Orders and contracts every node of a graph.
+
+        Args:
+            G (CSRGraph or networkx.MultiDiGraph): The bus network.
+            witness_limit (int): Nodes a witness search may settle before giving up and adding
+                the shortcut anyway. Lower is faster to build, higher gives fewer shortcuts.
+
+        Returns:
+            ContractionHierarchy: The hierarchy.
+        """
+
+        if not isinstance(G, CSRGraph):
+            G = CSRGraph.from_graph(G)
+        offsets, targets, csr_weights = G.adjacency()
+        n = len(G)
+
+        tails, heads, weights, route_ids, var_ids, first, second = [], [], [], [], [], [], []
+        out_adj = [{} for _ in range(n)]
+        in_adj = [{} for _ in range(n)]
+        for u in range(n):
+            for edge in range(offsets[u], offsets[u+1]):
+                w = targets[edge]
+                if w == u:
+                    continue
+                out_adj[u][w] = in_adj[w][u] = len(tails)
+                tails.append(u)
+                heads.append(w)
+                weights.append(csr_weights[edge])
+                route_ids.append(G.keys[edge][0])
+                var_ids.append(G.keys[edge][1])
+                first.append(-1)
+                second.append(-1)
+
+        def shortcuts(v):
+            # Shortcuts needed to contract v: (u, w, weight, u->v edge, v->w edge)
+            needed = []
+            if not out_adj[v]:
+                return needed
+            max_out = max(weights[e] for e in out_adj[v].values())
+            for u, in_edge in in_adj[v].items():
+                via_u = weights[in_edge]
+                witness = _witness_search(out_adj, weights, u, v, via_u + max_out, witness_limit)
+                for w, out_edge in out_adj[v].items():
+                    if w == u:
+                        continue
+                    via = via_u + weights[out_edge]
+                    if witness.get(w, math.inf) > via:
+                        needed.append((u, w, via, in_edge, out_edge))
+            return needed
+
+        deleted_neighbors = [0] * n
+
+        def priority(v):
+            return len(shortcuts(v)) - len(in_adj[v]) - len(out_adj[v]) + deleted_neighbors[v]
+
+        queue = [(priority(v), v) for v in range(n)]
+        queue.sort()
+        rank = [0] * n
+        up = [[] for _ in range(n)]
+        down = [[] for _ in range(n)]
+        order = 0
+        while queue:
+            _, v = heappop(queue)
+            # Lazy update: contract v only if it is still the cheapest once re-evaluated
+            current = priority(v)
+            if queue and current > queue[0][0]:
+                heappush(queue, (current, v))
+                continue
+
+            for u, w, via, in_edge, out_edge in shortcuts(v):
+                existing = out_adj[u].get(w)
+                if existing is not None and weights[existing] <= via:
+                    continue
+                out_adj[u][w] = in_adj[w][u] = len(tails)
+                tails.append(u)
+                heads.append(w)
+                weights.append(via)
+                route_ids.append(-1)
+                var_ids.append(-1)
+                first.append(in_edge)
+                second.append(out_edge)
+
+            rank[v] = order
+            order += 1
+            for w, edge in out_adj[v].items():
+                up[v].append(edge)
+                del in_adj[w][v]
+                deleted_neighbors[w] += 1
+            for u, edge in in_adj[v].items():
+                down[v].append(edge)
+                del out_adj[u][v]
+                deleted_neighbors[u] += 1
+            out_adj[v] = {}
+            in_adj[v] = {}
+
+        up_offsets = np.cumsum([0] + [len(edges) for edges in up])
+        down_offsets = np.cumsum([0] + [len(edges) for edges in down])
+        return cls({
+            'ids': G.ids, 'rank': np.array(rank, dtype=np.int32),
+            'tails': np.array(tails, dtype=np.int32), 'heads': np.array(heads, dtype=np.int32),
+            'weights': np.array(weights, dtype=np.float64),
+            'route_ids': np.array(route_ids, dtype=np.int32), 'var_ids': np.array(var_ids, dtype=np.int32),
+            'first': np.array(first, dtype=np.int64), 'second': np.array(second, dtype=np.int64),
+            'up_offsets': up_offsets, 'up_edges': np.array([e for edges in up for e in edges], dtype=np.int64),
+            'down_offsets': down_offsets, 'down_edges': np.array([e for edges in down for e in edges], dtype=np.int64),
+        })
+
+    def save(self, file_path):
+        """
+        Writes the hierarchy to a .npz file.
+
+        Args:
+            file_path (str): The path to the output file.
+        """
+
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays['ids'] = np.array(self.ids, dtype=np.int64)
+        with open(file_path, 'wb') as file:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Reads a hierarchy written by save.
+
+        Args:
+            file_path (str): The path to the .npz file.
+
+        Returns:
+            ContractionHierarchy: The hierarchy.
+        """
+
+        with np.load(file_path) as data:
+            return cls({name: data[name] for name in cls.ARRAYS})
+
+    def query(self, start_stop, end_stop):
+        """
+        Finds the fastest path between two stops with a bidirectional upward search.
+
+        Args:
+            start_stop: StopId of the origin.
+            end_stop: StopId of the destination.
+
+        Returns:
+            tuple: (edge path, time) in the format of dijkstra_shortest_path_edge, a list of
+            (StopId, (route_id, var_id)) from the origin and the travel time. The path is empty
+            and the time infinite if the destination cannot be reached.
+        """
+
+        edges = self._meet(self.index[start_stop], self.index[end_stop])
+        if edges is None:
+            return [], math.inf
+
+        edges = self.unpack(edges)
+        lists = self._as_lists()
+        tails, weights, route_ids, var_ids = lists['tails'], lists['weights'], lists['route_ids'], lists['var_ids']
+
+        # Summed edge by edge from the origin, the same order Dijkstra accumulates in
+        time = 0
+        for edge in edges:
+            time += weights[edge]
+        return [(self.ids[tails[edge]], (route_ids[edge], var_ids[edge])) for edge in edges], time
+
+    def unpack(self, edges):
+        """
+        Replaces every shortcut in a list of edge ids by the original edges it stands for.
+
+        Args:
+            edges (list): Edge ids along a path.
+
+        Returns:
+            list: Ids of original edges along the same path.
+        """
+
+        lists = self._as_lists()
+        first, second = lists['first'], lists['second']
+        unpacked = []
+        stack = list(reversed(edges))
+        while stack:
+            edge = stack.pop()
+            if first[edge] < 0:
+                unpacked.append(edge)
+            else:
+                stack.append(second[edge])
+                stack.append(first[edge])
+        return unpacked
+
+    def _meet(self, source, target):
+        # Returns the (packed) edge ids of a shortest source -> target path, None if there is none
+        if source == target:
+            return []
+
+        lists = self._as_lists()
+        weights, tails, heads = lists['weights'], lists['tails'], lists['heads']
+        offsets = (lists['up_offsets'], lists['down_offsets'])
+        edge_lists = (lists['up_edges'], lists['down_edges'])
+        ends = (heads, tails)
+
+        distances = ({source: 0}, {target: 0})
+        parents = ({source: -1}, {target: -1})
+        queues = ([(0, source)], [(0, target)])
+        best = math.inf
+        meet = -1
+
+        while queues[0] or queues[1]:
+            side = 0 if queues[0] and (not queues[1] or queues[0][0][0] <= queues[1][0][0]) else 1
+            queue = queues[side]
+            if queue[0][0] >= best:
+                # This is the smaller of the two queue heads, neither side can improve best
+                break
+
+            d, u = heappop(queue)
+            dist = distances[side]
+            if d > dist[u]:
+                continue
+
+            other = distances[1-side].get(u)
+            if other is not None and d + other < best:
+                best = d + other
+                meet = u
+
+            parent, edge_list, end = parents[side], edge_lists[side], ends[side]
+            for i in range(offsets[side][u], offsets[side][u+1]):
+                edge = edge_list[i]
+                w = end[edge]
+                nd = d + weights[edge]
+                if nd < dist.get(w, math.inf):
+                    dist[w] = nd
+                    parent[w] = edge
+                    heappush(queue, (nd, w))
+
+        if meet < 0:
+            return None
+
+        path = []
+        node = meet
+        while parents[0][node] >= 0:
+            path.append(parents[0][node])
+            node = tails[parents[0][node]]
+        path.reverse()
+        node = meet
+        while parents[1][node] >= 0:
+            path.append(parents[1][node])
+            node = heads[parents[1][node]]
+        return path
+
+    def _as_lists(self):
+        # The arrays as cached Python lists for the search loops
+        if self._lists is None:
+            self._lists = {name: getattr(self, name).tolist() for name in self.ARRAYS if name != 'ids'}
+        return self._lists
+
+
+def _witness_search(out_adj, weights, source, excluded, max_dist, settle_limit):
+    # Dijkstra from source that avoids the node being contracted, bounded by distance and
+    # number of settled nodes
+    distances = {source: 0}
+    queue = [(0, source)]
+    settled = 0
+    while queue:
+        d, u = heappop(queue)
+        if d > distances[u]:
+            continue
+        if d > max_dist or settled >= settle_limit:
+            break
+        settled += 1
+        for w, edge in out_adj[u].items():
+            if w == excluded:
+                continue
+            nd = d + weights[edge]
+            if nd < distances.get(w, math.inf):
+                distances[w] = nd
+                heappush(queue, (nd, w))
+    return distances
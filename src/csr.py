@@ -0,0 +1,244 @@
+import hashlib
+import math
+import numpy as np
+
+
+class CSRGraph:
+    """
+    A frozen compressed-sparse-row (CSR) view of the graph produced by build_graph.
+
+    StopIds are remapped to dense integer ids in ascending StopId order, so comparing two
+    dense ids gives the same answer as comparing the StopIds they stand for. Parallel edges
+    between two stops are collapsed ahead of time to the one with the smallest 'Time', which
+    is the only edge the shortest-path functions in graph.py ever relax.
+
+    Attributes:
+        ids (list): Dense id -> StopId.
+        index (dict): StopId -> dense id.
+        offsets (numpy.ndarray): Out-edges of dense node u are offsets[u]:offsets[u+1].
+        targets (numpy.ndarray): Dense id of the head of every edge.
+        weights (numpy.ndarray): 'Time' of every edge, float64 or float32.
+        route_ids (numpy.ndarray): RouteId of the best parallel edge.
+        var_ids (numpy.ndarray): RouteVarId of the best parallel edge.
+        keys (list): (route_id, var_id) key of every edge.
+        x (numpy.ndarray): Projected x coordinate of every node.
+        y (numpy.ndarray): Projected y coordinate of every node.
+    """
+
+    def __init__(self, ids, offsets, targets, weights, route_ids, var_ids, x, y, dtype=np.float64):
+        self.ids = list(ids)
+        self.index = {node: i for i, node in enumerate(self.ids)}
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=dtype)
+        self.route_ids = np.asarray(route_ids, dtype=np.int32)
+        self.var_ids = np.asarray(var_ids, dtype=np.int32)
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.keys = list(zip(self.route_ids.tolist(), self.var_ids.tolist()))
+
+        for array in (self.offsets, self.targets, self.weights, self.route_ids, self.var_ids, self.x, self.y):
+            array.flags.writeable = False
+
+        self._adjacency = None
+        self._coordinates = None
+        self._reverse = None
+        self._checksum = None
+
+    @classmethod
+    def from_graph(cls, G, dtype=np.float64):
+        """
+        Builds a CSR view of a MultiDiGraph filled by build_graph.
+
+        Args:
+            G (networkx.MultiDiGraph): The bus network.
+            dtype: Storage type of the edge weights, numpy.float64 (default) or numpy.float32.
+
+        Returns:
+            CSRGraph: The frozen view.
+        """
+
+        ids = sorted(G.nodes())
+        index = {node: i for i, node in enumerate(ids)}
+
+        offsets = [0]
+        targets = []
+        weights = []
+        route_ids = []
+        var_ids = []
+        for node in ids:
+            # G[node] iterates neighbors in the same order as G.neighbors(node)
+            for neighbor, edges in G[node].items():
+                key = min(edges, key=lambda x: edges[x]['Time'])
+                targets.append(index[neighbor])
+                weights.append(edges[key]['Time'])
+                route_ids.append(key[0])
+                var_ids.append(key[1])
+            offsets.append(len(targets))
+
+        x = [G.nodes[node].get('x', math.nan) for node in ids]
+        y = [G.nodes[node].get('y', math.nan) for node in ids]
+
+        return cls(ids, offsets, targets, weights, route_ids, var_ids, x, y, dtype=dtype)
+
+    @classmethod
+    def from_arrays(cls, node_ids, x, y, sources, targets, weights, route_ids, var_ids, dtype=np.float64):
+        """
+        Builds a CSR view from flat node and edge arrays without going through NetworkX.
+
+        Edges must be listed in G.edges(keys=True) order of the graph they came from, which is
+        what keeps neighbor order and min-Time tie-breaking the same as from_graph.
+
+        Args:
+            node_ids (numpy.ndarray): StopId of every node.
+            x, y (numpy.ndarray): Projected coordinates of every node.
+            sources, targets (numpy.ndarray): Position in node_ids of the tail and head of every edge.
+            weights (numpy.ndarray): 'Time' of every edge.
+            route_ids, var_ids (numpy.ndarray): Key of every edge.
+            dtype: Storage type of the edge weights.
+
+        Returns:
+            CSRGraph: The frozen view.
+        """
+
+        node_ids = np.asarray(node_ids)
+        order = np.argsort(node_ids, kind='stable')
+        rank = np.empty(len(node_ids), dtype=np.int64)
+        rank[order] = np.arange(len(node_ids))
+
+        u = rank[np.asarray(sources)]
+        v = rank[np.asarray(targets)]
+        weights = np.asarray(weights, dtype=np.float64)
+        position = np.arange(len(u))
+
+        # Best parallel edge of every (u, v): smallest Time, earliest edge on ties
+        by_pair = np.lexsort((position, weights, v, u))
+        first = np.ones(len(by_pair), dtype=bool)
+        first[1:] = (u[by_pair][1:] != u[by_pair][:-1]) | (v[by_pair][1:] != v[by_pair][:-1])
+        best = by_pair[first]
+
+        # Neighbors keep the order in which they first appear among the edges of u
+        group = np.cumsum(first) - 1
+        first_position = np.full(len(best), len(u), dtype=np.int64)
+        np.minimum.at(first_position, group, position[by_pair])
+        best = best[np.lexsort((first_position, u[best]))]
+
+        offsets = np.zeros(len(node_ids)+1, dtype=np.int64)
+        np.cumsum(np.bincount(u[best], minlength=len(node_ids)), out=offsets[1:])
+
+        return cls(node_ids[order].tolist(), offsets, v[best], weights[best],
+                   np.asarray(route_ids)[best], np.asarray(var_ids)[best],
+                   np.asarray(x)[order], np.asarray(y)[order], dtype=dtype)
+
+    def __getstate__(self):
+        # The list caches and the reverse view are rebuilt on demand, don't ship them to workers
+        state = self.__dict__.copy()
+        state['_adjacency'] = state['_coordinates'] = state['_reverse'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for array in (self.offsets, self.targets, self.weights, self.route_ids, self.var_ids, self.x, self.y):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def nodes(self):
+        return self.ids
+
+    def number_of_nodes(self):
+        return len(self.ids)
+
+    def number_of_edges(self):
+        return len(self.targets)
+
+    def scaled(self, resolution=1/60):
+        """
+        Returns a copy with every weight rounded to a whole number of resolution units, for
+        queues such as DialQueue that need integer priorities.
+
+        Args:
+            resolution (float): Size of one unit in minutes, the unit of 'Time'. The default
+                rounds to whole seconds.
+
+        Returns:
+            CSRGraph: The same graph with int64 weights.
+        """
+
+        weights = np.rint(self.weights / resolution).astype(np.int64)
+        return CSRGraph(self.ids, self.offsets, self.targets, weights, self.route_ids, self.var_ids,
+                        self.x, self.y, dtype=np.int64)
+
+    def reverse(self):
+        """
+        Returns the transposed view, every edge u -> v becomes v -> u with the same key and weight.
+
+        In-edges of a node keep the order of their tails' dense ids. The view is built once
+        and cached.
+
+        Returns:
+            CSRGraph: The reversed graph, sharing ids and coordinates with this one.
+        """
+
+        if self._reverse is None:
+            sources = np.repeat(np.arange(len(self.ids), dtype=np.int32), np.diff(self.offsets))
+            order = np.argsort(self.targets, kind='stable')
+            offsets = np.zeros(len(self.ids)+1, dtype=np.int64)
+            np.cumsum(np.bincount(self.targets, minlength=len(self.ids)), out=offsets[1:])
+            self._reverse = CSRGraph(self.ids, offsets, sources[order], self.weights[order], self.route_ids[order],
+                                     self.var_ids[order], self.x, self.y, dtype=self.weights.dtype)
+            self._reverse._reverse = self
+        return self._reverse
+
+    def adjacency(self):
+        """
+        Returns the offset, target and weight arrays as plain Python lists.
+
+        The lists are built once and cached. Indexing a list hands back an existing object,
+        while indexing a numpy array boxes a new scalar on every access, so the pure-Python
+        search loops in graph.py read from these.
+
+        Returns:
+            tuple: (offsets, targets, weights) lists.
+        """
+
+        if self._adjacency is None:
+            self._adjacency = (self.offsets.tolist(), self.targets.tolist(), self.weights.tolist())
+        return self._adjacency
+
+    def checksum(self):
+        """
+        Returns a digest of the nodes, edges and weights, which structures precomputed on the
+        graph (Landmarks) store to recognize it later. The digest is computed once and cached.
+
+        Returns:
+            str: Hex SHA-256 digest.
+        """
+
+        if self._checksum is None:
+            digest = hashlib.sha256()
+            digest.update(np.asarray(self.ids, dtype=np.int64).tobytes())
+            for array in (self.offsets, self.targets, self.weights):
+                digest.update(array.dtype.str.encode('ascii'))
+                digest.update(array.tobytes())
+            self._checksum = digest.hexdigest()
+        return self._checksum
+
+    def coordinates(self):
+        """
+        Returns the x and y arrays as cached plain Python lists.
+
+        Returns:
+            tuple: (x, y) lists.
+        """
+
+        if self._coordinates is None:
+            self._coordinates = (self.x.tolist(), self.y.tolist())
+        return self._coordinates
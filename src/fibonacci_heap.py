@@ -1,7 +1,15 @@
 import math
 
 
+# Golden ratio, a heap of n nodes has no root of degree above log_phi(n)
+PHI = (1 + math.sqrt(5)) / 2
+
+
 class FibonacciHeap:
+    def __init__(self):
+        # Reused by consolidate, indexed by degree
+        self.degree_table = []
+
     # internal node class
     class Node:
         def __init__(self, key, value):
@@ -121,7 +129,10 @@ class FibonacciHeap:
     # combine root nodes of equal degree to consolidate the heap
     # by creating a list of unordered binomial trees
     def consolidate(self):
-        A = [None] * int(math.log(self.total_nodes) * 2)
+        A = self.degree_table
+        size = int(math.log(self.total_nodes, PHI)) + 2
+        if len(A) < size:
+            A.extend([None] * (size - len(A)))
         nodes = [w for w in self.iterate(self.root_list)]
         for w in range(0, len(nodes)):
             x = nodes[w]
@@ -138,10 +149,12 @@ class FibonacciHeap:
         # find new min node - no need to reconstruct new root list below
         # because root list was iteratively changing as we were moving
         # nodes around in the above loop
+        # the table is left empty for the next call
         for i in range(0, len(A)):
             if A[i] is not None:
                 if A[i].key < self.min_node.key:
                     self.min_node = A[i]
+                A[i] = None
 
     # actual linking of one node to another in the root list
     # while also updating the child linked list
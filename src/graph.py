@@ -1,73 +1,287 @@
+import copy
 import json
 from convert import Converter
 import heapq
 import math
+import os
+import numpy as np
 from itertools import count
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import random
+import time
+from statistics import NormalDist
 from heapq import heappop, heappush
 from geo import geojson
 from fibonacci_heap import FibonacciHeap
+from priority_queue import DialQueue, FibonacciQueue
+from csr import CSRGraph
+from spatial import StopIndex
 import sys
 
 conv = Converter()
 
-def build_graph(G, route_vars, paths):
-    with open('data/stops.json', encoding='utf-8') as file:   
-        for line in file:
-
-            obj = json.loads(line)
-            route_id = int(obj['RouteId'])
-            var_id = int(obj['RouteVarId'])
-            path = paths[route_id, var_id]
-            x, y = conv.convert(path.get_lng(), path.get_lat())
-            stop_list = json.loads(line)['Stops']
-            running_time = route_vars[route_id, var_id].get_running_time()
-            total_dist = route_vars[route_id, var_id].get_distance()
-
-            match = []
-            for stop in stop_list:
-                stop_x, stop_y = conv.convert(stop['Lng'], stop['Lat'])
-                if not match:
-                    match_ind = 0
-                else:
-                    match_ind = match[-1]+1
+# Key of the walking edges added by add_transfer_edges, RouteId 0 is not a bus route and the
+# key fits the int32 route_ids/var_ids of CSRGraph like any other
+TRANSFER_KEY = (0, 0)
+
+def build_graph(G, route_vars, paths, workers=1, file_path='data/stops.json'):
+    """
+    Adds one edge per pair of consecutive stops of every route variant in stops.json.
 
-                distance = conv.cartesian_distance(stop_x, stop_y, x[match_ind], y[match_ind])
+    Every line of stops.json is an independent route variant, so with workers > 1 (or None
+    for one per core) the per-variant matching and edge-distance work is fanned out to a
+    process pool. Results are merged in file order, so the graph is the same as a serial build.
+
+    Args:
+        G (networkx.MultiDiGraph): The graph to fill.
+        route_vars (dict): (RouteId, RouteVarId) -> RouteVar.
+        paths (dict): (RouteId, RouteVarId) -> Path.
+        workers (int or None): Number of worker processes, 1 builds serially.
+        file_path (str): The path to stops.json.
+    """
+
+    with open(file_path, encoding='utf-8') as file:
+        if workers == 1:
+            stop_xy = {}
+            for line in file:
+                merge_variant(G, build_variant(*variant_task(json.loads(line), route_vars, paths), stop_xy))
+            return
+
+        tasks = [variant_task(json.loads(line), route_vars, paths) for line in file]
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_build_variant_task, tasks, chunksize=max(1, len(tasks) // (workers*4)))
+        for result in results:
+            merge_variant(G, result)
+
+
+def variant_task(obj, route_vars, paths):
+    """
+    Collects everything build_variant needs for one stops.json line.
+
+    Args:
+        obj (dict): A parsed stops.json line.
+        route_vars (dict): (RouteId, RouteVarId) -> RouteVar.
+        paths (dict): (RouteId, RouteVarId) -> Path.
+
+    Returns:
+        tuple: (route_id, var_id, stop_list, lng, lat, running_time, total_dist).
+    """
+
+    route_id = int(obj['RouteId'])
+    var_id = int(obj['RouteVarId'])
+    path = paths[route_id, var_id]
+    route_var = route_vars[route_id, var_id]
+    return (route_id, var_id, obj['Stops'], path.get_lng(), path.get_lat(),
+            route_var.get_running_time(), route_var.get_distance())
+
+
+def build_variant(route_id, var_id, stop_list, lng, lat, running_time, total_dist, stop_xy):
+    """
+    Computes the edges and stop coordinates of one route variant without touching the graph.
+
+    Args:
+        route_id (int), var_id (int): Key of the variant.
+        stop_list (list): The 'Stops' records of the variant in route order.
+        lng, lat (list): The polyline of the variant.
+        running_time (float): Running time of the whole variant.
+        total_dist (float): Distance of the whole variant.
+        stop_xy (dict): Memo of StopId -> projected (x, y).
+
+    Returns:
+        tuple: (edges, coords), edges is a list of (u, v, key, Distance, Time) and coords a
+        list of (StopId, x, y) in the order build_graph assigns them.
+    """
+
+    x, y = conv.convert(np.asarray(lng, dtype=float), np.asarray(lat, dtype=float))
+
+    stop_x, stop_y = project_stops(stop_list, stop_xy)
+    match = match_stops(x, y, stop_x, stop_y)
+
+    # Length of every polyline segment, with the scalar formula and accumulated left to
+    # right below like the original point-by-point loop so edge distances come out
+    # bit-identical, np.sqrt over arrays can round the last bit differently
+    x, y = x.tolist(), y.tolist()
+    seg = [conv.cartesian_distance(x[i], y[i], x[i+1], y[i+1]) for i in range(len(x)-1)]
+
+    edges = []
+    coords = []
+    prev_match = 0
+    for prev_stop_index in range(len(stop_list)-1):
+        i = match[prev_stop_index+1] - 1
+        dist = sum(seg[prev_match:i+1])
+        u = stop_list[prev_stop_index]['StopId']
+        v = stop_list[prev_stop_index+1]['StopId']
+
+        edges.append((u, v, (route_id, var_id), dist, running_time*dist/total_dist))
+        coords.append((u, x[i], y[i]))
+        coords.append((v, x[i+1], y[i+1]))
+
+        prev_match = i+1
+
+    return edges, coords
+
+
+def _build_variant_task(task):
+    return build_variant(*task, _worker_stop_xy)
+
+
+# Per-process stop projection memo used by the build_graph worker pool
+_worker_stop_xy = {}
+
+
+def merge_variant(G, result):
+    """
+    Adds the edges and stop coordinates computed by build_variant to the graph.
+
+    Args:
+        G (networkx.MultiDiGraph): The graph to fill.
+        result (tuple): (edges, coords) returned by build_variant.
+    """
+
+    edges, coords = result
+    for u, v, key, dist, time in edges:
+        G.add_edge(u, v, key = key, Distance = dist, Time = time)
+    mark_changed(G)
+
+    # Later assignments win, as they did when coordinates were set edge by edge
+    for stop_id, x, y in coords:
+        G.nodes[stop_id]['x'] = x
+        G.nodes[stop_id]['y'] = y
+
+
+def withdraw_variant(G, route_id, var_id):
+    """
+    Removes every edge of one route variant from the graph, the reverse of merge_variant.
+
+    Stops stay in the graph even if no other variant serves them.
+
+    Args:
+        G (networkx.MultiDiGraph): The graph to update.
+        route_id (int): RouteId of the variant.
+        var_id (int): RouteVarId of the variant.
+    """
+
+    key = (route_id, var_id)
+    G.remove_edges_from([(u, v, k) for u, v, k in G.edges(keys=True) if k == key])
+    mark_changed(G)
+
+
+def mark_changed(G):
+    """
+    Bumps the version of a graph, which caches built from it (ShortestPathTreeCache) compare
+    to notice in-place changes. merge_variant, withdraw_variant and add_transfer_edges call
+    it, call it after editing G in any other way.
+
+    Args:
+        G (networkx.MultiDiGraph): The graph that was changed.
+    """
+
+    G.graph['version'] = G.graph.get('version', 0) + 1
+
+
+def add_transfer_edges(G, stops, radius=250.0, walk_speed=1.2, detour=1.3, transfer_time=0.0):
+    """
+    Adds walking edges both ways between every two stops of the graph within radius of each
+    other, so a rider can change to a stop across the street even if no route links them.
+
+    The pairs come from a spatial self-join on a StopIndex with cells of radius meters. A walk
+    covers the straight-line distance times detour, for the streets in between, and takes
+    transfer_time minutes on top of the walk itself. Walking edges use TRANSFER_KEY, so
+    withdraw_variant(G, *TRANSFER_KEY) removes them again.
+
+    Args:
+        G (networkx.MultiDiGraph): The graph built by build_graph.
+        stops (dict): StopId -> Stop.
+        radius (float): Longest straight-line walk in meters.
+        walk_speed (float): Walking speed in meters per second.
+        detour (float): Ratio of walked to straight-line distance.
+        transfer_time (float): Fixed minutes added to every walk.
+
+    Returns:
+        int: Number of edges added.
+    """
+
+    index = StopIndex([stops[stop_id] for stop_id in G.nodes if stop_id in stops], cell_size=radius)
+    edges = []
+    for a, b, distance in index.pairs_within(radius):
+        walked = distance * detour
+        # 'Time' is in minutes like the RunningTime the bus edges are derived from
+        time_taken = transfer_time + walked / walk_speed / 60
+        u, v = a.get_stop_id(), b.get_stop_id()
+        edges.append((u, v, TRANSFER_KEY, {'Distance': walked, 'Time': time_taken}))
+        edges.append((v, u, TRANSFER_KEY, {'Distance': walked, 'Time': time_taken}))
+    G.add_edges_from(edges)
+    mark_changed(G)
+    return len(edges)
+
+
+def project_stops(stop_list, stop_xy):
+    """
+    Projects the stops of one route variant, reusing every stop already seen.
+
+    Args:
+        stop_list (list): The 'Stops' records of a stops.json line.
+        stop_xy (dict): Memo of StopId -> (x, y), filled with any stop not seen before.
+
+    Returns:
+        tuple: numpy arrays (x, y) of the stops in stop_list order.
+    """
+
+    new_stops = {stop['StopId']: stop for stop in stop_list if stop['StopId'] not in stop_xy}
+    if new_stops:
+        lng = np.array([stop['Lng'] for stop in new_stops.values()], dtype=float)
+        lat = np.array([stop['Lat'] for stop in new_stops.values()], dtype=float)
+        new_x, new_y = conv.convert(lng, lat)
+        stop_xy.update(zip(new_stops, zip(new_x.tolist(), new_y.tolist())))
+
+    xy = np.array([stop_xy[stop['StopId']] for stop in stop_list], dtype=float).reshape(-1, 2)
+    return xy[:, 0], xy[:, 1]
+
+
+def match_stops(x, y, stop_x, stop_y, max_cells=2**22):
+    """
+    Matches every stop to its nearest polyline point, moving forward along the path.
+
+    Stop k is matched to the closest point at or after match[k-1]+1 (the first stop searches
+    the whole polyline), and the earliest point wins ties, so the result is monotone.
+    The stop-to-point distances are computed for a block of stops at once and each stop
+    then takes an argmin over its forward window.
+
+    Args:
+        x, y (numpy.ndarray): Projected polyline points.
+        stop_x, stop_y (numpy.ndarray): Projected stops in route order.
+        max_cells (int): Upper bound on the size of one stop x point distance block.
+
+    Returns:
+        list: Polyline index matched to every stop.
+    """
+
+    block = max(1, max_cells // max(1, len(x)))
+    match = []
+    start = 0
+    for lo in range(0, len(stop_x), block):
+        hi = min(lo+block, len(stop_x))
+        distances = np.sqrt((stop_x[lo:hi, None]-x[None, :])**2 + (stop_y[lo:hi, None]-y[None, :])**2)
+        for row in distances:
+            start += int(np.argmin(row[start:]))
+            match.append(start)
+            start += 1
+
+    return match
+
+
+def dijkstra_one_dest_shortest_path(G, start_stop, end_stop, queue=None, cache=None):
+    if cache is not None:
+        return cache.one_dest_shortest_path(G, start_stop, end_stop)
+    if queue is not None and not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    if isinstance(G, CSRGraph):
+        return _dijkstra_one_dest_shortest_path_csr(G, start_stop, end_stop, queue)
 
-                for i in range(match_ind+1, len(x)):
-                    dist = conv.cartesian_distance(stop_x, stop_y, x[i], y[i])
-                    if distance > dist:
-                        distance = dist
-                        match_ind = i
-                
-                match.append(match_ind)
-
-            distance = 0
-            dist = 0
-            prev_stop_index = 0
-            for i in range(len(x)-1):
-                distance += conv.cartesian_distance(x[i], y[i], x[i+1], y[i+1])
-                dist += conv.cartesian_distance(x[i], y[i], x[i+1], y[i+1])
-            
-                #Stop check:
-                if match[prev_stop_index+1] == i+1:
-                    
-                    G.add_edge(stop_list[prev_stop_index]['StopId'], stop_list[prev_stop_index+1]['StopId'], 
-                               key = (route_id, var_id),
-                               Distance = dist, 
-                               Time = running_time*dist/total_dist)
-                    
-                    G.nodes[stop_list[prev_stop_index]['StopId']]['x'] = x[i]
-                    G.nodes[stop_list[prev_stop_index]['StopId']]['y'] = y[i]
-                    G.nodes[stop_list[prev_stop_index+1]['StopId']]['x'] = x[i+1]
-                    G.nodes[stop_list[prev_stop_index+1]['StopId']]['y'] = y[i+1]   
-                    
-                    dist = 0
-                    prev_stop_index += 1
-                    if prev_stop_index == len(stop_list)-1:
-                        break
-
-
-def dijkstra_one_dest_shortest_path(G, start_stop, end_stop):
     distances = {node: float('inf') for node in G.nodes()}
     distances[start_stop] = 0
     
@@ -101,7 +315,149 @@ def dijkstra_one_dest_shortest_path(G, start_stop, end_stop):
     return predecessors, distances[end_stop]
 
 
-def dijkstra_shortest_path(G, start_stop):
+def _dijkstra_one_dest_shortest_path_csr(G, start_stop, end_stop, queue=None):
+    target = G.index[end_stop]
+    distances, pred_node, pred_edge = shortest_path_tree(G, G.index[start_stop], target, queue)
+    return _csr_predecessors(G, pred_node, pred_edge, dict.fromkeys(G.ids)), distances[target]
+
+
+def shortest_path_tree(G, source, target=-1, queue=None):
+    """
+    Runs Dijkstra on a CSRGraph from a dense source id.
+
+    Args:
+        G (CSRGraph): The bus network.
+        source (int): Dense id of the origin.
+        target (int): Dense id at which to stop early, -1 to search the whole graph.
+        queue: Priority queue following the protocol in priority_queue.py, cleared before
+            use. None runs on an inline heapq, which is the fastest in pure Python.
+
+    Returns:
+        tuple: (distances, pred_node, pred_edge) lists indexed by dense id, pred_node and
+        pred_edge are -1 for the origin and for nodes that were not reached.
+    """
+
+    if queue is not None:
+        return _shortest_path_tree_queue(G, source, target, queue)
+
+    offsets, targets, weights = G.adjacency()
+
+    distances = [math.inf] * len(G)
+    distances[source] = 0
+    pred_node = [-1] * len(G)
+    pred_edge = [-1] * len(G)
+
+    priority_queue = [(0, source)]
+    while priority_queue:
+        current_distance, current_node = heappop(priority_queue)
+
+        if current_node == target:
+            break
+        if current_distance > distances[current_node]:
+            continue
+
+        for edge in range(offsets[current_node], offsets[current_node+1]):
+            neighbor = targets[edge]
+            distance = current_distance + weights[edge]
+            if distance < distances[neighbor]:
+                distances[neighbor] = distance
+                pred_node[neighbor] = current_node
+                pred_edge[neighbor] = edge
+                heappush(priority_queue, (distance, neighbor))
+
+    return distances, pred_node, pred_edge
+
+
+def _shortest_path_tree_queue(G, source, target, queue):
+    offsets, targets, weights = G.adjacency()
+
+    distances = [math.inf] * len(G)
+    distances[source] = 0
+    pred_node = [-1] * len(G)
+    pred_edge = [-1] * len(G)
+
+    queue.clear()
+    queue.push(0, source)
+    while queue:
+        current_distance, current_node = queue.pop()
+
+        if current_node == target:
+            break
+
+        for edge in range(offsets[current_node], offsets[current_node+1]):
+            neighbor = targets[edge]
+            distance = current_distance + weights[edge]
+            if distance < distances[neighbor]:
+                if distances[neighbor] == math.inf:
+                    queue.push(distance, neighbor)
+                else:
+                    queue.decrease_key(neighbor, distance)
+                distances[neighbor] = distance
+                pred_node[neighbor] = current_node
+                pred_edge[neighbor] = edge
+
+    return distances, pred_node, pred_edge
+
+
+def scaled_rounding_error(G, resolution=1/60, sources=32, seed=0):
+    """
+    Compares Dijkstra on integer-scaled weights, run with a DialQueue, to the float-weighted
+    result from a sample of sources.
+
+    Args:
+        G (CSRGraph or networkx.MultiDiGraph): The bus network.
+        resolution (float): Weight unit passed to CSRGraph.scaled.
+        sources (int or list): Number of sources to sample, or the StopIds to use.
+        seed (int): Seed of the source sample.
+
+    Returns:
+        dict: 'max_error' and 'mean_error', the largest and mean absolute difference between
+        scaled time * resolution and the float time over all reached pairs, 'changed_paths',
+        the number of pairs whose last hop differs, and 'pairs', the number of reached pairs.
+    """
+
+    if not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    scaled = G.scaled(resolution)
+    if isinstance(sources, int):
+        sources = np.random.default_rng(seed).choice(len(G), size=min(sources, len(G)), replace=False).tolist()
+    else:
+        sources = [G.index[stop] for stop in sources]
+
+    queue = DialQueue(max(scaled.weights.max(initial=0), 1))
+    max_error = total_error = 0.0
+    changed_paths = pairs = 0
+    for source in sources:
+        distances, pred_node, _ = shortest_path_tree(G, source)
+        scaled_distances, scaled_pred_node, _ = shortest_path_tree(scaled, source, queue=queue)
+        for node, distance in enumerate(distances):
+            if distance == math.inf:
+                continue
+            error = abs(scaled_distances[node] * resolution - distance)
+            max_error = max(max_error, error)
+            total_error += error
+            changed_paths += pred_node[node] != scaled_pred_node[node]
+            pairs += 1
+
+    return {'max_error': max_error, 'mean_error': total_error / pairs if pairs else 0.0,
+            'changed_paths': changed_paths, 'pairs': pairs}
+
+
+def _csr_predecessors(G, pred_node, pred_edge, predecessors):
+    # Translates dense (node, edge) predecessor lists back to {StopId: (StopId, key)}
+    ids, keys = G.ids, G.keys
+    for node, edge in enumerate(pred_edge):
+        if edge >= 0:
+            predecessors[ids[node]] = (ids[pred_node[node]], keys[edge])
+    return predecessors
+
+
+def dijkstra_shortest_path(G, start_stop, queue=None):
+    if queue is not None and not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    if isinstance(G, CSRGraph):
+        return _dijkstra_shortest_path_csr(G, start_stop, queue)
+
     distances = {node: float('inf') for node in G.nodes()}
     distances[start_stop] = 0
     
@@ -131,7 +487,15 @@ def dijkstra_shortest_path(G, start_stop):
     return distances, predecessors
 
 
+def _dijkstra_shortest_path_csr(G, start_stop, queue=None):
+    distances, pred_node, pred_edge = shortest_path_tree(G, G.index[start_stop], queue=queue)
+    return dict(zip(G.ids, distances)), _csr_predecessors(G, pred_node, pred_edge, {})
+
+
 def floyd_warshall(G):
+    if isinstance(G, CSRGraph):
+        return _floyd_warshall_csr(G)
+
     distances = {}
     predecessors = {}
     
@@ -159,16 +523,107 @@ def floyd_warshall(G):
     return distances, predecessors
 
 
+def _floyd_warshall_csr(G):
+    offsets, targets, weights = G.adjacency()
+    n = len(G)
+    distances = [[math.inf] * n for _ in range(n)]
+    predecessors = [[None] * n for _ in range(n)]
+
+    for u in range(n):
+        for edge in range(offsets[u], offsets[u+1]):
+            distances[u][targets[edge]] = weights[edge]
+            predecessors[u][targets[edge]] = u
+
+    for k in range(n):
+        row_k = distances[k]
+        pred_k = predecessors[k]
+        for i in range(n):
+            row_i = distances[i]
+            d_ik = row_i[k]
+            if d_ik == math.inf:
+                continue
+            pred_i = predecessors[i]
+            for j in range(n):
+                if row_i[j] > d_ik + row_k[j]:
+                    row_i[j] = d_ik + row_k[j]
+                    pred_i[j] = pred_k[j]
+
+    ids = G.ids
+    return ({ids[i]: dict(zip(ids, distances[i])) for i in range(n)},
+            {ids[i]: {ids[j]: (ids[p] if p is not None else None) for j, p in enumerate(predecessors[i])} for i in range(n)})
+
+
+def floyd_warshall_blocked(G, block_size=128, dtype=np.float64):
+    """
+    Array-based Floyd-Warshall on the dense ids of a CSRGraph.
+
+    Pivots are processed a block at a time: first the pivot tile, then the tiles in its row
+    and column, then every other tile, each tile relaxing all of its cells against one pivot
+    per numpy operation. A tile is small enough to stay in cache for the whole block of pivots.
+
+    Args:
+        G (CSRGraph or networkx.MultiDiGraph): The bus network.
+        block_size (int): Side of a tile.
+        dtype: Type of the distance matrix.
+
+    Returns:
+        tuple: (distances, predecessors) n x n arrays indexed by dense id (ascending StopId).
+        distances[i, i] is 0, predecessors is int32 with -1 where there is no path.
+    """
+
+    if not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    n = len(G)
+
+    distances = np.full((n, n), np.inf, dtype=dtype)
+    predecessors = np.full((n, n), -1, dtype=np.int32)
+    sources = np.repeat(np.arange(n, dtype=np.int32), np.diff(G.offsets))
+    distances[sources, G.targets] = G.weights
+    predecessors[sources, G.targets] = sources
+    np.fill_diagonal(distances, 0)
+    np.fill_diagonal(predecessors, -1)
+
+    blocks = [slice(lo, min(lo+block_size, n)) for lo in range(0, n, block_size)]
+    for pivots in blocks:
+        _floyd_warshall_tile(distances, predecessors, pivots, pivots, pivots)
+        for other in blocks:
+            if other != pivots:
+                _floyd_warshall_tile(distances, predecessors, pivots, other, pivots)
+                _floyd_warshall_tile(distances, predecessors, other, pivots, pivots)
+        for rows in blocks:
+            if rows == pivots:
+                continue
+            for cols in blocks:
+                if cols != pivots:
+                    _floyd_warshall_tile(distances, predecessors, rows, cols, pivots)
+
+    return distances, predecessors
+
+
+def _floyd_warshall_tile(distances, predecessors, rows, cols, pivots):
+    # Relaxes tile (rows, cols) through every pivot in turn, in place
+    tile = distances[rows, cols]
+    tile_pred = predecessors[rows, cols]
+    for k in range(pivots.start, pivots.stop):
+        candidate = distances[rows, k, None] + distances[k, None, cols]
+        better = candidate < tile
+        if better.any():
+            np.copyto(tile, candidate, where=better)
+            np.copyto(tile_pred, np.broadcast_to(predecessors[k, cols], tile_pred.shape), where=better)
+
+
 def dijkstra_shortest_path_fibo(G, start_stop):
+    if isinstance(G, CSRGraph):
+        return _dijkstra_shortest_path_fibo_csr(G, start_stop)
+
     distances = {node: float('inf') for node in G.nodes()}
     distances[start_stop] = 0
     
     priority_queue = FibonacciHeap()
-    node_handles = {}
     predecessors = {node: None for node in G.nodes()}
     
-    for node in G.nodes():
-        node_handles[node] = priority_queue.insert(distances[node], node)
+    # Nodes are inserted when first reached rather than all up front
+    node_handles = {start_stop: priority_queue.insert(0, start_stop)}
     
     while not priority_queue.is_empty():
         current_node = priority_queue.extract_min().value
@@ -183,12 +638,33 @@ def dijkstra_shortest_path_fibo(G, start_stop):
                 distances[neighbor] = distance
                 predecessors[neighbor] = (current_node, neighbor, edge_key)
                 
-                priority_queue.decrease_key(node_handles[neighbor], distance)
+                if neighbor in node_handles:
+                    priority_queue.decrease_key(node_handles[neighbor], distance)
+                else:
+                    node_handles[neighbor] = priority_queue.insert(distance, neighbor)
 
     return predecessors, distances
 
 
-def dijkstra_shortest_path_edge(G, start_stop, end_stop):
+def _dijkstra_shortest_path_fibo_csr(G, start_stop):
+    distances, pred_node, pred_edge = shortest_path_tree(G, G.index[start_stop], queue=FibonacciQueue())
+
+    ids, keys = G.ids, G.keys
+    predecessors = dict.fromkeys(ids)
+    for node, edge in enumerate(pred_edge):
+        if edge >= 0:
+            predecessors[ids[node]] = (ids[pred_node[node]], ids[node], keys[edge])
+    return predecessors, dict(zip(ids, distances))
+
+
+def dijkstra_shortest_path_edge(G, start_stop, end_stop, queue=None, cache=None):
+    if cache is not None:
+        return cache.shortest_path_edge(G, start_stop, end_stop)
+    if queue is not None and not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    if isinstance(G, CSRGraph):
+        return _dijkstra_shortest_path_edge_csr(G, start_stop, end_stop, queue)
+
     distances = {node: float('inf') for node in G.nodes()}
     distances[start_stop] = 0
     
@@ -225,10 +701,263 @@ def dijkstra_shortest_path_edge(G, start_stop, end_stop):
     return shortest_edge_path, distances[end_stop]
 
 
-def export_path(file_path, G, start_stop, end_stop, stops, paths):
-    shortest_path_edge, _ = dijkstra_shortest_path_edge(G, start_stop, end_stop)
+def _dijkstra_shortest_path_edge_csr(G, start_stop, end_stop, queue=None):
+    target = G.index[end_stop]
+    distances, pred_node, pred_edge = shortest_path_tree(G, G.index[start_stop], target, queue)
+    return _csr_edge_path(G, pred_node, pred_edge, target), distances[target]
+
+
+def _csr_edge_path(G, pred_node, pred_edge, target):
+    # Walks dense predecessors back from target into [(StopId, key), ...] from the origin
+    ids, keys = G.ids, G.keys
+    shortest_edge_path = []
+    node = target
+    while pred_edge[node] >= 0:
+        shortest_edge_path.append((ids[pred_node[node]], keys[pred_edge[node]]))
+        node = pred_node[node]
+
+    shortest_edge_path.reverse()
+    return shortest_edge_path
+
+
+def bidirectional_dijkstra(G, start_stop, end_stop, queue=None):
+    """
+    Single-pair Dijkstra growing one ball from each end, forward from start_stop on G and
+    backward from end_stop on the reverse adjacency. No preprocessing is needed.
+
+    Args:
+        G (networkx.MultiDiGraph or CSRGraph): The bus network.
+        start_stop: StopId of the origin.
+        end_stop: StopId of the destination.
+        queue: Priority queue following the protocol in priority_queue.py for the forward
+            search, the backward one runs on a copy of it. None runs on inline heapqs.
+
+    Returns:
+        tuple: (predecessors, time) like dijkstra_one_dest_shortest_path. Walking the
+        predecessors back from end_stop gives the fastest path.
+    """
+
+    forward, path = _bidirectional_search(G, start_stop, end_stop, queue)
+    predecessors = dict.fromkeys(G.nodes())
+    predecessors.update(forward)
+    for u, v, key, _ in path or []:
+        predecessors[v] = (u, key)
+    return predecessors, _path_time(path)
+
+
+def bidirectional_dijkstra_edge(G, start_stop, end_stop, queue=None):
+    """
+    Bidirectional version of dijkstra_shortest_path_edge.
+
+    Args:
+        G (networkx.MultiDiGraph or CSRGraph): The bus network.
+        start_stop: StopId of the origin.
+        end_stop: StopId of the destination.
+        queue: Priority queue as in bidirectional_dijkstra.
+
+    Returns:
+        tuple: ([(StopId, (route_id, var_id)), ...], time) like dijkstra_shortest_path_edge.
+    """
+
+    _, path = _bidirectional_search(G, start_stop, end_stop, queue)
+    return [(u, key) for u, _, key, _ in path or []], _path_time(path)
+
+
+def _path_time(path):
+    # Summed edge by edge from the origin, the same order Dijkstra accumulates in
+    if path is None:
+        return math.inf
+    time = 0
+    for _, _, _, weight in path:
+        time += weight
+    return time
+
+
+def _bidirectional_search(G, start_stop, end_stop, queue=None):
+    # Returns (forward predecessors, [(u, v, key, Time), ...] from start_stop) with the path
+    # None when end_stop cannot be reached
+    if queue is not None:
+        if not isinstance(G, CSRGraph):
+            G = CSRGraph.from_graph(G)
+        return _bidirectional_search_queue(G, start_stop, end_stop, queue)
+    if isinstance(G, CSRGraph):
+        return _bidirectional_search_csr(G, start_stop, end_stop)
+
+    adjacency = (G.succ, G.pred)
+    distances = ({start_stop: 0}, {end_stop: 0})
+    links = ({}, {})
+    queues = ([(0, start_stop)], [(0, end_stop)])
+    best = 0 if start_stop == end_stop else math.inf
+    meet = start_stop if start_stop == end_stop else None
+
+    while queues[0] and queues[1]:
+        # Any path not seen yet is at least as long as the two queue heads together
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+        current_distance, current_node = heappop(queues[side])
+        distance_side, other_side, link = distances[side], distances[1-side], links[side]
+        if current_distance > distance_side[current_node]:
+            continue
+
+        for neighbor, edges in adjacency[side][current_node].items():
+            key = min(edges, key=lambda x: edges[x]['Time'])
+            distance = current_distance + edges[key]['Time']
+            if distance < distance_side.get(neighbor, math.inf):
+                distance_side[neighbor] = distance
+                link[neighbor] = (current_node, key)
+                heappush(queues[side], (distance, neighbor))
+                if neighbor in other_side and distance + other_side[neighbor] < best:
+                    best = distance + other_side[neighbor]
+                    meet = neighbor
+
+    if meet is None:
+        return links[0], None
+
+    path = []
+    node = meet
+    while node in links[0]:
+        u, key = links[0][node]
+        path.append((u, node, key, G[u][node][key]['Time']))
+        node = u
+    path.reverse()
+    node = meet
+    while node in links[1]:
+        v, key = links[1][node]
+        path.append((node, v, key, G[node][v][key]['Time']))
+        node = v
+    return links[0], path
+
+
+def _bidirectional_search_csr(G, start_stop, end_stop):
+    source = G.index[start_stop]
+    target = G.index[end_stop]
+    adjacency = (G.adjacency(), G.reverse().adjacency())
+    distances = ([math.inf] * len(G), [math.inf] * len(G))
+    distances[0][source] = 0
+    distances[1][target] = 0
+    links = ({}, {})
+    queues = ([(0, source)], [(0, target)])
+    best = 0 if source == target else math.inf
+    meet = source if source == target else -1
+
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+        current_distance, current_node = heappop(queues[side])
+        distance_side, other_side, link = distances[side], distances[1-side], links[side]
+        if current_distance > distance_side[current_node]:
+            continue
+
+        offsets, targets, weights = adjacency[side]
+        for edge in range(offsets[current_node], offsets[current_node+1]):
+            neighbor = targets[edge]
+            distance = current_distance + weights[edge]
+            if distance < distance_side[neighbor]:
+                distance_side[neighbor] = distance
+                link[neighbor] = (current_node, edge)
+                heappush(queues[side], (distance, neighbor))
+                if distance + other_side[neighbor] < best:
+                    best = distance + other_side[neighbor]
+                    meet = neighbor
+
+    return _csr_bidirectional_path(G, adjacency, links, meet)
+
+
+def _bidirectional_search_queue(G, start_stop, end_stop, queue):
+    # _bidirectional_search_csr on queue and a copy of it, peek stands in for looking at the
+    # head of a heapq list
+    source = G.index[start_stop]
+    target = G.index[end_stop]
+    adjacency = (G.adjacency(), G.reverse().adjacency())
+    distances = ([math.inf] * len(G), [math.inf] * len(G))
+    distances[0][source] = 0
+    distances[1][target] = 0
+    links = ({}, {})
+    queue.clear()
+    queues = (queue, copy.deepcopy(queue))
+    queues[0].push(0, source)
+    queues[1].push(0, target)
+    best = 0 if source == target else math.inf
+    meet = source if source == target else -1
+
+    while queues[0] and queues[1]:
+        heads = (queues[0].peek()[0], queues[1].peek()[0])
+        if heads[0] + heads[1] >= best:
+            break
+        side = 0 if heads[0] <= heads[1] else 1
+        current_distance, current_node = queues[side].pop()
+        distance_side, other_side, link = distances[side], distances[1-side], links[side]
+
+        offsets, targets, weights = adjacency[side]
+        for edge in range(offsets[current_node], offsets[current_node+1]):
+            neighbor = targets[edge]
+            distance = current_distance + weights[edge]
+            if distance < distance_side[neighbor]:
+                if distance_side[neighbor] == math.inf:
+                    queues[side].push(distance, neighbor)
+                else:
+                    queues[side].decrease_key(neighbor, distance)
+                distance_side[neighbor] = distance
+                link[neighbor] = (current_node, edge)
+                if distance + other_side[neighbor] < best:
+                    best = distance + other_side[neighbor]
+                    meet = neighbor
+
+    return _csr_bidirectional_path(G, adjacency, links, meet)
+
+
+def _csr_bidirectional_path(G, adjacency, links, meet):
+    # Joins the two search trees at meet, the return value of _bidirectional_search
+    ids = G.ids
+    keys = (G.keys, G.reverse().keys)
+    weights = (adjacency[0][2], adjacency[1][2])
+    forward = {ids[v]: (ids[u], keys[0][edge]) for v, (u, edge) in links[0].items()}
+    if meet < 0:
+        return forward, None
+
+    path = []
+    node = meet
+    while node in links[0]:
+        u, edge = links[0][node]
+        path.append((ids[u], ids[node], keys[0][edge], weights[0][edge]))
+        node = u
+    path.reverse()
+    node = meet
+    while node in links[1]:
+        v, edge = links[1][node]
+        path.append((ids[node], ids[v], keys[1][edge], weights[1][edge]))
+        node = v
+    return forward, path
+
+
+def export_path(file_path, G, start_stop, end_stop, stops, paths, search=None):
+    """
+    Writes the fastest path between two stops to a GeoJSON LineString.
+
+    Args:
+        file_path (str): The path to the output GeoJSON file.
+        G (networkx.MultiDiGraph or CSRGraph): The bus network.
+        start_stop, end_stop: StopIds of the origin and destination.
+        stops (dict): StopId -> Stop.
+        paths (dict): (RouteId, RouteVarId) -> Path.
+        search (callable): Single-pair search returning ([(StopId, key), ...], time), defaults
+            to dijkstra_shortest_path_edge.
+    """
+
+    search = search or dijkstra_shortest_path_edge
+    shortest_path_edge, _ = search(G, start_stop, end_stop)
+    # Each hop ends where the next one starts, the last one at end_stop
+    heads = [u for u, _ in shortest_path_edge[1:]] + [end_stop]
+    shortest_path_edge = [(u, v, key) for (u, key), v in zip(shortest_path_edge, heads)]
     full_path = []
     for edge in shortest_path_edge:
+        if edge[2] == TRANSFER_KEY:
+            # Walks follow no polyline, draw them as a straight line between the two stops
+            full_path.append((stops[edge[0]].get_lng(), stops[edge[0]].get_lat()))
+            full_path.append((stops[edge[1]].get_lng(), stops[edge[1]].get_lat()))
+            continue
         route_id, var_id = edge[2]
         start_x, start_y = conv.convert(stops[edge[0]].get_lng(), stops[edge[0]].get_lat())
         end_x, end_y = conv.convert(stops[edge[1]].get_lng(), stops[edge[1]].get_lat())
@@ -284,7 +1013,16 @@ def all_pair_shortest_paths_fibo(G):
     return predecessors, distances
 
 
-def a_star(G, start_stop, end_stop):
+def a_star(G, start_stop, end_stop, landmarks=None, cache=None, queue=None):
+    if cache is not None:
+        return cache.one_dest_shortest_path(G, start_stop, end_stop)
+    if landmarks is not None:
+        return landmarks.a_star(G, start_stop, end_stop, queue=queue)
+    if queue is not None and not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    if isinstance(G, CSRGraph):
+        return _a_star_csr(G, start_stop, end_stop, queue)
+
     distances = {node: float('inf') for node in G.nodes()}
     distances[start_stop] = 0
     
@@ -319,37 +1057,324 @@ def a_star(G, start_stop, end_stop):
     return predecessors, true_distance
 
 
+def _a_star_csr(G, start_stop, end_stop, queue=None):
+    offsets, targets, weights = G.adjacency()
+    x, y = G.coordinates()
+    source = G.index[start_stop]
+    target = G.index[end_stop]
+    target_x, target_y = x[target], y[target]
+
+    distances = [math.inf] * len(G)
+    distances[source] = 0
+    pred_node = [-1] * len(G)
+    pred_edge = [-1] * len(G)
+
+    if queue is None:
+        priority_queue = [(0, source)]
+        while priority_queue:
+            current_distance, current_node = heappop(priority_queue)
+
+            if current_node == target:
+                break
+
+            current_h = conv.manhattan_distance(x[current_node], y[current_node], target_x, target_y)
+            for edge in range(offsets[current_node], offsets[current_node+1]):
+                neighbor = targets[edge]
+                distance = current_distance + weights[edge]
+                if distance < distances[neighbor]:
+                    distances[neighbor] = distance
+                    pred_node[neighbor] = current_node
+                    pred_edge[neighbor] = edge
+                    heappush(priority_queue, (distance + conv.manhattan_distance(x[neighbor], y[neighbor], target_x, target_y)-current_h, neighbor))
+    else:
+        # The same search on a queue, a node whose distance improves after it was popped
+        # goes back in, as the heapq version pushes it again
+        queue.clear()
+        queue.push(0, source)
+        while queue:
+            current_distance, current_node = queue.pop()
+
+            if current_node == target:
+                break
+
+            current_h = conv.manhattan_distance(x[current_node], y[current_node], target_x, target_y)
+            for edge in range(offsets[current_node], offsets[current_node+1]):
+                neighbor = targets[edge]
+                distance = current_distance + weights[edge]
+                if distance < distances[neighbor]:
+                    distances[neighbor] = distance
+                    pred_node[neighbor] = current_node
+                    pred_edge[neighbor] = edge
+                    priority = distance + conv.manhattan_distance(x[neighbor], y[neighbor], target_x, target_y)-current_h
+                    if neighbor in queue:
+                        queue.decrease_key(neighbor, priority)
+                    else:
+                        queue.push(priority, neighbor)
+
+    true_distance = 0
+    node = target
+    while pred_edge[node] >= 0:
+        true_distance += weights[pred_edge[node]]
+        node = pred_node[node]
+
+    return _csr_predecessors(G, pred_node, pred_edge, dict.fromkeys(G.ids)), true_distance
+
+
 def heuristic(G, node, end_stop):
     # return conv.cartesian_distance(G.nodes[node]['x'], G.nodes[node]['y'], G.nodes[end_stop]['x'], G.nodes[end_stop]['y'])
     return conv.manhattan_distance(G.nodes[node]['x'], G.nodes[node]['y'], G.nodes[end_stop]['x'], G.nodes[end_stop]['y'])
 
-def stress_centrality(G, endpoint = False):
+def stress_centrality(G, endpoint = False, workers = 1, progress = None, queue = None):
+    # queue: runs every source on it rather than an inline heapq, see priority_queue.py
+    kernel = _stress_kernel(queue)
+    if workers != 1:
+        return _stress_centrality_parallel(G, kernel, endpoint, workers, progress)
+    if queue is not None and not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    if isinstance(G, CSRGraph):
+        return _stress_centrality_csr(G, kernel, endpoint, progress)
+
     stress = dict.fromkeys(G, 0.0)  
-    for s in G:
+    for done, s in enumerate(G, 1):
 
         S, P, sigma, _ = stress_dijkstra(G, s)
         if endpoint:
             stress, _ = accumulate_endpoint(stress, S, P, sigma, s)
         else:
             stress, _ = accumulate(stress, S, P, sigma, s)
+        if progress is not None:
+            progress(done, len(G))
 
     return stress
 
 
-def stress_centrality_fibo(G, endpoint = False):
+def stress_centrality_fibo(G, endpoint = False, workers = 1, progress = None):
+    if workers != 1:
+        return _stress_centrality_parallel(G, _stress_dijkstra_fibo_csr, endpoint, workers, progress)
+    if isinstance(G, CSRGraph):
+        return _stress_centrality_csr(G, _stress_dijkstra_fibo_csr, endpoint, progress)
+
     stress = dict.fromkeys(G, 0.0)  
-    for s in G:
+    for done, s in enumerate(G, 1):
 
         S, P, sigma, _ = stress_dijkstra_fibo(G, s)
         if endpoint:
             stress, _ = accumulate_endpoint(stress, S, P, sigma, s)
         else:
             stress, _ = accumulate(stress, S, P, sigma, s)
+        if progress is not None:
+            progress(done, len(G))
 
     return stress
 
 
-def stress_dijkstra(G, s):
+def _stress_kernel(queue):
+    # The dense stress Dijkstra for stress_centrality and approximate_stress_centrality, a
+    # partial keeps it picklable for the worker pool
+    if queue is None:
+        return _stress_dijkstra_csr
+    return partial(_stress_dijkstra_queue, queue=queue)
+
+
+def _stress_centrality_csr(G, stress_dijkstra_csr, endpoint, progress=None):
+    # Path counts are summed as exact integers and converted once, like the parallel version
+    stress = [0] * len(G)
+    for s in range(len(G)):
+        S, P, sigma, _ = stress_dijkstra_csr(G, s)
+        if endpoint:
+            stress[s] += len(S)-1
+        _accumulate_csr(stress, S, P, sigma, s)
+        if progress is not None:
+            progress(s+1, len(G))
+
+    return dict(zip(G.ids, map(float, stress)))
+
+
+def _stress_centrality_parallel(G, stress_dijkstra_csr, endpoint, workers, progress, interval=1.0):
+    # Every worker takes a strided shard of the sources and sums them into its own integer
+    # stress vector, the vectors are added up once all shards are done. Integer sums are
+    # exact in any order, so the result is the same as the serial CSR accumulation (also in
+    # integers) bit for bit.
+    if not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    workers = workers or os.cpu_count() or 1
+    n = len(G)
+    counter = multiprocessing.Value('q', 0)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_stress_worker,
+                             initargs=(G, stress_dijkstra_csr, endpoint, counter)) as executor:
+        futures = [executor.submit(_stress_shard, shard, workers) for shard in range(workers)]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=interval)
+            if progress is not None:
+                progress(counter.value, n)
+
+        stress = [0] * n
+        for future in futures:
+            for node, value in enumerate(future.result()):
+                stress[node] += value
+
+    return dict(zip(G.ids, map(float, stress)))
+
+
+# Per-process state of the stress centrality worker pool
+_stress_worker = {}
+
+
+def _init_stress_worker(G, stress_dijkstra_csr, endpoint, counter):
+    _stress_worker.update(graph=G, kernel=stress_dijkstra_csr, endpoint=endpoint, counter=counter)
+
+
+def _stress_shard(shard, shards):
+    G = _stress_worker['graph']
+    kernel = _stress_worker['kernel']
+    counter = _stress_worker['counter']
+    stress = [0] * len(G)
+    for s in range(shard, len(G), shards):
+        S, P, sigma, _ = kernel(G, s)
+        if _stress_worker['endpoint']:
+            stress[s] += len(S)-1
+        _accumulate_csr(stress, S, P, sigma, s)
+        with counter.get_lock():
+            counter.value += 1
+    return stress
+
+
+def approximate_stress_centrality(G, k=10, endpoint=False, epsilon=0.05, confidence=0.95, max_samples=None,
+                                  time_budget=None, method='uniform', batch_size=32, seed=None, queue=None):
+    """
+    Estimates stress centrality from a sample of source stops instead of all of them.
+
+    Every sampled source adds the stress of its own shortest-path DAG, scaled so the total is
+    an unbiased estimate of stress_centrality. Sources are drawn in batches and sampling stops
+    after a batch once the k highest estimates are separated from the rest by their confidence
+    intervals, or once the top k ranking is unchanged from the previous batch and every top k
+    interval is within epsilon of its estimate, or once the sample or time budget is spent.
+
+    Args:
+        G (CSRGraph or networkx.MultiDiGraph): The bus network.
+        k (int): Size of the ranking the stopping rule watches.
+        endpoint (bool): Count paths at their endpoints, as in stress_centrality.
+        epsilon (float): Target half-width of the top k intervals, relative to the estimate.
+        confidence (float): Confidence level of the intervals.
+        max_samples (int or None): Most sources to run, None for every stop.
+        time_budget (float or None): Seconds after which no further source is started.
+        method (str): 'uniform' draws sources without replacement, so sampling every stop gives
+            the exact result. 'degree' draws them with replacement in proportion to their
+            out-degree plus one and reweights each one by its draw probability.
+        batch_size (int): Sources run between two checks of the stopping rule.
+        seed (int or None): Seed of the source sampler.
+        queue: Priority queue following the protocol in priority_queue.py to run every source
+            on, None for an inline heapq.
+
+    Returns:
+        tuple: (stress, intervals, samples), estimated stress per StopId, (low, high) interval
+        per StopId and the number of sources that were run.
+    """
+
+    return _approximate_stress_centrality(G, _stress_kernel(queue), k, endpoint, epsilon, confidence, max_samples,
+                                          time_budget, method, batch_size, seed)
+
+
+def approximate_stress_centrality_fibo(G, k=10, endpoint=False, epsilon=0.05, confidence=0.95, max_samples=None,
+                                       time_budget=None, method='uniform', batch_size=32, seed=None):
+    return _approximate_stress_centrality(G, _stress_dijkstra_fibo_csr, k, endpoint, epsilon, confidence, max_samples,
+                                          time_budget, method, batch_size, seed)
+
+
+def _approximate_stress_centrality(G, stress_dijkstra_csr, k, endpoint, epsilon, confidence, max_samples,
+                                   time_budget, method, batch_size, seed):
+    if not isinstance(G, CSRGraph):
+        G = CSRGraph.from_graph(G)
+    n = len(G)
+    rng = random.Random(seed)
+    max_samples = n if max_samples is None else max_samples
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    if method == 'uniform':
+        max_samples = min(max_samples, n)
+        order = rng.sample(range(n), max_samples)
+        sources = [(s, n) for s in order]
+    elif method == 'degree':
+        weights = np.diff(G.offsets) + 1
+        probabilities = (weights / weights.sum()).tolist()
+        order = rng.choices(range(n), weights=weights.tolist(), k=max_samples)
+        sources = [(s, 1 / probabilities[s]) for s in order]
+    else:
+        raise ValueError(f"Unknown sampling method: {method}")
+
+    # Running sums of the scaled per-source contributions and of their squares
+    total = np.zeros(n)
+    squares = np.zeros(n)
+    samples = 0
+    previous = None
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    estimate = half_width = np.zeros(n)
+
+    while samples < len(sources):
+        batch = []
+        for s, scale in sources[samples:samples+batch_size]:
+            if deadline is not None and samples >= 2 and time.perf_counter() > deadline:
+                break
+            contribution = [0] * n
+            S, P, sigma, _ = stress_dijkstra_csr(G, s)
+            if endpoint:
+                contribution[s] += len(S)-1
+            _accumulate_csr(contribution, S, P, sigma, s)
+            batch.append(np.multiply(contribution, scale, dtype=np.float64))
+            samples += 1
+        if batch:
+            batch = np.array(batch)
+            total += batch.sum(axis=0)
+            squares += (batch * batch).sum(axis=0)
+
+        estimate = total / samples
+        if samples < 2:
+            half_width = np.full(n, np.inf)
+            continue
+        variance = np.maximum(squares / samples - estimate * estimate, 0) * samples / (samples-1)
+        # Finite population correction, without replacement the error vanishes at samples == n
+        correction = 1 - samples / n if method == 'uniform' else 1
+        half_width = z * np.sqrt(variance / samples * correction)
+
+        ranking = np.argsort(-estimate, kind='stable')
+        top, rest = ranking[:k], ranking[k:]
+        separated = len(rest) == 0 or (estimate[top] - half_width[top]).min() >= (estimate[rest] + half_width[rest]).max()
+        tight = bool(np.all(half_width[top] <= epsilon * estimate[top]))
+        stable = previous is not None and np.array_equal(previous, top)
+        previous = top
+        if separated or (tight and stable):
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+
+    low = np.maximum(estimate - half_width, 0)
+    high = estimate + half_width
+    stress = dict(zip(G.ids, estimate.tolist()))
+    intervals = dict(zip(G.ids, zip(low.tolist(), high.tolist())))
+    return stress, intervals, samples
+
+
+def _accumulate_csr(stress, S, P, sigma, s):
+    delta = [0] * len(stress)
+    while S:
+        w = S.pop()
+        for v in P[w]:
+            delta[v] += 1 + delta[w]
+        if w != s:
+            stress[w] += sigma[w]*delta[w]
+    return stress, delta
+
+
+def stress_dijkstra(G, s, queue=None):
+    if queue is not None:
+        if not isinstance(G, CSRGraph):
+            G = CSRGraph.from_graph(G)
+        return _csr_stress_result(G, *_stress_dijkstra_queue(G, G.index[s], queue))
+    if isinstance(G, CSRGraph):
+        return _csr_stress_result(G, *_stress_dijkstra_csr(G, G.index[s]))
+
     S = []
     P = {}
     for v in G:
@@ -384,7 +1409,90 @@ def stress_dijkstra(G, s):
     return S, P, sigma, D
 
 
+def _stress_dijkstra_csr(G, s):
+    offsets, targets, weights = G.adjacency()
+    n = len(G)
+    S = []
+    P = [[] for _ in range(n)]
+    sigma = [0] * n
+    seen = [math.inf] * n
+    settled = [False] * n
+    sigma[s] = 1
+    seen[s] = 0
+    Q = [(0, s, s)]
+    while Q:
+        (dist, pred, v) = heappop(Q)
+        if settled[v]:
+            continue
+        sigma[v] += sigma[pred]
+        S.append(v)
+        settled[v] = True
+        for edge in range(offsets[v], offsets[v+1]):
+            w = targets[edge]
+            vw_dist = dist + weights[edge]
+            if not settled[w] and vw_dist < seen[w]:
+                seen[w] = vw_dist
+                heappush(Q, (vw_dist, v, w))
+                sigma[w] = 0
+                P[w] = [v]
+            elif vw_dist == seen[w]:
+                sigma[w] += sigma[v]
+                P[w].append(v)
+
+    # seen holds the settled distance of every node in S
+    return S, P, sigma, seen
+
+
+def _stress_dijkstra_queue(G, s, queue):
+    # _stress_dijkstra_csr on a queue with decrease-key, (dist, pred) priorities keep the
+    # (dist, pred, v) pop order of the heapq version
+    offsets, targets, weights = G.adjacency()
+    n = len(G)
+    S = []
+    P = [[] for _ in range(n)]
+    sigma = [0] * n
+    seen = [math.inf] * n
+    settled = [False] * n
+    sigma[s] = 1
+    seen[s] = 0
+    queue.clear()
+    queue.push((0, s), s)
+    while queue:
+        (dist, pred), v = queue.pop()
+        sigma[v] += sigma[pred]
+        S.append(v)
+        settled[v] = True
+        for edge in range(offsets[v], offsets[v+1]):
+            w = targets[edge]
+            vw_dist = dist + weights[edge]
+            if not settled[w] and vw_dist < seen[w]:
+                if seen[w] == math.inf:
+                    queue.push((vw_dist, v), w)
+                else:
+                    queue.decrease_key(w, (vw_dist, v))
+                seen[w] = vw_dist
+                sigma[w] = 0
+                P[w] = [v]
+            elif vw_dist == seen[w]:
+                sigma[w] += sigma[v]
+                P[w].append(v)
+
+    return S, P, sigma, seen
+
+
+def _csr_stress_result(G, S, P, sigma, seen):
+    # Translates the dense stress_dijkstra state back to the StopId-keyed form
+    ids = G.ids
+    return ([ids[v] for v in S],
+            {ids[v]: [ids[u] for u in P[v]] for v in range(len(G))},
+            dict(zip(ids, sigma)),
+            {ids[v]: seen[v] for v in S})
+
+
 def stress_dijkstra_fibo(G, s):
+    if isinstance(G, CSRGraph):
+        return _csr_stress_result(G, *_stress_dijkstra_fibo_csr(G, G.index[s]))
+
     S = []
     P = {}
     for v in G:
@@ -420,6 +1528,40 @@ def stress_dijkstra_fibo(G, s):
     return S, P, sigma, D
 
 
+def _stress_dijkstra_fibo_csr(G, s):
+    offsets, targets, weights = G.adjacency()
+    n = len(G)
+    S = []
+    P = [[] for _ in range(n)]
+    sigma = [0] * n
+    seen = [math.inf] * n
+    settled = [False] * n
+    sigma[s] = 1
+    seen[s] = 0
+    Q = FibonacciHeap()
+    Q.insert(0, s)
+    while not Q.is_empty():
+        current_node = Q.extract_min().value
+        if settled[current_node]:
+            continue
+        S.append(current_node)
+        settled[current_node] = True
+        for edge in range(offsets[current_node], offsets[current_node+1]):
+            neighbor = targets[edge]
+            vw_dist = seen[current_node] + weights[edge]
+
+            if not settled[neighbor] and vw_dist < seen[neighbor]:
+                seen[neighbor] = vw_dist
+                Q.insert(vw_dist, neighbor)
+                sigma[neighbor] = 0
+                P[neighbor] = [current_node]
+            elif vw_dist == seen[neighbor]:
+                sigma[neighbor] += sigma[current_node]
+                P[neighbor].append(current_node)
+
+    return S, P, sigma, seen
+
+
 def accumulate(stress, S, P, sigma, s):
     delta = dict.fromkeys(S, 0)
     while S:
@@ -443,15 +1585,23 @@ def accumulate_endpoint(stress, S, P, sigma, s):
     return stress, delta
 
 
-def top_k(file_path, G, stops, k=10, endpoint=False):
+def top_k(file_path, G, stops, k=10, endpoint=False, workers=1, progress=None, approximate=None, queue=None):
 
-    load_centrality = stress_centrality(G, endpoint=endpoint)
+    # approximate: True or a dict of approximate_stress_centrality options, writes the
+    # estimate and its confidence interval along with every stop. queue is passed on to
+    # either centrality function
+    intervals = None
+    if approximate:
+        options = approximate if isinstance(approximate, dict) else {}
+        load_centrality, intervals, _ = approximate_stress_centrality(G, k=k, endpoint=endpoint, queue=queue, **options)
+    else:
+        load_centrality = stress_centrality(G, endpoint=endpoint, workers=workers, progress=progress, queue=queue)
     sorted_nodes = sorted(load_centrality.items(), key=lambda x: x[1], reverse=True)
 
     top_nodes = sorted_nodes[:k]
 
     with open(file_path, 'w', encoding='utf-8') as file:
-        for node, _ in top_nodes:
+        for node, value in top_nodes:
             stop = stops[node]
             stop_dict = {
                     'StopId': stop.get_stop_id(),
@@ -469,18 +1619,28 @@ def top_k(file_path, G, stops, k=10, endpoint=False):
                     'Search': stop.get_search(),
                     'Routes': stop.get_routes()
                 }
+            if intervals is not None:
+                stop_dict['Stress'] = value
+                stop_dict['StressInterval'] = list(intervals[node])
             json.dump(stop_dict, file, ensure_ascii=False)
             file.write('\n')
 
-def top_k_fibo(file_path, G, stops, k=10, endpoint=False):
+def top_k_fibo(file_path, G, stops, k=10, endpoint=False, workers=1, progress=None, approximate=None):
 
-    load_centrality = stress_centrality_fibo(G, endpoint=endpoint)
+    # approximate: True or a dict of approximate_stress_centrality_fibo options, writes the
+    # estimate and its confidence interval along with every stop
+    intervals = None
+    if approximate:
+        options = approximate if isinstance(approximate, dict) else {}
+        load_centrality, intervals, _ = approximate_stress_centrality_fibo(G, k=k, endpoint=endpoint, **options)
+    else:
+        load_centrality = stress_centrality_fibo(G, endpoint=endpoint, workers=workers, progress=progress)
     sorted_nodes = sorted(load_centrality.items(), key=lambda x: x[1], reverse=True)
 
     top_nodes = sorted_nodes[:k]
 
     with open(file_path, 'w', encoding='utf-8') as file:
-        for node, _ in top_nodes:
+        for node, value in top_nodes:
             stop = stops[node]
             stop_dict = {
                     'StopId': stop.get_stop_id(),
@@ -498,6 +1658,9 @@ def top_k_fibo(file_path, G, stops, k=10, endpoint=False):
                     'Search': stop.get_search(),
                     'Routes': stop.get_routes()
                 }
+            if intervals is not None:
+                stop_dict['Stress'] = value
+                stop_dict['StressInterval'] = list(intervals[node])
             json.dump(stop_dict, file, ensure_ascii=False)
             file.write('\n')
         
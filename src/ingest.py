@@ -0,0 +1,168 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from graph import _build_variant_task, build_variant, merge_variant
+from paths import Path
+from stops import Stop
+from vars import RouteVar
+
+
+def read_route_vars(file_path):
+    """
+    Streams vars.json.
+
+    Args:
+        file_path (str): The path to vars.json.
+
+    Yields:
+        RouteVar: Every route variant, in file order.
+    """
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            for rv in json.loads(line):
+                yield RouteVar(rv['RouteId'], rv['RouteVarId'], rv['RouteVarName'], rv['RouteVarShortName'],
+                               rv['RouteNo'], rv['StartStop'], rv['EndStop'], rv['Distance'], rv['Outbound'],
+                               rv['RunningTime'])
+
+
+def read_variant_stops(file_path):
+    """
+    Streams stops.json, parsing every line once.
+
+    Args:
+        file_path (str): The path to stops.json.
+
+    Yields:
+        tuple: (route_id, var_id, stop_list) for every line, stop_list being the raw 'Stops'
+        records of the variant in route order.
+    """
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            obj = json.loads(line)
+            yield int(obj['RouteId']), int(obj['RouteVarId']), obj['Stops']
+
+
+def read_paths(file_path):
+    """
+    Streams paths.json.
+
+    Args:
+        file_path (str): The path to paths.json.
+
+    Yields:
+        Path: The polyline of every route variant, in file order.
+    """
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            data = json.loads(line)
+            yield Path(lat=data['lat'], lng=data['lng'], route_id=int(data['RouteId']), var_id=int(data['RouteVarId']))
+
+
+def make_stop(stop_data):
+    return Stop(stop_data['StopId'], stop_data['Code'], stop_data['Name'], stop_data['StopType'],
+                stop_data['Zone'], stop_data['Ward'], stop_data['AddressNo'], stop_data['Street'],
+                stop_data['SupportDisability'], stop_data['Status'], stop_data['Lng'], stop_data['Lat'],
+                stop_data['Search'], stop_data['Routes'])
+
+
+def ingest(routevar_fp, stop_fp, path_fp, G=None, route_vars=None, stops=None, paths=None, workers=1, window=None):
+    """
+    Reads the three input files in one pass each and hands every record to the consumers
+    that were passed in: the route variant registry, the stop registry, the polyline registry
+    and the graph builder.
+
+    stops.json is streamed line by line and each line is joined with its polyline from
+    paths.json as it comes. Unless a paths registry is passed, a polyline is dropped as
+    soon as the edges of its variant have been added to G, so the build holds one polyline at
+    a time (or window of them with workers > 1) when both files list the variants in the
+    same order. Polylines that come early are held until their stops.json line is reached.
+
+    Args:
+        routevar_fp (str): The path to vars.json.
+        stop_fp (str): The path to stops.json.
+        path_fp (str): The path to paths.json.
+        G (networkx.MultiDiGraph): Graph to build as build_graph would, None to skip.
+        route_vars (dict): Filled with (RouteId, RouteVarId) -> RouteVar.
+        stops (dict): Filled with StopId -> Stop, later lines win as in load_stop.
+        paths (dict): Filled with (RouteId, RouteVarId) -> Path.
+        workers (int or None): Processes for the per-variant edge work, 1 builds serially.
+        window (int): Variants in flight with workers > 1, 4 per worker by default.
+
+    Returns:
+        tuple: (route_vars, stops, paths), the registries that were passed in or None.
+    """
+
+    if route_vars is None and G is not None:
+        route_vars = {}
+    if route_vars is not None:
+        for route_var in read_route_vars(routevar_fp):
+            route_vars[route_var.get_route_id(), route_var.get_var_id()] = route_var
+
+    polylines = _Polylines(read_paths(path_fp)) if G is not None or paths is not None else None
+
+    def variants():
+        for route_id, var_id, stop_list in read_variant_stops(stop_fp):
+            if stops is not None:
+                for stop_data in stop_list:
+                    stops[stop_data['StopId']] = make_stop(stop_data)
+            if polylines is None:
+                continue
+            path = polylines.take((route_id, var_id))
+            if paths is not None:
+                paths[route_id, var_id] = path
+            if G is not None:
+                route_var = route_vars[route_id, var_id]
+                yield (route_id, var_id, stop_list, path.get_lng(), path.get_lat(),
+                       route_var.get_running_time(), route_var.get_distance())
+
+    if G is None:
+        for _ in variants():
+            pass
+    elif workers == 1:
+        stop_xy = {}
+        for task in variants():
+            merge_variant(G, build_variant(*task, stop_xy))
+    else:
+        workers = workers or os.cpu_count() or 1
+        for result in _bounded_map(_build_variant_task, variants(), workers, window or 4*workers):
+            merge_variant(G, result)
+
+    return route_vars, stops, paths
+
+
+class _Polylines:
+    # Hands out paths.json records by key, reading ahead only as far as needed
+    def __init__(self, records):
+        self._records = records
+        self._early = {}
+
+    def take(self, key):
+        path = self._early.pop(key, None)
+        while path is None:
+            record = next(self._records, None)
+            if record is None:
+                raise KeyError(f"No polyline for route variant {key}")
+            record_key = (record.get_route_id(), record.get_var_id())
+            if record_key == key:
+                path = record
+            else:
+                self._early[record_key] = record
+        return path
+
+
+def _bounded_map(function, tasks, workers, window):
+    # executor.map would submit every task up front, this keeps at most window in flight
+    # and still yields results in task order
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
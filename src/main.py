@@ -5,16 +5,18 @@ from vars import RouteVar
 from stops import Stop
 from paths import Path
 from graph import *
+from csr import CSRGraph
+from alt import Landmarks
+from snapshot import load_or_build
+from apsp import all_pair_shortest_paths_parallel
+from store import DistanceStore
+from benchmark import run_benchmark
+from ingest import ingest
 import json
-import pickle
 import time
 import sys
 import test
 
-n_bytes = 2**31
-max_bytes = 2**31 - 1
-data = bytearray(n_bytes)
-
 def load_routevar(route_vars, file_path):
     with open(file_path, 'r', encoding="utf-8") as file:
         for line in file:
@@ -48,48 +50,40 @@ def load_path(paths, file_path):
 
 def main(routevar_fp, stop_fp, path_fp):
     
-    route_vars = {}
     stops = {}
-    paths = {}
-    load_routevar(route_vars, routevar_fp)
-    load_stop(stops, stop_fp)
-    load_path(paths, path_fp)
+
+    # Only the stops are needed past this point. They are filled in the same pass that builds
+    # the graph, or from stops.json alone if the snapshot is still fresh
+    def build():
+        G = nx.MultiDiGraph()
+        ingest(routevar_fp, stop_fp, path_fp, G=G, stops=stops)
+        return G
 
     start_time = time.time()
-    G = nx.MultiDiGraph()
-    build_graph(G, route_vars, paths)
+    G = load_or_build('./output/graph.snap', [routevar_fp, stop_fp, path_fp], build).to_graph()
+    if not stops:
+        ingest(routevar_fp, stop_fp, path_fp, stops=stops)
     end_time = time.time()
-    print('Took', end_time-start_time, 'seconds to build graph')
-
-    print('Number of nodes:', len(G.nodes))
+    print('Took', end_time-start_time, 'seconds to load graph')
 
-    fastest = float('inf')
-    longest = 0
-    average = 0
-    itr = 0
-    average_error = 0
-    correct_ratio = 0
-    for node in G.nodes:
-        itr += 1
-        for node2 in G.nodes:
-            
-            start_time = time.time()
-            a_star(G, node, node2)
-            end_time = time.time()
-            time_taken = end_time - start_time
-            average += time_taken
-
-        if itr == 1:     
-            break
+    # Walking transfers are not part of the snapshot, so changing their parameters needs no rebuild
+    start_time = time.time()
+    transfers = add_transfer_edges(G, stops, radius=250.0)
+    end_time = time.time()
+    print('Took', end_time-start_time, 'seconds to add', transfers, 'walking transfer edges')
 
-    print('Took', average, 'seconds to run a_star')
-        
+    print('Number of nodes:', len(G.nodes))
 
-    print('Correct ratio:', correct_ratio/(itr))
-    print('Average error:', average_error/(itr**2))
-    print('Fastest:', fastest)
-    print('Longest:', longest)
-    print('Average:', average/(itr**2))
+    csr = CSRGraph.from_graph(G)
+    report = run_benchmark(csr, algorithms=['dijkstra', 'bidirectional', 'a_star_landmarks'], pairs=1000,
+                           workload='realistic', seed=0, landmarks=Landmarks.build(csr),
+                           file_path='./output/benchmark.json')
+    for name, result in report['algorithms'].items():
+        latency = result['latency']
+        print(name, 'p50:', latency['p50'], 'p95:', latency['p95'], 'p99:', latency['p99'])
+        if 'validation' in result:
+            print(name, 'correct ratio:', result['validation']['correct_ratio'],
+                  'average error:', result['validation']['mean_error'])
 
             
 
@@ -138,15 +132,13 @@ def main(routevar_fp, stop_fp, path_fp):
     # print('Average:', average/len(G.nodes))
 
 
-    # bytes_out = pickle.dumps(shortest_paths)
-    # with open('./output/all_pair.pkl', 'wb') as file:
-    #     for idx in range(0, len(bytes_out), max_bytes):
-    #         file.write(bytes_out[idx:idx+max_bytes])
-    
-    # bytes_out = pickle.dumps(distances)
-    # with open('./output/distances.pkl', 'wb') as file:
-    #     for idx in range(0, len(bytes_out), max_bytes):
-    #         file.write(bytes_out[idx:idx+max_bytes])
+    # csr = CSRGraph.from_graph(G)
+    # start_time = time.time()
+    # store = DistanceStore.create('./output/all_pair.dist', csr.ids)
+    # all_pair_shortest_paths_parallel(csr, store=store, progress=lambda done, total: print(done, '/', total))
+    # store.close()
+    # end_time = time.time()
+    # print('Took', end_time-start_time, 'seconds to store all pair shortest paths')
 
     # start_time = time.time()
     # export_path('./output/geo.json', G, 3, 67, stops, paths)
@@ -0,0 +1,309 @@
+import random
+import time
+from heapq import heappop, heappush
+
+from fibonacci_heap import FibonacciHeap
+
+
+# Every queue here follows the same protocol, which is what the Dijkstra-family functions in
+# graph.py take as their queue argument:
+#
+#   push(priority, item)          insert an item that is not in the queue
+#   decrease_key(item, priority)  lower the priority of an item that is in the queue
+#   pop()                         remove and return (priority, item) with the smallest priority
+#   peek()                        return what pop would, leaving it in the queue
+#   clear()                       empty the queue so it can be reused for the next search
+#   len(queue), item in queue     number of items in the queue, membership
+#
+# Items with equal priorities come out smallest item first, so a search gives the same
+# result whichever queue it runs on.
+#
+# These take a queue: shortest_path_tree, dijkstra_shortest_path, dijkstra_shortest_path_edge,
+# dijkstra_one_dest_shortest_path, bidirectional_dijkstra, bidirectional_dijkstra_edge, a_star
+# (and Landmarks.a_star), stress_dijkstra, stress_centrality, approximate_stress_centrality
+# and top_k. Given a MultiDiGraph they search its CSRGraph view. The stress functions use
+# (time, predecessor) priorities, which DialQueue cannot hold. The *_fibo functions are the
+# same searches pinned to a Fibonacci heap, on a CSRGraph through FibonacciQueue, and take
+# no queue.
+
+
+class IndexedDaryHeap:
+    """
+    Array-backed d-ary min-heap with a position index, giving a true decrease-key.
+
+    Items and priorities live in two parallel lists and a dict maps every item to its
+    slot, so there is one entry per item and no per-entry node objects. A wider heap is
+    shallower, which makes decrease-key cheaper at the cost of comparing more children on pop.
+
+    Attributes:
+        d (int): Number of children per node.
+    """
+
+    def __init__(self, d=4):
+        self.d = d
+        self._items = []
+        self._priorities = []
+        self._position = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._position
+
+    def clear(self):
+        self._items.clear()
+        self._priorities.clear()
+        self._position.clear()
+
+    def push(self, priority, item):
+        self._items.append(item)
+        self._priorities.append(priority)
+        self._sift_up(len(self._items)-1, priority, item)
+
+    def decrease_key(self, item, priority):
+        i = self._position[item]
+        if priority > self._priorities[i]:
+            return
+        self._sift_up(i, priority, item)
+
+    def peek(self):
+        return self._priorities[0], self._items[0]
+
+    def pop(self):
+        items, priorities = self._items, self._priorities
+        item, priority = items[0], priorities[0]
+        del self._position[item]
+        last_item, last_priority = items.pop(), priorities.pop()
+        if items:
+            self._sift_down(0, last_priority, last_item)
+        return priority, item
+
+    def _sift_up(self, i, priority, item):
+        # Moves the hole at i towards the root until (priority, item) fits in it
+        items, priorities, position, d = self._items, self._priorities, self._position, self.d
+        while i > 0:
+            parent = (i-1) // d
+            parent_priority = priorities[parent]
+            if parent_priority < priority or (parent_priority == priority and items[parent] < item):
+                break
+            items[i] = items[parent]
+            priorities[i] = parent_priority
+            position[items[i]] = i
+            i = parent
+        items[i] = item
+        priorities[i] = priority
+        position[item] = i
+
+    def _sift_down(self, i, priority, item):
+        # Moves the hole at i towards the leaves until (priority, item) fits in it
+        items, priorities, position, d = self._items, self._priorities, self._position, self.d
+        n = len(items)
+        while True:
+            first = d*i + 1
+            if first >= n:
+                break
+            best, best_priority, best_item = first, priorities[first], items[first]
+            for child in range(first+1, min(first+d, n)):
+                child_priority = priorities[child]
+                if child_priority < best_priority or (child_priority == best_priority and items[child] < best_item):
+                    best, best_priority, best_item = child, child_priority, items[child]
+            if priority < best_priority or (priority == best_priority and item < best_item):
+                break
+            items[i] = best_item
+            priorities[i] = best_priority
+            position[best_item] = i
+            i = best
+        items[i] = item
+        priorities[i] = priority
+        position[item] = i
+
+
+class LazyHeap:
+    """
+    heapq with lazy deletion, the queue the plain Dijkstra functions use inline.
+
+    decrease_key pushes a second entry for the item and pop skips entries whose priority is
+    no longer the item's current one.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._priority = {}
+
+    def __len__(self):
+        return len(self._priority)
+
+    def __contains__(self, item):
+        return item in self._priority
+
+    def clear(self):
+        self._heap.clear()
+        self._priority.clear()
+
+    def push(self, priority, item):
+        self._priority[item] = priority
+        heappush(self._heap, (priority, item))
+
+    def decrease_key(self, item, priority):
+        if priority < self._priority[item]:
+            self.push(priority, item)
+
+    def peek(self):
+        # Drops the stale entries above the head, pop would skip them anyway
+        heap = self._heap
+        while self._priority.get(heap[0][1]) != heap[0][0]:
+            heappop(heap)
+        return heap[0]
+
+    def pop(self):
+        while True:
+            priority, item = heappop(self._heap)
+            if self._priority.get(item) == priority:
+                del self._priority[item]
+                return priority, item
+
+
+class DialQueue:
+    """
+    Dial's bucket queue for monotone integer priorities, such as Dijkstra on weights scaled
+    with CSRGraph.scaled.
+
+    There is one bucket per priority in a circular array of max_weight + 1 buckets. Every
+    queued priority lies between the last popped one and max_weight above it, so the buckets
+    never wrap onto each other and pop only has to walk the cursor forward, amortized O(1)
+    per pop. decrease_key leaves the old entry behind and pop skips it.
+
+    Attributes:
+        max_weight (int): Largest edge weight, bounds how far ahead of the cursor a priority can be.
+    """
+
+    def __init__(self, max_weight):
+        self.max_weight = int(max_weight)
+        self._buckets = [[] for _ in range(self.max_weight+1)]
+        self._priority = {}
+        self._cursor = 0
+
+    def __len__(self):
+        return len(self._priority)
+
+    def __contains__(self, item):
+        return item in self._priority
+
+    def clear(self):
+        for bucket in self._buckets:
+            bucket.clear()
+        self._priority.clear()
+        self._cursor = 0
+
+    def push(self, priority, item):
+        if not self._cursor <= priority <= self._cursor + self.max_weight:
+            raise ValueError(f"Priority {priority} is outside [{self._cursor}, {self._cursor + self.max_weight}]")
+        self._priority[item] = priority
+        # Buckets are heaps of items so equal priorities pop smallest item first
+        heappush(self._buckets[priority % len(self._buckets)], item)
+
+    def decrease_key(self, item, priority):
+        if priority < self._priority[item]:
+            self.push(priority, item)
+
+    def peek(self):
+        if not self._priority:
+            raise IndexError("peek at an empty queue")
+        buckets, current = self._buckets, self._priority
+        while True:
+            bucket = buckets[self._cursor % len(buckets)]
+            while bucket:
+                if current.get(bucket[0]) == self._cursor:
+                    return self._cursor, bucket[0]
+                heappop(bucket)
+            self._cursor += 1
+
+    def pop(self):
+        if not self._priority:
+            raise IndexError("pop from an empty queue")
+        buckets, current = self._buckets, self._priority
+        while True:
+            bucket = buckets[self._cursor % len(buckets)]
+            while bucket:
+                item = heappop(bucket)
+                if current.get(item) == self._cursor:
+                    del current[item]
+                    return self._cursor, item
+            self._cursor += 1
+
+
+class FibonacciQueue:
+    """
+    FibonacciHeap behind the queue protocol, keeping the node handle of every queued item.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __contains__(self, item):
+        return item in self._handles
+
+    def clear(self):
+        self._heap = FibonacciHeap()
+        self._handles = {}
+
+    def push(self, priority, item):
+        # The item is part of the key so ties break the same way as in the other queues
+        self._handles[item] = self._heap.insert((priority, item), item)
+
+    def decrease_key(self, item, priority):
+        self._heap.decrease_key(self._handles[item], (priority, item))
+
+    def peek(self):
+        return self._heap.find_min().key
+
+    def pop(self):
+        node = self._heap.extract_min()
+        del self._handles[node.value]
+        return node.key
+
+
+def benchmark_queues(n=100000, decreases=4, queues=None, seed=0):
+    """
+    Times a Dijkstra-like workload on each queue: n pushes, about decreases * n decrease-keys
+    interleaved with the pops, then pops until the queue is empty.
+
+    Args:
+        n (int): Number of items.
+        decreases (int): Average decrease-key calls per item.
+        queues (dict): Name -> queue to time, the three queues in this module by default.
+        seed (int): Seed of the workload.
+
+    Returns:
+        dict: Name -> seconds taken.
+    """
+
+    if queues is None:
+        queues = {'dary': IndexedDaryHeap(), 'heapq': LazyHeap(), 'fibonacci': FibonacciQueue()}
+
+    rng = random.Random(seed)
+    priorities = [rng.random() * n for _ in range(n)]
+    # Every pop is followed by a few decrease-keys on random items that are still queued
+    updates = [[rng.randrange(n) for _ in range(rng.randint(0, 2*decreases))] for _ in range(n)]
+
+    timings = {}
+    for name, queue in queues.items():
+        queue.clear()
+        current = list(priorities)
+        start = time.perf_counter()
+        for item, priority in enumerate(current):
+            queue.push(priority, item)
+        step = 0
+        while queue:
+            priority, _ = queue.pop()
+            for item in updates[step]:
+                if item in queue and current[item] > priority:
+                    current[item] = priority + (current[item] - priority) / 2
+                    queue.decrease_key(item, current[item])
+            step += 1
+        timings[name] = time.perf_counter() - start
+    return timings
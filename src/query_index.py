@@ -0,0 +1,125 @@
+import math
+from bisect import bisect_left, bisect_right
+
+
+class HashIndex:
+    """
+    Equality index over one attribute of a list of objects.
+
+    Attributes:
+        normalize (callable): Applied to string values, stored and queried, None to match
+            them as they are.
+    """
+
+    def __init__(self, values, normalize=None):
+        self.normalize = normalize
+        self._positions = {}
+        for i, value in enumerate(values):
+            self._positions.setdefault(self._key(value), []).append(i)
+
+    def _key(self, value):
+        if self.normalize is not None and isinstance(value, str):
+            return self.normalize(value)
+        return value
+
+    def find(self, value):
+        """
+        Returns:
+            list: Positions of the objects whose attribute equals value, ascending.
+        """
+
+        return self._positions.get(self._key(value), [])
+
+
+class SortedIndex:
+    """
+    Sorted index over one numeric attribute of a list of objects, for equality and range
+    queries by binary search. Values that are not numbers are left out, they can match neither,
+    and a query by a value that is not a number matches nothing.
+    """
+
+    def __init__(self, values):
+        pairs = sorted((value, i) for i, value in enumerate(values) if _is_number(value))
+        self._values = [value for value, _ in pairs]
+        self._positions = [i for _, i in pairs]
+
+    def find(self, value):
+        if not _is_number(value):
+            return []
+        return self.range(value, value)
+
+    def range(self, low=None, high=None):
+        """
+        Args:
+            low (float): Smallest value to return, None for no bound.
+            high (float): Largest value to return, None for no bound.
+
+        Returns:
+            list: Positions of the objects whose attribute lies in [low, high], by value.
+        """
+
+        if not all(bound is None or _is_number(bound) for bound in (low, high)):
+            return []
+        start = 0 if low is None else bisect_left(self._values, low)
+        end = len(self._values) if high is None else bisect_right(self._values, high)
+        return self._positions[start:end]
+
+
+def indexed_search(objects, indexes, attr, get, normalize=None):
+    """
+    Answers a conjunctive query, every attribute in attr must match.
+
+    Indexed attributes each give a candidate list, which are intersected smallest first so
+    the work is bounded by the most selective one. Attributes without an index are then
+    checked on the survivors only.
+
+    Args:
+        objects (list): The indexed objects.
+        indexes (dict): Attribute name -> HashIndex or SortedIndex over objects.
+        attr (dict): Attribute name -> value to match, or a (low, high) tuple for a range,
+            either bound None for open.
+        get (callable): get(obj, name) returns the attribute of an object.
+        normalize (callable): Applied to both sides when comparing strings without an index.
+
+    Returns:
+        list: The matching objects, in the order of objects.
+    """
+
+    candidates = []
+    rest = []
+    for key, value in attr.items():
+        index = indexes.get(key)
+        if isinstance(value, tuple) and isinstance(index, SortedIndex):
+            candidates.append(index.range(*value))
+        elif index is not None and not isinstance(value, tuple):
+            candidates.append(index.find(value))
+        else:
+            rest.append((key, value))
+
+    if candidates:
+        candidates.sort(key=len)
+        positions = set(candidates[0])
+        for other in candidates[1:]:
+            if not positions:
+                break
+            positions.intersection_update(other)
+        query_list = [objects[i] for i in sorted(positions)]
+    else:
+        query_list = objects
+
+    for key, value in rest:
+        query_list = [obj for obj in query_list if _matches(get(obj, key), value, normalize)]
+    return query_list
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value)
+
+
+def _matches(actual, value, normalize):
+    if isinstance(value, tuple):
+        low, high = value
+        return (low is None or low <= actual) and (high is None or actual <= high)
+    if normalize is not None and isinstance(value, str):
+        return normalize(actual) == normalize(value)
+    return actual == value
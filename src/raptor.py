@@ -0,0 +1,235 @@
+import math
+
+import numpy as np
+
+from graph import TRANSFER_KEY, build_variant
+from ingest import read_variant_stops
+
+
+class RaptorRouter:
+    """
+    Round-based public transit router (RAPTOR) over the stop sequences of the route variants.
+
+    Round k scans every variant that serves a stop improved in round k-1, boarding at the
+    earliest such stop and riding it to the end, so after round k every stop holds the
+    fastest arrival using at most k rides. Walking transfers are relaxed after every round.
+    There are no timetables, a rider boards as soon as they reach a stop, which is the same
+    model as the 'Time' edges of build_graph.
+
+    Variants and stops live in flat arrays: the stops of variant r are
+    route_stops[route_offsets[r]:route_offsets[r+1]] and the variants serving stop p are
+    stop_routes[stop_offsets[p]:stop_offsets[p+1]], at positions stop_positions[...].
+
+    Attributes:
+        ids (list): Dense id -> StopId.
+        index (dict): StopId -> dense id.
+        keys (list): (route_id, var_id) of every variant.
+        route_offsets (numpy.ndarray): Start of every variant in route_stops.
+        route_stops (numpy.ndarray): Dense id of every stop of every variant, in route order.
+        hop_times (numpy.ndarray): Time from route_stops[i] to route_stops[i+1] of the same variant.
+        stop_offsets (numpy.ndarray): Start of every stop in stop_routes.
+        stop_routes (numpy.ndarray): Variants serving every stop.
+        stop_positions (numpy.ndarray): Position of the stop within each of those variants.
+        footpaths (list): Dense id -> [(dense id, Time), ...] walking transfers.
+    """
+
+    def __init__(self, keys, sequences, hops, footpaths=()):
+        footpaths = list(footpaths)
+        self.ids = sorted({stop for sequence in sequences for stop in sequence} |
+                          {stop for u, v, _ in footpaths for stop in (u, v)})
+        self.index = {stop: i for i, stop in enumerate(self.ids)}
+        self.keys = list(keys)
+
+        route_stops, hop_times, route_offsets = [], [], [0]
+        for sequence, times in zip(sequences, hops):
+            route_stops.extend(self.index[stop] for stop in sequence)
+            hop_times.extend(times)
+            hop_times.append(0.0)
+            route_offsets.append(len(route_stops))
+        self.route_offsets = np.array(route_offsets, dtype=np.int64)
+        self.route_stops = np.array(route_stops, dtype=np.int32)
+        self.hop_times = np.array(hop_times, dtype=np.float64)
+
+        route_of = np.repeat(np.arange(len(self.keys), dtype=np.int32), np.diff(self.route_offsets))
+        position = np.arange(len(route_stops), dtype=np.int64) - self.route_offsets[route_of]
+        order = np.argsort(self.route_stops, kind='stable')
+        self.stop_offsets = np.concatenate(([0], np.cumsum(np.bincount(self.route_stops, minlength=len(self.ids)))))
+        self.stop_routes = route_of[order]
+        self.stop_positions = position[order].astype(np.int32)
+
+        self.footpaths = [[] for _ in self.ids]
+        for u, v, time in footpaths:
+            self.footpaths[self.index[u]].append((self.index[v], time))
+
+        # The scans below run in Python, where list indexing beats numpy scalar access
+        self._route_offsets = self.route_offsets.tolist()
+        self._route_stops = self.route_stops.tolist()
+        self._hop_times = self.hop_times.tolist()
+        stop_offsets, stop_routes, stop_positions = (self.stop_offsets.tolist(), self.stop_routes.tolist(),
+                                                     self.stop_positions.tolist())
+        self._serving = [list(zip(stop_routes[stop_offsets[p]:stop_offsets[p+1]],
+                                  stop_positions[stop_offsets[p]:stop_offsets[p+1]])) for p in range(len(self.ids))]
+
+    @classmethod
+    def build(cls, route_vars, paths, file_path='data/stops.json', G=None):
+        """
+        Reads the stop sequences from stops.json and splits the running time of every variant
+        over its stops the way build_graph does.
+
+        Args:
+            route_vars (dict): (RouteId, RouteVarId) -> RouteVar.
+            paths (dict): (RouteId, RouteVarId) -> Path.
+            file_path (str): The path to stops.json.
+            G (networkx.MultiDiGraph): Graph whose TRANSFER_KEY edges are used as walking
+                transfers, None for none.
+
+        Returns:
+            RaptorRouter: The router.
+        """
+
+        keys, sequences, hops = [], [], []
+        stop_xy = {}
+        for route_id, var_id, stop_list in read_variant_stops(file_path):
+            path = paths[route_id, var_id]
+            route_var = route_vars[route_id, var_id]
+            edges, _ = build_variant(route_id, var_id, stop_list, path.get_lng(), path.get_lat(),
+                                     route_var.get_running_time(), route_var.get_distance(), stop_xy)
+            keys.append((route_id, var_id))
+            sequences.append([stop['StopId'] for stop in stop_list])
+            hops.append([time for _, _, _, _, time in edges])
+
+        footpaths = []
+        if G is not None:
+            footpaths = [(u, v, data['Time']) for u, v, key, data in G.edges(keys=True, data=True)
+                         if key == TRANSFER_KEY]
+        return cls(keys, sequences, hops, footpaths)
+
+    def query(self, start_stop, end_stop, max_transfers=None):
+        """
+        Finds the Pareto set of journeys between two stops: for every number of transfers, the
+        fastest journey, kept only if it is faster than every journey with fewer transfers.
+
+        Args:
+            start_stop: StopId of the origin.
+            end_stop: StopId of the destination.
+            max_transfers (int): Most transfers a journey may take, None for no limit.
+
+        Returns:
+            list: [(time, transfers, edge path), ...] by increasing transfers and decreasing
+            time, edge paths in the format of dijkstra_shortest_path_edge with walks keyed
+            TRANSFER_KEY. Empty if the destination cannot be reached.
+        """
+
+        source, target = self.index[start_stop], self.index[end_stop]
+        if source == target:
+            return [(0, 0, [])]
+
+        route_offsets, route_stops, hop_times = self._route_offsets, self._route_stops, self._hop_times
+        serving = self._serving
+        best = [math.inf] * len(self.ids)
+        arrival = list(best)
+        arrival[source] = best[source] = 0
+        # labels[k] maps every stop improved in round k to how it was reached: None for the
+        # origin, (variant, board position, alight position) for a ride, (-1, stop, -1) for
+        # a walk from another stop improved in the same round
+        labels = [{source: None}]
+        marked = {source}
+        self._walk(marked, arrival, best, labels[0], target)
+
+        journeys = []
+        if arrival[target] < math.inf:
+            journeys.append((arrival[target], 0, self._journey(labels, 0, target)))
+
+        rounds = math.inf if max_transfers is None else max_transfers + 1
+        k = 0
+        while marked and k < rounds:
+            k += 1
+            # Every variant through a marked stop, scanned from the earliest marked position
+            queue = {}
+            for p in marked:
+                for route, position in serving[p]:
+                    if position < queue.get(route, math.inf):
+                        queue[route] = position
+
+            previous = arrival
+            arrival = list(previous)
+            label = {}
+            marked = set()
+            for route, position in queue.items():
+                trip = math.inf
+                board = -1
+                for i in range(route_offsets[route] + position, route_offsets[route+1]):
+                    p = route_stops[i]
+                    if board >= 0:
+                        trip += hop_times[i-1]
+                        if trip < best[p] and trip < best[target]:
+                            arrival[p] = best[p] = trip
+                            label[p] = (route, board, i)
+                            marked.add(p)
+                    # Boarding here beats staying on if the stop was reached earlier last round
+                    if previous[p] < trip:
+                        trip = previous[p]
+                        board = i
+            labels.append(label)
+            self._walk(marked, arrival, best, label, target)
+
+            if arrival[target] < previous[target]:
+                journey = (arrival[target], max(k-1, 0), self._journey(labels, k, target))
+                # A single ride has no transfers either, it replaces a walk-only journey
+                if journeys and journeys[-1][1] == journey[1]:
+                    journeys[-1] = journey
+                else:
+                    journeys.append(journey)
+        return journeys
+
+    def shortest_path_edge(self, start_stop, end_stop, max_transfers=None):
+        """
+        Finds the fastest journey between two stops.
+
+        Returns:
+            tuple: (edge path, time) like dijkstra_shortest_path_edge, an empty path and an
+            infinite time if the destination cannot be reached within max_transfers.
+        """
+
+        journeys = self.query(start_stop, end_stop, max_transfers)
+        if not journeys:
+            return [], math.inf
+        time, _, path = journeys[-1]
+        return path, time
+
+    def _walk(self, marked, arrival, best, label, target):
+        # Relaxes the walking transfers out of every stop improved in this round, and out of
+        # every stop a walk improves, since the transfers are not closed under chaining
+        footpaths = self.footpaths
+        pending = list(marked)
+        while pending:
+            p = pending.pop()
+            for q, time in footpaths[p]:
+                walked = arrival[p] + time
+                if walked < best[q] and walked < best[target]:
+                    arrival[q] = best[q] = walked
+                    label[q] = (-1, p, -1)
+                    marked.add(q)
+                    pending.append(q)
+
+    def _journey(self, labels, k, stop):
+        # Follows the labels back from stop in round k to the origin
+        route_stops, ids, keys = self._route_stops, self.ids, self.keys
+        path = []
+        while True:
+            while stop not in labels[k]:
+                k -= 1
+            parent = labels[k][stop]
+            if parent is None:
+                break
+            route, board, alight = parent
+            if route < 0:
+                path.append((ids[board], TRANSFER_KEY))
+                stop = board
+            else:
+                for i in range(alight-1, board-1, -1):
+                    path.append((ids[route_stops[i]], keys[route]))
+                stop = route_stops[board]
+                k -= 1
+        path.reverse()
+        return path
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import struct
+
+import networkx as nx
+import numpy as np
+
+from csr import CSRGraph
+
+
+MAGIC = b'BSGRAPH\0'
+SNAPSHOT_VERSION = 1
+ALIGNMENT = 64
+
+# Layout: MAGIC, version (uint32), header length (uint32), JSON header, then every array
+# raw and 64-byte aligned at the offset the header records for it.
+_PREAMBLE = struct.Struct('<8sII')
+
+
+def file_hash(file_path):
+    """
+    Computes the SHA-256 of a file's content.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The hex digest.
+    """
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_hashes(source_paths):
+    return {os.path.basename(path): file_hash(path) for path in source_paths}
+
+
+class GraphSnapshot:
+    """
+    A built bus network graph loaded from a snapshot file.
+
+    Attributes:
+        version (int): Format version of the file.
+        sources (dict): File name -> SHA-256 of the inputs the graph was built from.
+        node_ids (numpy.ndarray): StopId of every node, in graph insertion order.
+        x, y (numpy.ndarray): Projected coordinates of every node.
+        sources_index, targets_index (numpy.ndarray): Position in node_ids of the tail and
+            head of every edge, in G.edges(keys=True) order.
+        route_ids, var_ids (numpy.ndarray): Key of every edge.
+        distances, times (numpy.ndarray): 'Distance' and 'Time' of every edge.
+    """
+
+    ARRAYS = ('node_ids', 'x', 'y', 'sources_index', 'targets_index', 'route_ids', 'var_ids', 'distances', 'times')
+
+    def __init__(self, version, sources, arrays):
+        self.version = version
+        self.sources = sources
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def to_graph(self):
+        """
+        Rebuilds the MultiDiGraph, with nodes and edges in their original order.
+
+        Returns:
+            networkx.MultiDiGraph: The bus network.
+        """
+
+        G = nx.MultiDiGraph()
+        node_ids = self.node_ids.tolist()
+        G.add_nodes_from((node, {'x': x, 'y': y}) for node, x, y in zip(node_ids, self.x.tolist(), self.y.tolist()))
+        G.add_edges_from(
+            (node_ids[u], node_ids[v], (route_id, var_id), {'Distance': dist, 'Time': time})
+            for u, v, route_id, var_id, dist, time in zip(
+                self.sources_index.tolist(), self.targets_index.tolist(), self.route_ids.tolist(),
+                self.var_ids.tolist(), self.distances.tolist(), self.times.tolist()))
+        return G
+
+    def to_csr(self, dtype=np.float64):
+        """
+        Builds the CSR view straight from the snapshot arrays.
+
+        Args:
+            dtype: Storage type of the edge weights.
+
+        Returns:
+            CSRGraph: The same view CSRGraph.from_graph(self.to_graph()) would give.
+        """
+
+        return CSRGraph.from_arrays(self.node_ids, self.x, self.y, self.sources_index, self.targets_index,
+                                    self.times, self.route_ids, self.var_ids, dtype=dtype)
+
+
+def save_snapshot(file_path, G, source_paths):
+    """
+    Writes a graph built by build_graph to a snapshot file.
+
+    Args:
+        file_path (str): The path to the snapshot file.
+        G (networkx.MultiDiGraph): The bus network.
+        source_paths (list): The vars.json, stops.json and paths.json files G was built from.
+    """
+
+    node_ids = list(G.nodes())
+    index = {node: i for i, node in enumerate(node_ids)}
+    edges = list(G.edges(keys=True, data=True))
+
+    arrays = {
+        'node_ids': np.array(node_ids, dtype=np.int64),
+        'x': np.array([G.nodes[node].get('x', np.nan) for node in node_ids], dtype=np.float64),
+        'y': np.array([G.nodes[node].get('y', np.nan) for node in node_ids], dtype=np.float64),
+        'sources_index': np.array([index[u] for u, _, _, _ in edges], dtype=np.int32),
+        'targets_index': np.array([index[v] for _, v, _, _ in edges], dtype=np.int32),
+        'route_ids': np.array([key[0] for _, _, key, _ in edges], dtype=np.int32),
+        'var_ids': np.array([key[1] for _, _, key, _ in edges], dtype=np.int32),
+        'distances': np.array([data['Distance'] for _, _, _, data in edges], dtype=np.float64),
+        'times': np.array([data['Time'] for _, _, _, data in edges], dtype=np.float64),
+    }
+
+    # Offsets are relative to the start of the data section, which is aligned once the
+    # header length is known
+    layout = {}
+    offset = 0
+    for name in GraphSnapshot.ARRAYS:
+        array = arrays[name]
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({'sources': source_hashes(source_paths), 'arrays': layout}).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Write to a temporary file first so a crash never leaves a truncated snapshot behind
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(_PREAMBLE.pack(MAGIC, SNAPSHOT_VERSION, len(header)))
+        file.write(header)
+        for name in GraphSnapshot.ARRAYS:
+            file.seek(data_start + layout[name]['offset'])
+            file.write(arrays[name].tobytes())
+    os.replace(tmp_path, file_path)
+
+
+def load_snapshot(file_path, source_paths=None):
+    """
+    Opens a snapshot file with its arrays memory-mapped.
+
+    Args:
+        file_path (str): The path to the snapshot file.
+        source_paths (list): If given, the input files whose hashes must match the snapshot.
+
+    Returns:
+        GraphSnapshot: The snapshot, or None if it is missing, of another format version or
+        built from different inputs.
+    """
+
+    if not os.path.exists(file_path):
+        return None
+
+    with open(file_path, 'rb') as file:
+        preamble = file.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            return None
+        magic, version, header_len = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC or version != SNAPSHOT_VERSION:
+            return None
+        header = json.loads(file.read(header_len).decode('utf-8'))
+
+    if source_paths is not None and header['sources'] != source_hashes(source_paths):
+        return None
+
+    data_start = _align(_PREAMBLE.size + header_len)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        shape = tuple(spec['shape'])
+        if 0 in shape:
+            arrays[name] = np.empty(shape, dtype=np.dtype(spec['dtype']))
+        else:
+            arrays[name] = np.memmap(file_path, dtype=np.dtype(spec['dtype']), mode='r',
+                                     offset=data_start + spec['offset'], shape=shape)
+
+    return GraphSnapshot(version, header['sources'], arrays)
+
+
+def load_or_build(file_path, source_paths, build):
+    """
+    Loads the graph snapshot, rebuilding and rewriting it when it is stale.
+
+    Args:
+        file_path (str): The path to the snapshot file.
+        source_paths (list): The vars.json, stops.json and paths.json files.
+        build (callable): Returns a freshly built networkx.MultiDiGraph.
+
+    Returns:
+        GraphSnapshot: An up-to-date snapshot.
+    """
+
+    snapshot = load_snapshot(file_path, source_paths)
+    if snapshot is None:
+        save_snapshot(file_path, build(), source_paths)
+        snapshot = load_snapshot(file_path)
+    return snapshot
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
@@ -0,0 +1,188 @@
+import math
+from heapq import nsmallest
+
+import numpy as np
+
+from convert import Converter
+
+
+class StopIndex:
+    """
+    Uniform grid over stop coordinates projected to meters with Converter, answering
+    k-nearest, radius and bounding-box queries.
+
+    Every stop goes into the square cell of cell_size meters it falls in, so a query only
+    looks at the few cells around its point instead of every stop. k-nearest searches rings
+    of cells outwards from the query cell and stops as soon as no unvisited cell can hold a
+    closer stop.
+
+    Attributes:
+        stops (list): The indexed Stop objects.
+        cell_size (float): Side of a grid cell in meters.
+        xy (numpy.ndarray): Projected (x, y) of every stop, in the order of stops.
+    """
+
+    def __init__(self, stops, cell_size=250.0, converter=None):
+        self.stops = list(stops)
+        self.cell_size = float(cell_size)
+        self._converter = converter or Converter()
+
+        lng = np.array([stop.get_lng() for stop in self.stops], dtype=np.float64)
+        lat = np.array([stop.get_lat() for stop in self.stops], dtype=np.float64)
+        x, y = self._converter.convert(lng, lat)
+        self.xy = np.column_stack((x, y)) if len(self.stops) else np.empty((0, 2))
+
+        self._cells = {}
+        for i, (px, py) in enumerate(self.xy.tolist()):
+            self._cells.setdefault(self._cell(px, py), []).append((px, py, i))
+
+        if self._cells:
+            columns = [cx for cx, _ in self._cells]
+            rows = [cy for _, cy in self._cells]
+            self._bounds = (min(columns), min(rows), max(columns), max(rows))
+
+    def __len__(self):
+        return len(self.stops)
+
+    def nearest(self, lng, lat, k=1):
+        """
+        Finds the k stops closest to a coordinate.
+
+        Args:
+            lng (float): Longitude of the point.
+            lat (float): Latitude of the point.
+            k (int): Number of stops to return.
+
+        Returns:
+            list: [(distance in meters, Stop), ...] sorted by distance, fewer than k if there
+            are fewer stops.
+        """
+
+        k = min(int(k), len(self.stops))
+        if k <= 0:
+            return []
+        x, y = self._converter.convert(lng, lat)
+        cx, cy = self._cell(x, y)
+        min_cx, min_cy, max_cx, max_cy = self._bounds
+        # Rings past this one lie entirely outside the occupied cells
+        last_ring = max(cx - min_cx, max_cx - cx, cy - min_cy, max_cy - cy, 0)
+
+        candidates = []
+        for ring in range(last_ring + 1):
+            for cell in self._ring(cx, cy, ring):
+                for px, py, i in self._cells.get(cell, ()):
+                    candidates.append((math.hypot(px - x, py - y), i))
+            # Every stop in a cell outside the rings searched so far is at least this far away
+            if len(candidates) >= k and nsmallest(k, candidates)[-1][0] <= ring * self.cell_size:
+                break
+        return [(distance, self.stops[i]) for distance, i in nsmallest(k, candidates)]
+
+    def within(self, lng, lat, radius):
+        """
+        Finds the stops within a distance of a coordinate.
+
+        Args:
+            lng (float): Longitude of the point.
+            lat (float): Latitude of the point.
+            radius (float): Distance in meters.
+
+        Returns:
+            list: [(distance in meters, Stop), ...] sorted by distance.
+        """
+
+        x, y = self._converter.convert(lng, lat)
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+
+        found = []
+        for cell in self._cells_between(min_cx, min_cy, max_cx, max_cy):
+            for px, py, i in self._cells[cell]:
+                distance = math.hypot(px - x, py - y)
+                if distance <= radius:
+                    found.append((distance, i))
+        found.sort()
+        return [(distance, self.stops[i]) for distance, i in found]
+
+    def in_bbox(self, min_lng, min_lat, max_lng, max_lat):
+        """
+        Finds the stops inside a longitude/latitude box, edges included.
+
+        Args:
+            min_lng (float): West edge.
+            min_lat (float): South edge.
+            max_lng (float): East edge.
+            max_lat (float): North edge.
+
+        Returns:
+            list: Stop objects in the box.
+        """
+
+        corners = [self._converter.convert(lng, lat) for lng in (min_lng, max_lng) for lat in (min_lat, max_lat)]
+        # The projected box is not quite a rectangle, one cell of margin covers its bulge
+        min_cx, min_cy = self._cell(min(x for x, _ in corners), min(y for _, y in corners))
+        max_cx, max_cy = self._cell(max(x for x, _ in corners), max(y for _, y in corners))
+
+        found = []
+        for cell in self._cells_between(min_cx - 1, min_cy - 1, max_cx + 1, max_cy + 1):
+            for _, _, i in self._cells[cell]:
+                stop = self.stops[i]
+                if min_lng <= stop.get_lng() <= max_lng and min_lat <= stop.get_lat() <= max_lat:
+                    found.append(i)
+        found.sort()
+        return [self.stops[i] for i in found]
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def _cells_between(self, min_cx, min_cy, max_cx, max_cy):
+        # Occupied cells of a block, walking whichever of the block and the occupied cells is smaller
+        if not self._cells:
+            return []
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self._cells):
+            return [(cx, cy) for cx, cy in self._cells if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy]
+        return [(cx, cy) for cx in range(min_cx, max_cx + 1) for cy in range(min_cy, max_cy + 1)
+                if (cx, cy) in self._cells]
+
+    @staticmethod
+    def _ring(cx, cy, ring):
+        # Cells at Chebyshev distance ring from (cx, cy)
+        if ring == 0:
+            yield cx, cy
+            return
+        for dx in range(-ring, ring + 1):
+            yield cx + dx, cy - ring
+            yield cx + dx, cy + ring
+        for dy in range(-ring + 1, ring):
+            yield cx - ring, cy + dy
+            yield cx + ring, cy + dy
+
+    def pairs_within(self, radius):
+        """
+        Spatial self-join, finds every pair of stops within a distance of each other.
+
+        Each stop is only compared with the stops in the cells that can be within radius of
+        its own, so the work grows with the number of close pairs rather than its square.
+
+        Args:
+            radius (float): Distance in meters.
+
+        Returns:
+            list: [(Stop, Stop, distance in meters), ...], every pair once, the stop listed
+            first in stops first.
+        """
+
+        reach = math.ceil(radius / self.cell_size)
+        cells = self._cells
+        found = []
+        for (cx, cy), members in cells.items():
+            near = [cells[cell] for cell in ((cx + dx, cy + dy) for dx in range(-reach, reach + 1)
+                                             for dy in range(-reach, reach + 1)) if cell in cells]
+            for px, py, i in members:
+                for other in near:
+                    for qx, qy, j in other:
+                        if i < j:
+                            distance = math.hypot(px - qx, py - qy)
+                            if distance <= radius:
+                                found.append((i, j, distance))
+        found.sort()
+        return [(self.stops[i], self.stops[j], distance) for i, j, distance in found]
@@ -0,0 +1,200 @@
+import math
+from heapq import heappop, heappush
+
+import numpy as np
+
+from graph import TRANSFER_KEY
+
+
+class StateGraph:
+    """
+    The bus network expanded to (stop, route variant) states, for routing that charges for
+    boarding and changing buses.
+
+    Every stop has two stop states, standing at the stop before and after having been on a
+    bus, and one ride state per variant serving it, being on that variant at the stop. Riding
+    moves between ride states of the same variant at the edge's 'Time', walking (TRANSFER_KEY
+    edges) between stop states of the same kind. Boarding goes from a stop state to a ride
+    state at board_penalty, plus transfer_penalty after a ride, and alighting to the stop
+    state after a ride is free. So the first bus costs board_penalty and every change after
+    it transfer_penalty + board_penalty on top of the travel time, while getting off and
+    walking to the destination costs nothing. Paths can no longer switch between parallel
+    edges at every stop for free.
+
+    States are dense integers: stop states before a ride are 0..n-1 in ascending StopId
+    order like CSRGraph, ride states follow, grouped by stop, then the stop states after a
+    ride in the same order. Only ride edges are stored, boarding and alighting follow from
+    state_stop and stop_offsets, so memory is linear in the edges.
+
+    Attributes:
+        ids (list): Dense stop id -> StopId.
+        index (dict): StopId -> dense stop id.
+        state_stop (numpy.ndarray): Dense stop id of every state.
+        state_keys (list): (route_id, var_id) of every ride state, TRANSFER_KEY for stop states.
+        stop_offsets (numpy.ndarray): Ride states of stop p are stop_offsets[p]:stop_offsets[p+1],
+            its stop state after a ride is stop_offsets[-1] + p.
+        offsets, targets, weights (numpy.ndarray): CSR ride edges between ride states.
+        walk_offsets, walk_targets, walk_weights (numpy.ndarray): CSR walking edges between stop states.
+        board_penalty (float): Default minutes charged for boarding.
+        transfer_penalty (float): Default minutes charged for boarding again after a ride.
+    """
+
+    def __init__(self, ids, ride_keys, ride_stops, ride_edges, walk_edges, board_penalty=0.0, transfer_penalty=5.0):
+        self.ids = list(ids)
+        self.index = {stop: i for i, stop in enumerate(self.ids)}
+        n = len(self.ids)
+        self.board_penalty = board_penalty
+        self.transfer_penalty = transfer_penalty
+
+        ride_stops = np.asarray(ride_stops, dtype=np.int32)
+        self.state_stop = np.concatenate((np.arange(n, dtype=np.int32), ride_stops, np.arange(n, dtype=np.int32)))
+        self.state_keys = [TRANSFER_KEY] * n + list(ride_keys) + [TRANSFER_KEY] * n
+        self.stop_offsets = n + np.concatenate(([0], np.cumsum(np.bincount(ride_stops, minlength=n))))
+
+        self.offsets, self.targets, self.weights = self._csr(len(self.state_keys), ride_edges)
+        self.walk_offsets, self.walk_targets, self.walk_weights = self._csr(n, walk_edges)
+
+        # Python lists for the search loop, like CSRGraph.adjacency
+        self._lists = (self.state_stop.tolist(), self.stop_offsets.tolist(), self.offsets.tolist(),
+                       self.targets.tolist(), self.weights.tolist(), self.walk_offsets.tolist(),
+                       self.walk_targets.tolist(), self.walk_weights.tolist())
+
+    @classmethod
+    def build(cls, G, board_penalty=0.0, transfer_penalty=5.0):
+        """
+        Expands a graph built by build_graph, keeping every parallel edge.
+
+        Args:
+            G (networkx.MultiDiGraph): The bus network, with or without walking transfers.
+            board_penalty (float): Default minutes charged for boarding.
+            transfer_penalty (float): Default minutes charged for boarding again after a ride.
+
+        Returns:
+            StateGraph: The expanded graph.
+        """
+
+        ids = sorted(G.nodes())
+        index = {stop: i for i, stop in enumerate(ids)}
+        rides = sorted({(index[stop], key) for u, v, key in G.edges(keys=True) if key != TRANSFER_KEY
+                        for stop in (u, v)})
+        state = {ride: len(ids) + i for i, ride in enumerate(rides)}
+
+        ride_edges, walk_edges = [], []
+        for u, v, key, time in G.edges(keys=True, data='Time'):
+            if key == TRANSFER_KEY:
+                walk_edges.append((index[u], index[v], time))
+            else:
+                ride_edges.append((state[index[u], key], state[index[v], key], time))
+        return cls(ids, [key for _, key in rides], [stop for stop, _ in rides], ride_edges, walk_edges,
+                   board_penalty, transfer_penalty)
+
+    def number_of_states(self):
+        return len(self.state_keys)
+
+    def query(self, start_stop, end_stop, board_penalty=None, transfer_penalty=None):
+        """
+        Finds the path of least generalized cost, travel time plus penalties, between two stops.
+
+        Args:
+            start_stop: StopId of the origin.
+            end_stop: StopId of the destination.
+            board_penalty (float): Minutes charged for boarding, the graph's default if None.
+            transfer_penalty (float): Minutes charged for boarding again after a ride, the graph's
+                default if None.
+
+        Returns:
+            tuple: (edge path, time, transfers), the path in the format of
+            dijkstra_shortest_path_edge and its travel time without penalties. The path is
+            empty and the time infinite if the destination cannot be reached.
+        """
+
+        if board_penalty is None:
+            board_penalty = self.board_penalty
+        if transfer_penalty is None:
+            transfer_penalty = self.transfer_penalty
+        state_stop, stop_offsets, offsets, targets, weights, walk_offsets, walk_targets, walk_weights = self._lists
+        source, target = self.index[start_stop], self.index[end_stop]
+        # Stop states after a ride start here, they are stop + ridden
+        ridden = stop_offsets[-1]
+
+        costs = {source: 0}
+        # State -> (previous state, time of the edge into it), None for boarding and alighting
+        predecessors = {source: None}
+        visited = set()
+        heap = [(0, source)]
+        reached = None
+
+        def relax(neighbor, new_cost, state, time):
+            if new_cost < costs.get(neighbor, math.inf) and neighbor not in visited:
+                costs[neighbor] = new_cost
+                predecessors[neighbor] = (state, time)
+                heappush(heap, (new_cost, neighbor))
+
+        while heap:
+            cost, state = heappop(heap)
+            if state in visited:
+                continue
+            visited.add(state)
+            stop = state_stop[state]
+            if stop == target:
+                reached = state
+                break
+
+            if state == stop or state == stop + ridden:
+                # Standing at the stop: walk on or board any variant serving it, boarding after
+                # a ride is a change of buses
+                base = state - stop
+                for edge in range(walk_offsets[stop], walk_offsets[stop+1]):
+                    relax(base + walk_targets[edge], cost + walk_weights[edge], state, walk_weights[edge])
+                penalty = board_penalty if base == 0 else board_penalty + transfer_penalty
+                for ride in range(stop_offsets[stop], stop_offsets[stop+1]):
+                    relax(ride, cost + penalty, state, None)
+            else:
+                # On a bus: ride on or get off
+                for edge in range(offsets[state], offsets[state+1]):
+                    relax(targets[edge], cost + weights[edge], state, weights[edge])
+                relax(stop + ridden, cost, state, None)
+
+        if reached is None:
+            return [], math.inf, 0
+        return self._path(predecessors, reached)
+
+    def shortest_path_edge(self, start_stop, end_stop):
+        """
+        Answers a query with the default penalties.
+
+        Returns:
+            tuple: (edge path, time) like dijkstra_shortest_path_edge.
+        """
+
+        path, time, _ = self.query(start_stop, end_stop)
+        return path, time
+
+    def _path(self, predecessors, state):
+        # Follows the predecessors back to the origin, keeping the riding and walking edges
+        state_stop, state_keys, ids = self._lists[0], self.state_keys, self.ids
+        first_ride, ridden = self._lists[1][0], self._lists[1][-1]
+        hops = []
+        boardings = 0
+        while predecessors[state] is not None:
+            previous, time = predecessors[state]
+            if time is not None:
+                hops.append((ids[state_stop[previous]], state_keys[previous], time))
+            elif first_ride <= state < ridden:
+                boardings += 1
+            state = previous
+        hops.reverse()
+
+        # Summed from the origin, the order Dijkstra accumulates in
+        total = 0
+        for _, _, time in hops:
+            total += time
+        return [(stop, key) for stop, key, _ in hops], total, max(boardings - 1, 0)
+
+    @staticmethod
+    def _csr(n, edges):
+        edges = sorted(edges, key=lambda edge: edge[0])
+        tails = np.array([u for u, _, _ in edges], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(tails, minlength=n)))).astype(np.int64)
+        return (offsets, np.array([v for _, v, _ in edges], dtype=np.int32),
+                np.array([w for _, _, w in edges], dtype=np.float64))
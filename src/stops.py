@@ -1,6 +1,9 @@
 import json
 import csv
 
+from query_index import HashIndex, SortedIndex, indexed_search
+from spatial import StopIndex
+
 
 class Stop:
     """
@@ -163,10 +166,22 @@ class StopQuery:
 
     Attributes:
         stops (list): A list of Stop objects.
+        index (StopIndex): Spatial index over the stops, for the coordinate searches.
+        indexes (dict): Attribute name -> HashIndex or SortedIndex over the stops, used by
+            search_stops_by.
+
+    Both are built by reindex, which load_data calls. Searches rebuild them by themselves
+    when stops was replaced or changed length since, call reindex after editing stops in
+    any other way, e.g. replacing an element or changing a stop's attributes.
     """
 
+    # Attributes given a hash index for equality and a sorted index for ranges
+    HASH_INDEXED = ('stop_id', 'code', 'zone', 'ward', 'street', 'stop_type')
+    SORT_INDEXED = ('lat', 'lng')
+
     def __init__(self):
         self.stops = []
+        self.reindex()
 
     def load_data(self, file_path):
         """
@@ -186,6 +201,24 @@ class StopQuery:
                                     stop_data['Search'], stop_data['Routes'])
                         stops.add(stop)
             self.stops = list(stops)
+        self.reindex()
+
+    def reindex(self):
+        """
+        Rebuilds the spatial and attribute indexes from the current stops.
+        """
+
+        self.index = StopIndex(self.stops)
+        self.indexes = {key: HashIndex([getattr(stop, f"get_{key}")() for stop in self.stops])
+                        for key in self.HASH_INDEXED}
+        self.indexes.update({key: SortedIndex([getattr(stop, f"get_{key}")() for stop in self.stops])
+                             for key in self.SORT_INDEXED})
+        self._indexed = (self.stops, len(self.stops))
+
+    def _reindex_if_stale(self):
+        indexed, length = self._indexed
+        if indexed is not self.stops or length != len(self.stops):
+            self.reindex()
 
     def search_by_stop_id(query_list, stop_id):
         return [stop for stop in query_list if stop.get_stop_id() == stop_id]
@@ -251,18 +284,64 @@ class StopQuery:
 
         Args:
             **attr: Arbitrary keyword arguments representing attributes and their values.
+                A (low, high) tuple matches a range, e.g. lat=(10.75, 10.80).
 
         Returns:
             list: A list of Stop objects matching all specified attribute values.
         """
 
-        query_list = self.stops
+        self._reindex_if_stale()
+        return indexed_search(self.stops, self.indexes, attr, lambda stop, key: getattr(stop, f"get_{key}")())
+        
+    def search_nearest_stops(self, lng, lat, k=1):
+        """
+        Searches for the stops closest to a coordinate.
 
-        for key, value in attr.items():
-            query_list = [stop for stop in query_list if getattr(stop, f"get_{key}")() == value]
+        Args:
+            lng (float): The longitude of the point.
+            lat (float): The latitude of the point.
+            k (int): The number of stops to return.
+
+        Returns:
+            list: The k closest Stop objects, closest first.
+        """
+
+        self._reindex_if_stale()
+        return [stop for _, stop in self.index.nearest(lng, lat, k)]
+
+    def search_stops_within(self, lng, lat, radius):
+        """
+        Searches for the stops within walking distance of a coordinate.
+
+        Args:
+            lng (float): The longitude of the point.
+            lat (float): The latitude of the point.
+            radius (float): The distance in meters.
+
+        Returns:
+            list: The Stop objects within radius of the point, closest first.
+        """
+
+        self._reindex_if_stale()
+        return [stop for _, stop in self.index.within(lng, lat, radius)]
+
+    def search_stops_in_bbox(self, min_lng, min_lat, max_lng, max_lat):
+        """
+        Searches for the stops inside a bounding box.
+
+        Args:
+            min_lng (float): The west edge of the box.
+            min_lat (float): The south edge of the box.
+            max_lng (float): The east edge of the box.
+            max_lat (float): The north edge of the box.
+
+        Returns:
+            list: The Stop objects inside the box.
+        """
+
+        self._reindex_if_stale()
+        return self.index.in_bbox(min_lng, min_lat, max_lng, max_lat)
 
-        return query_list
-        
     def output_as_csv(self, query_list, file_path):
         """
         Outputs the query results as CSV format to a file.
@@ -0,0 +1,159 @@
+import os
+import struct
+
+import numpy as np
+
+
+MAGIC = b'BSDIST\0\0'
+STORE_VERSION = 1
+ALIGNMENT = 64
+
+# Layout: MAGIC, version (uint32), node count (uint64), then 64-byte aligned sections:
+# StopIds (int64[n]), distances (float32[n, n]), predecessors (int32[n, n]) and a
+# row-complete flag per source (uint8[n]). Matrices are row-major, row s is source s.
+_PREAMBLE = struct.Struct('<8sIQ')
+
+
+class DistanceStore:
+    """
+    On-disk all-pairs travel times and predecessors, memory-mapped so a lookup only touches
+    the pages it reads.
+
+    Rows can be written one at a time, including from several processes at once, so a store
+    can be filled while an all-pairs run is in progress and resumed if the run stops.
+
+    Attributes:
+        file_path (str): The path to the store file.
+        ids (list): Dense id -> StopId.
+        index (dict): StopId -> dense id.
+        distances (numpy.memmap): float32 n x n travel times, inf where unreachable.
+        predecessors (numpy.memmap): int32 n x n dense id of the node before v on the s -> v
+            path, -1 for the source and unreachable nodes.
+        done (numpy.memmap): 1 for every source whose row has been written.
+    """
+
+    def __init__(self, file_path, mode='r'):
+        self.file_path = file_path
+        self.mode = mode
+        with open(file_path, 'rb') as file:
+            magic, version, n = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{file_path} is not a distance store")
+        if version != STORE_VERSION:
+            raise ValueError(f"{file_path} has store version {version}, expected {STORE_VERSION}")
+
+        ids_at, distances_at, predecessors_at, done_at, _ = _layout(n)
+        self.ids = np.fromfile(file_path, dtype=np.int64, count=n, offset=ids_at).tolist()
+        self.index = {node: i for i, node in enumerate(self.ids)}
+        shape = (n, n)
+        self.distances = np.memmap(file_path, dtype=np.float32, mode=mode, offset=distances_at, shape=shape)
+        self.predecessors = np.memmap(file_path, dtype=np.int32, mode=mode, offset=predecessors_at, shape=shape)
+        self.done = np.memmap(file_path, dtype=np.uint8, mode=mode, offset=done_at, shape=(n,))
+
+    @classmethod
+    def create(cls, file_path, ids):
+        """
+        Allocates an empty store for a set of stops, every distance inf and no row done.
+
+        Args:
+            file_path (str): The path to the store file, overwritten if it exists.
+            ids (list): StopIds in dense id order, e.g. CSRGraph.ids.
+
+        Returns:
+            DistanceStore: The store, open for writing.
+        """
+
+        n = len(ids)
+        ids_at, distances_at, predecessors_at, done_at, size = _layout(n)
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(file_path, 'wb') as file:
+            file.write(_PREAMBLE.pack(MAGIC, STORE_VERSION, n))
+            file.truncate(size)
+            file.seek(ids_at)
+            file.write(np.asarray(ids, dtype=np.int64).tobytes())
+
+        store = cls(file_path, mode='r+')
+        # Filled a block of rows at a time so a large store is never materialized in memory
+        for lo in range(0, n, 1024):
+            store.distances[lo:lo+1024] = np.inf
+            store.predecessors[lo:lo+1024] = -1
+        store.flush()
+        return store
+
+    @classmethod
+    def open(cls, file_path, mode='r'):
+        return cls(file_path, mode=mode)
+
+    def reopen_spec(self):
+        # How a worker process opens this store for writing
+        return DistanceStore, (self.file_path, 'r+')
+
+    def distance(self, start_stop, end_stop):
+        return float(self.distances[self.index[start_stop], self.index[end_stop]])
+
+    def row(self, start_stop):
+        """
+        Returns the travel times and predecessors of one source without copying them.
+
+        Args:
+            start_stop: StopId of the source.
+
+        Returns:
+            tuple: (distances, predecessors) row views indexed by dense id.
+        """
+
+        source = self.index[start_stop]
+        return self.distances[source], self.predecessors[source]
+
+    def write_row(self, source, distances, predecessors):
+        """
+        Stores the single-source result of one dense source id and marks it done.
+
+        Args:
+            source (int): Dense id of the source.
+            distances (list): Travel time to every dense id.
+            predecessors (list): Predecessor dense id of every dense id.
+        """
+
+        self.distances[source] = distances
+        self.predecessors[source] = predecessors
+        self.done[source] = 1
+
+    def pending(self):
+        """
+        Returns the dense ids of the sources whose row has not been written yet.
+        """
+
+        return np.flatnonzero(self.done == 0).tolist()
+
+    def flush(self):
+        if self.mode != 'r':
+            self.distances.flush()
+            self.predecessors.flush()
+            self.done.flush()
+
+    def close(self):
+        self.flush()
+        self.distances = self.predecessors = self.done = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _layout(n):
+    # Byte offsets of the four sections and the total file size
+    ids_at = _align(_PREAMBLE.size)
+    distances_at = _align(ids_at + 8*n)
+    predecessors_at = _align(distances_at + 4*n*n)
+    done_at = _align(predecessors_at + 4*n*n)
+    return ids_at, distances_at, predecessors_at, done_at, done_at + n
@@ -0,0 +1,182 @@
+import json
+import math
+import os
+import random
+
+
+STOP_TYPES = ['Trụ dừng', 'Nhà chờ', 'Ô sơn']
+STREETS = ['Lê Lai', 'Hàm Nghi', 'Nguyễn Trãi', 'Cách Mạng Tháng Tám', 'Điện Biên Phủ', 'Võ Văn Kiệt',
+           'Hai Bà Trưng', 'Lý Thường Kiệt', 'Nguyễn Văn Cừ', 'Trần Hưng Đạo']
+METERS_PER_DEGREE = 111320.0
+
+
+def generate_network(directory, routes=100, variants=2, stops_per_route=30, overlap=0.5, polyline_density=5,
+                     seed=0, spacing=350.0, center=(106.70, 10.78)):
+    """
+    Writes a random bus network as vars.json, stops.json and paths.json in the formats that
+    load_routevar, load_stop, load_path and build_graph read.
+
+    Routes are self-avoiding walks over a grid of cells laid over the city. Where a route
+    passes through a cell it either stops at the cell's shared stop, which every other route
+    through that cell can use as well, or at a stop of its own. Variant 1 runs the walk
+    outbound and variant 2 back inbound, any further variants are short turns covering part
+    of the walk in either direction.
+
+    Args:
+        directory (str): Where to write the three files, created if missing.
+        routes (int): Number of routes.
+        variants (int): Variants per route.
+        stops_per_route (int): Stops of the full outbound variant.
+        overlap (float): Probability that a route uses the shared stop of a cell instead of
+            its own, 0 gives routes that never meet and 1 a fully shared grid.
+        polyline_density (int): Polyline points per stop-to-stop segment.
+        seed (int): Seed of the generator, the same arguments always write the same files.
+        spacing (float): Distance between neighbouring cells in meters.
+        center (tuple): (lng, lat) of the middle of the grid.
+
+    Returns:
+        dict: Number of 'routes', 'variants', 'stops' and 'edges' written.
+    """
+
+    rng = random.Random(seed)
+    side = max(stops_per_route, math.ceil(math.sqrt(routes * stops_per_route / 2)))
+    lat_step = spacing / METERS_PER_DEGREE
+    lng_step = spacing / (METERS_PER_DEGREE * math.cos(math.radians(center[1])))
+    origin = (center[0] - lng_step * side / 2, center[1] - lat_step * side / 2)
+
+    stops = {}
+    shared = {}
+    served = {}
+
+    def new_stop(cell, jitter):
+        stop_id = len(stops) + 1
+        zone = 1 + (cell[0] * 4 // side) * 4 + cell[1] * 4 // side
+        name = f"{rng.choice(STREETS)} {stop_id}"
+        stops[stop_id] = {
+            'StopId': stop_id,
+            'Code': f"Q{zone} {stop_id:03d}",
+            'Name': name,
+            'StopType': rng.choice(STOP_TYPES),
+            'Zone': f"Quận {zone}",
+            'Ward': f"Phường {1 + rng.randrange(15)}",
+            'AddressNo': str(rng.randrange(1, 500)),
+            'Street': name.rsplit(' ', 1)[0],
+            'SupportDisability': 'Có' if rng.random() < 0.3 else '',
+            'Status': 'Đang khai thác',
+            'Lng': origin[0] + (cell[1] + rng.uniform(-jitter, jitter)) * lng_step,
+            'Lat': origin[1] + (cell[0] + rng.uniform(-jitter, jitter)) * lat_step,
+            'Search': ''.join(word[0] for word in name.split()),
+            'Routes': '',
+        }
+        served[stop_id] = []
+        return stop_id
+
+    def stop_at(cell):
+        if rng.random() < overlap:
+            if cell not in shared:
+                shared[cell] = new_stop(cell, 0.05)
+            return shared[cell]
+        # A route's own stop sits off the cell center, like a stop on the other side of the road
+        return new_stop(cell, 0.25)
+
+    route_rows = []
+    variant_lines = []
+    edges = 0
+    for route_id in range(1, routes + 1):
+        route_no = f"{route_id:02d}"
+        walk = _walk(rng, side, stops_per_route)
+        variant_rows = []
+        for var_id in range(1, variants + 1):
+            if var_id <= 2:
+                cells = walk if var_id == 1 else walk[::-1]
+            else:
+                start = rng.randrange(len(walk) - 1)
+                end = rng.randrange(start + 2, len(walk) + 1)
+                cells = walk[start:end] if var_id % 2 else walk[start:end][::-1]
+            stop_ids = [stop_at(cell) for cell in cells]
+            for stop_id in stop_ids:
+                if route_no not in served[stop_id]:
+                    served[stop_id].append(route_no)
+
+            lng, lat = _polyline(rng, [stops[stop_id] for stop_id in stop_ids], polyline_density, lng_step)
+            distance = _length(lng, lat)
+            speed = rng.uniform(12, 25)
+            outbound = var_id % 2 == 1
+            variant_rows.append({
+                'RouteId': route_id,
+                'RouteVarId': var_id,
+                'RouteVarName': f"Lượt {'đi' if outbound else 'về'}: {stops[stop_ids[0]]['Name']} - {stops[stop_ids[-1]]['Name']}",
+                'RouteVarShortName': f"{stops[stop_ids[0]]['Name']} - {stops[stop_ids[-1]]['Name']}",
+                'RouteNo': route_no,
+                'StartStop': stops[stop_ids[0]]['Name'],
+                'EndStop': stops[stop_ids[-1]]['Name'],
+                'Distance': round(distance, 1),
+                'Outbound': outbound,
+                'RunningTime': max(1, round(distance / 1000 / speed * 60)),
+            })
+            variant_lines.append((route_id, var_id, stop_ids, lng, lat))
+            edges += len(stop_ids) - 1
+        route_rows.append(variant_rows)
+
+    for stop_id, route_nos in served.items():
+        stops[stop_id]['Routes'] = ', '.join(route_nos)
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'vars.json'), 'w', encoding='utf-8') as vars_file, \
+         open(os.path.join(directory, 'stops.json'), 'w', encoding='utf-8') as stops_file, \
+         open(os.path.join(directory, 'paths.json'), 'w', encoding='utf-8') as paths_file:
+        for variant_rows in route_rows:
+            vars_file.write(json.dumps(variant_rows, ensure_ascii=False) + '\n')
+        for route_id, var_id, stop_ids, lng, lat in variant_lines:
+            stops_file.write(json.dumps({'Stops': [stops[stop_id] for stop_id in stop_ids],
+                                         'RouteId': str(route_id), 'RouteVarId': str(var_id)},
+                                        ensure_ascii=False) + '\n')
+            paths_file.write(json.dumps({'lat': lat, 'lng': lng,
+                                         'RouteId': str(route_id), 'RouteVarId': str(var_id)}) + '\n')
+
+    return {'routes': routes, 'variants': routes * variants, 'stops': len(stops), 'edges': edges}
+
+
+def _walk(rng, side, length):
+    # Self-avoiding walk of length cells that mostly goes straight, restarted if it gets stuck
+    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+    while True:
+        cell = (rng.randrange(side), rng.randrange(side))
+        heading = rng.choice(directions)
+        walk = [cell]
+        visited = {cell}
+        for _ in range(length * 20):
+            if len(walk) == length:
+                return walk
+            if rng.random() < 0.2:
+                heading = rng.choice(directions)
+            row, col = walk[-1][0] + heading[0], walk[-1][1] + heading[1]
+            if 0 <= row < side and 0 <= col < side and (row, col) not in visited:
+                walk.append((row, col))
+                visited.add((row, col))
+            else:
+                heading = rng.choice(directions)
+
+
+def _polyline(rng, stop_list, density, lng_step):
+    # density points per segment, each a little off the straight line between the two stops
+    noise = lng_step * 0.01
+    lng, lat = [], []
+    for a, b in zip(stop_list, stop_list[1:]):
+        for i in range(density):
+            t = i / density
+            lng.append(a['Lng'] + (b['Lng'] - a['Lng']) * t + rng.uniform(-noise, noise))
+            lat.append(a['Lat'] + (b['Lat'] - a['Lat']) * t + rng.uniform(-noise, noise))
+    lng.append(stop_list[-1]['Lng'])
+    lat.append(stop_list[-1]['Lat'])
+    return lng, lat
+
+
+def _length(lng, lat):
+    # Polyline length in meters, equirectangular, which is plenty at city scale
+    total = 0.0
+    for i in range(1, len(lng)):
+        dx = (lng[i] - lng[i-1]) * METERS_PER_DEGREE * math.cos(math.radians((lat[i] + lat[i-1]) / 2))
+        dy = (lat[i] - lat[i-1]) * METERS_PER_DEGREE
+        total += math.hypot(dx, dy)
+    return total
@@ -0,0 +1,165 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from csr import CSRGraph
+from graph import shortest_path_tree
+
+
+class ShortestPathTreeCache:
+    """
+    Bounded cache of full single-source shortest-path trees keyed by origin.
+
+    Query traffic is skewed towards a few origins such as the main terminals, so keeping their
+    trees turns every later query from them into a lookup and a walk back along predecessors.
+    Trees are stored as compact arrays and evicted once their total size passes max_bytes,
+    either least recently used first ('lru') or by GreedyDual-Size-Frequency ('cost'), which
+    keeps the trees that were slow to compute and are asked for often.
+
+    A CSRGraph is frozen, so passing a different one drops every tree. A MultiDiGraph is
+    converted once and its version (see mark_changed) and node count are stamped, every
+    lookup compares the stamp and drops every tree if the graph was changed in place, e.g.
+    by merge_variant, withdraw_variant or add_transfer_edges.
+
+    Attributes:
+        graph (CSRGraph): The graph the cached trees were computed on.
+        max_bytes (int): Memory cap of the cached arrays.
+        policy (str): 'lru' or 'cost'.
+        nbytes (int): Memory taken by the cached arrays.
+        hits (int): Trees answered from the cache.
+        misses (int): Trees that had to be computed.
+    """
+
+    def __init__(self, G, max_bytes=256 * 2**20, policy='lru'):
+        if policy not in ('lru', 'cost'):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.hits = self.misses = 0
+        self.invalidate(G)
+
+    def invalidate(self, G=None):
+        """
+        Drops every cached tree.
+
+        Args:
+            G (CSRGraph or networkx.MultiDiGraph): The changed graph to cache trees of from now
+                on, None to convert the current one again after changing it in place.
+        """
+
+        if G is None:
+            G = self._source
+        self._source = G
+        self._stamp = self._stamp_of(G)
+        self.graph = G if isinstance(G, CSRGraph) else CSRGraph.from_graph(G)
+        # dense source -> (distances, pred_node, pred_edge), in LRU order
+        self._trees = OrderedDict()
+        # GreedyDual-Size-Frequency state: compute time and uses per tree, priority and the
+        # inflation value L that ages trees which are no longer asked for
+        self._cost = {}
+        self._uses = {}
+        self._priority = {}
+        self._inflation = 0.0
+        self.nbytes = 0
+
+    def tree(self, G, start_stop):
+        """
+        Returns the shortest-path tree of an origin, computing and caching it on a miss.
+
+        Args:
+            G (CSRGraph or networkx.MultiDiGraph): The bus network, the cache is invalidated if
+                it is not the graph the cached trees were computed on.
+            start_stop: StopId of the origin.
+
+        Returns:
+            tuple: (distances, pred_node, pred_edge) arrays indexed by dense id, as returned by
+            shortest_path_tree.
+        """
+
+        if G is self.graph:
+            G = self._source
+        if G is not self._source or self._stamp_of(G) != self._stamp:
+            self.invalidate(G)
+        source = self.graph.index[start_stop]
+
+        tree = self._trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            self._trees.move_to_end(source)
+            self._uses[source] += 1
+            self._priority[source] = self._inflation + self._uses[source] * self._cost[source] / self._size(tree)
+            return tree
+
+        self.misses += 1
+        start = time.perf_counter()
+        distances, pred_node, pred_edge = shortest_path_tree(self.graph, source)
+        cost = time.perf_counter() - start
+        tree = (np.array(distances, dtype=np.float64), np.array(pred_node, dtype=np.int32),
+                np.array(pred_edge, dtype=np.int32))
+
+        size = self._size(tree)
+        if size <= self.max_bytes:
+            while self.nbytes + size > self.max_bytes:
+                self._evict()
+            self._trees[source] = tree
+            self._cost[source] = cost
+            self._uses[source] = 1
+            self._priority[source] = self._inflation + cost / size
+            self.nbytes += size
+        return tree
+
+    def shortest_path_edge(self, G, start_stop, end_stop):
+        """
+        Answers a query from the tree of its origin.
+
+        Returns:
+            tuple: (edge path, time) like dijkstra_shortest_path_edge.
+        """
+
+        distances, pred_node, pred_edge = self.tree(G, start_stop)
+        ids, keys = self.graph.ids, self.graph.keys
+        target = self.graph.index[end_stop]
+
+        path = []
+        node = target
+        while pred_edge[node] >= 0:
+            path.append((ids[pred_node[node]], keys[pred_edge[node]]))
+            node = pred_node[node]
+        path.reverse()
+        return path, float(distances[target])
+
+    def one_dest_shortest_path(self, G, start_stop, end_stop):
+        """
+        Answers a query from the tree of its origin.
+
+        Returns:
+            tuple: (predecessors, time) like dijkstra_one_dest_shortest_path. Only the stops on
+            the path to end_stop have a predecessor set, every other stop maps to None.
+        """
+
+        path, time_taken = self.shortest_path_edge(G, start_stop, end_stop)
+        predecessors = dict.fromkeys(self.graph.ids)
+        for (u, key), (v, _) in zip(path, path[1:] + [(end_stop, None)]):
+            predecessors[v] = (u, key)
+        return predecessors, time_taken
+
+    def _evict(self):
+        if self.policy == 'lru':
+            source = next(iter(self._trees))
+        else:
+            source = min(self._priority, key=self._priority.get)
+            self._inflation = self._priority[source]
+        tree = self._trees.pop(source)
+        del self._cost[source], self._uses[source], self._priority[source]
+        self.nbytes -= self._size(tree)
+
+    @staticmethod
+    def _stamp_of(G):
+        if isinstance(G, CSRGraph):
+            return None
+        return G.graph.get('version', 0), G.number_of_nodes()
+
+    @staticmethod
+    def _size(tree):
+        return sum(array.nbytes for array in tree)
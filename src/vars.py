@@ -2,6 +2,8 @@ import json
 import csv
 from unidecode import unidecode
 
+from query_index import HashIndex, SortedIndex, indexed_search
+
 class RouteVar:
     """
     Represents a route variable with various attributes.
@@ -130,10 +132,21 @@ class RouteVarQuery:
 
     Attributes:
         route_vars (list): A list of RouteVar objects.
+        indexes (dict): Attribute name -> HashIndex or SortedIndex over the route variants,
+            used by search_routes_by.
+
+    The indexes are built by reindex, which load_data calls. search_routes_by rebuilds them
+    by itself when route_vars was replaced or changed length since, call reindex after
+    editing route_vars in any other way, e.g. replacing an element.
     """
 
+    # Attributes given a hash index for equality and a sorted index for ranges
+    HASH_INDEXED = ('route_no',)
+    SORT_INDEXED = ('distance', 'running_time')
+
     def __init__(self):
         self.route_vars = []
+        self.reindex()
 
     def load_data(self, file_path):
         """
@@ -150,6 +163,20 @@ class RouteVarQuery:
                                         rv["RouteVarShortName"], rv["RouteNo"], rv["StartStop"], rv["EndStop"],
                                         rv["Distance"], rv["Outbound"], rv["RunningTime"])
                     self.route_vars.append(route_var)
+        self.reindex()
+
+    def reindex(self):
+        """
+        Rebuilds the attribute indexes from the current route variants.
+        """
+
+        # Strings are indexed the way search_routes_by compares them
+        self.indexes = {key: HashIndex([getattr(route_var, f"get_{key}")() for route_var in self.route_vars],
+                                       normalize=_fold)
+                        for key in self.HASH_INDEXED}
+        self.indexes.update({key: SortedIndex([getattr(route_var, f"get_{key}")() for route_var in self.route_vars])
+                             for key in self.SORT_INDEXED})
+        self._indexed = (self.route_vars, len(self.route_vars))
 
 
     def search_by_route_id(query_list, route_id):
@@ -209,20 +236,18 @@ class RouteVarQuery:
         Args:
             **kwargs: Arbitrary keyword arguments where the key is the name of the attribute
                       to search for and the value is the desired value of that attribute.
+                      Strings match regardless of case and accents, a (low, high) tuple
+                      matches a range, e.g. distance=(5000, 10000).
 
         Returns:
             list: A list of RouteVar objects matching all specified attribute values.
         """
 
-        query_list = self.route_vars
-
-        for key, value in kwargs.items():
-            if type(value) == str:
-                query_list = [route_var for route_var in query_list if unidecode(getattr(route_var, f"get_{key}")()).lower() == unidecode(value).lower()]
-            else:
-                query_list = [route_var for route_var in query_list if getattr(route_var, f"get_{key}")() == value]
-
-        return query_list
+        indexed, length = self._indexed
+        if indexed is not self.route_vars or length != len(self.route_vars):
+            self.reindex()
+        return indexed_search(self.route_vars, self.indexes, kwargs,
+                              lambda route_var, key: getattr(route_var, f"get_{key}")(), normalize=_fold)
 
 
     def output_as_csv(self, query_list, file_path):
@@ -269,6 +294,10 @@ class RouteVarQuery:
                 file.write('\n')
 
 
+def _fold(text):
+    return unidecode(text).lower()
+
+
 def main(route_var_path, output_csv_path, output_json_path):
     #Create an instance of RouteVarQuery and load data from route_var_path
     rv_query = RouteVarQuery()
@@ -0,0 +1,82 @@
+import contextlib
+import os
+import random
+import sys
+
+import networkx as nx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from csr import CSRGraph
+from graph import build_graph, dijkstra_shortest_path
+from main import load_path, load_routevar, load_stop
+from synthetic import generate_network
+
+
+@pytest.fixture(scope='session')
+def network(tmp_path_factory):
+    # Small enough that the networkx implementations serve as the reference
+    directory = str(tmp_path_factory.mktemp('network'))
+    generate_network(os.path.join(directory, 'data'), routes=20, stops_per_route=15, seed=0)
+    return directory
+
+
+@pytest.fixture(scope='session')
+def files(network):
+    return tuple(os.path.join(network, 'data', name) for name in ('vars.json', 'stops.json', 'paths.json'))
+
+
+@pytest.fixture(scope='session')
+def registries(files):
+    route_vars, stops, paths = {}, {}, {}
+    load_routevar(route_vars, files[0])
+    load_stop(stops, files[1])
+    load_path(paths, files[2])
+    return route_vars, stops, paths
+
+
+@pytest.fixture(scope='session')
+def graph(network, registries):
+    # Shared by every test, those that change the graph work on graph.copy()
+    G = nx.MultiDiGraph()
+    with contextlib.chdir(network):
+        build_graph(G, registries[0], registries[2])
+    return G
+
+
+@pytest.fixture(scope='session')
+def csr(graph):
+    return CSRGraph.from_graph(graph)
+
+
+@pytest.fixture(scope='session')
+def pairs(graph):
+    rng = random.Random(0)
+    return [tuple(rng.sample(sorted(graph.nodes()), 2)) for _ in range(60)]
+
+
+@pytest.fixture(scope='session')
+def reference(graph):
+    # reference(s, t) is the travel time the networkx Dijkstra finds
+    trees = {}
+
+    def distance(start_stop, end_stop):
+        if start_stop not in trees:
+            trees[start_stop] = dijkstra_shortest_path(graph, start_stop)[0]
+        return trees[start_stop][end_stop]
+
+    return distance
+
+
+@pytest.fixture
+def path_time():
+    # path_time(G, path, end_stop) sums an edge path in the format of dijkstra_shortest_path_edge,
+    # failing if a hop is not an edge of G
+    def total(G, path, end_stop):
+        time = 0
+        for (u, key), (v, _) in zip(path, path[1:] + [(end_stop, None)]):
+            time += G[u][v][key]['Time']
+        return time
+
+    return total
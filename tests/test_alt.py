@@ -0,0 +1,69 @@
+import math
+
+import networkx as nx
+import pytest
+
+from alt import Landmarks
+from csr import CSRGraph
+from graph import a_star, dijkstra_shortest_path
+
+
+@pytest.mark.parametrize('method', ['farthest', 'planar'])
+def test_a_star_matches_dijkstra(csr, pairs, reference, method):
+    landmarks = Landmarks.build(csr, k=8, method=method)
+    for start, end in pairs:
+        predecessors, time = a_star(csr, start, end, landmarks=landmarks)
+        assert time == pytest.approx(reference(start, end))
+
+
+def test_heuristic_is_admissible(csr, reference):
+    landmarks = Landmarks.build(csr, k=8)
+    for end in csr.ids[::60]:
+        h = landmarks.heuristic(csr.index[end])
+        for start in csr.ids[::7]:
+            assert h(csr.index[start]) <= reference(start, end) + 1e-9
+
+
+def test_save_and_load(tmp_path, csr, pairs):
+    landmarks = Landmarks.build(csr, k=4)
+    file_path = str(tmp_path / 'landmarks.npz')
+    landmarks.save(file_path)
+    loaded = Landmarks.load(file_path)
+    for start, end in pairs[:10]:
+        assert loaded.a_star(csr, start, end) == landmarks.a_star(csr, start, end)
+
+
+def test_farthest_covers_every_component():
+    # Strongly connected components {1, 2} and {3, ..., 7}, nothing links them
+    G = nx.MultiDiGraph()
+    for u, v, time in [(1, 2, 1.0), (2, 1, 2.0), (3, 4, 1.0), (4, 5, 3.0), (5, 6, 1.0), (6, 7, 2.0), (7, 3, 1.0)]:
+        G.add_edge(u, v, key=(1, 1), Distance=time * 100, Time=time)
+    for node in G:
+        G.nodes[node]['x'], G.nodes[node]['y'] = float(node), 0.0
+    C = CSRGraph.from_graph(G)
+
+    landmarks = Landmarks.build(C, k=4)
+    assert len(landmarks.landmarks) == 4
+    assert {C.ids[landmark] for landmark in landmarks.landmarks} & {3, 4, 5, 6, 7}
+    assert sorted(Landmarks.build(C, k=10).landmarks.tolist()) == list(range(7))
+    for start in G:
+        distances = dijkstra_shortest_path(G, start)[0]
+        for end in G:
+            if end != start:
+                assert landmarks.a_star(C, start, end)[1] == distances.get(end, math.inf)
+
+
+def test_rejects_a_graph_with_changed_weights(tmp_path, graph, csr):
+    landmarks = Landmarks.build(csr, k=4)
+    G = graph.copy()
+    u, v = next(iter(G.edges()))
+    for data in G[u][v].values():
+        data['Time'] *= 4
+    start, end = csr.ids[0], csr.ids[1]
+    with pytest.raises(ValueError):
+        landmarks.a_star(G, start, end)
+
+    file_path = str(tmp_path / 'landmarks.npz')
+    landmarks.save(file_path)
+    with pytest.raises(ValueError):
+        Landmarks.load(file_path).a_star(G, start, end)
@@ -0,0 +1,45 @@
+from itertools import islice
+
+import networkx as nx
+import pytest
+
+from alternatives import k_shortest_paths
+from graph import add_transfer_edges
+
+
+@pytest.fixture(scope='module')
+def walking(graph, registries):
+    # Walking transfers give many alternatives between nearby stops
+    G = graph.copy()
+    add_transfer_edges(G, registries[1])
+    return G
+
+
+def test_matches_networkx_simple_paths(walking, pairs, path_time):
+    simple = nx.DiGraph()
+    for u, v, time in walking.edges(data='Time'):
+        if not simple.has_edge(u, v) or time < simple[u][v]['Time']:
+            simple.add_edge(u, v, Time=time)
+
+    for start, end in pairs[:20]:
+        alternatives = k_shortest_paths(walking, start, end, k=4)
+        if not nx.has_path(simple, start, end):
+            assert alternatives == []
+            continue
+        expected = [nx.path_weight(simple, path, 'Time')
+                    for path in islice(nx.shortest_simple_paths(simple, start, end, weight='Time'), 4)]
+        assert [time for _, time in alternatives] == pytest.approx(expected)
+
+        seen = set()
+        for path, time in alternatives:
+            nodes = tuple(u for u, _ in path) + (end,)
+            assert nodes[0] == start and len(set(nodes)) == len(nodes)
+            assert nodes not in seen
+            seen.add(nodes)
+            assert path_time(walking, path, end) == pytest.approx(time)
+
+
+def test_trivial_queries(csr):
+    stop = csr.ids[0]
+    assert k_shortest_paths(csr, stop, stop) == [([], 0)]
+    assert k_shortest_paths(csr, stop, csr.ids[1], k=0) == []
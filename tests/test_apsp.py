@@ -0,0 +1,13 @@
+import pytest
+
+from apsp import all_pair_shortest_paths_parallel
+
+
+def test_parallel_matches_dijkstra(graph, csr, pairs, reference, path_time):
+    with all_pair_shortest_paths_parallel(csr, workers=2, chunk_size=16) as result:
+        for start, end in pairs:
+            # The matrices hold float32 travel times
+            assert result.distance(start, end) == pytest.approx(reference(start, end), rel=1e-6)
+            path = result.path(start, end)
+            if path:
+                assert path_time(graph, path, end) == pytest.approx(reference(start, end))
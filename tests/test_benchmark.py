@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from alt import Landmarks
+from benchmark import PAIR_ALGORITHMS, od_pairs, run_benchmark
+from ch import ContractionHierarchy
+
+
+@pytest.mark.parametrize('workload', ['random', 'realistic'])
+def test_od_pairs_are_seeded(csr, workload):
+    pairs = od_pairs(csr, 50, workload, seed=1)
+    assert pairs == od_pairs(csr, 50, workload, seed=1)
+    assert all(start != end for start, end in pairs)
+
+
+def test_every_router_agrees_with_dijkstra(tmp_path, csr):
+    file_path = str(tmp_path / 'benchmark.json')
+    report = run_benchmark(csr, algorithms=['dijkstra', 'bidirectional', 'a_star_landmarks', 'ch', 'dijkstra_fibo'],
+                           pairs=40, workload='realistic', landmarks=Landmarks.build(csr, k=8),
+                           hierarchy=ContractionHierarchy.build(csr), file_path=file_path)
+    algorithms = report['algorithms']
+    for name in ('dijkstra', 'bidirectional', 'a_star_landmarks', 'ch'):
+        assert algorithms[name]['validation']['correct_ratio'] == 1.0
+    assert set(algorithms['dijkstra']['latency']) >= {'p50', 'p95', 'p99'}
+    # Only the searches that count their settled nodes report them
+    assert set(name for name, entry in algorithms.items() if 'settled' in entry) == {'dijkstra', 'a_star_landmarks'}
+    assert algorithms['a_star_landmarks']['settled']['p50'] <= algorithms['dijkstra']['settled']['p50']
+    with open(file_path, encoding='utf-8') as file:
+        assert json.load(file)['meta']['pairs'] == 40
+
+
+def test_settled_counts_do_not_depend_on_the_graph_type(graph, csr):
+    # The counts come from an untimed run on the CSR view, a MultiDiGraph gets them too
+    pairs = od_pairs(csr, 20, seed=2)
+    on_csr = run_benchmark(csr, algorithms=['dijkstra'], pairs=pairs)['algorithms']['dijkstra']
+    on_graph = run_benchmark(graph, algorithms=['dijkstra'], pairs=pairs)['algorithms']['dijkstra']
+    assert on_graph['settled'] == on_csr['settled']
+    assert on_graph['validation']['correct_ratio'] == 1.0
+    assert 'a_star' not in PAIR_ALGORITHMS
+
+
+def test_unknown_algorithm(csr):
+    with pytest.raises(ValueError):
+        run_benchmark(csr, algorithms=['teleport'], pairs=1)
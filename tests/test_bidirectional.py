@@ -0,0 +1,15 @@
+import pytest
+
+from graph import bidirectional_dijkstra, bidirectional_dijkstra_edge
+
+
+@pytest.mark.parametrize('on_csr', [False, True])
+def test_matches_dijkstra(graph, csr, pairs, reference, on_csr, path_time):
+    G = csr if on_csr else graph
+    for start, end in pairs:
+        path, time = bidirectional_dijkstra_edge(G, start, end)
+        assert time == pytest.approx(reference(start, end))
+        assert bidirectional_dijkstra(G, start, end)[1] == time
+        if path:
+            assert path[0][0] == start
+            assert path_time(graph, path, end) == pytest.approx(time)
@@ -0,0 +1,101 @@
+import contextlib
+import json
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph import build_graph, conv, match_stops
+from main import load_path, load_routevar
+from synthetic import generate_network
+
+
+def _edges(G):
+    return list(G.edges(keys=True, data=True))
+
+
+def _baseline_build(G, route_vars, paths, stops_file):
+    # build_graph as it was before matching and segment lengths were vectorized
+    with open(stops_file, encoding='utf-8') as file:
+        for line in file:
+            obj = json.loads(line)
+            route_id = int(obj['RouteId'])
+            var_id = int(obj['RouteVarId'])
+            path = paths[route_id, var_id]
+            x, y = conv.convert(path.get_lng(), path.get_lat())
+            stop_list = obj['Stops']
+            running_time = route_vars[route_id, var_id].get_running_time()
+            total_dist = route_vars[route_id, var_id].get_distance()
+
+            match = []
+            for stop in stop_list:
+                stop_x, stop_y = conv.convert(stop['Lng'], stop['Lat'])
+                match_ind = match[-1]+1 if match else 0
+                distance = conv.cartesian_distance(stop_x, stop_y, x[match_ind], y[match_ind])
+                for i in range(match_ind+1, len(x)):
+                    dist = conv.cartesian_distance(stop_x, stop_y, x[i], y[i])
+                    if distance > dist:
+                        distance = dist
+                        match_ind = i
+                match.append(match_ind)
+
+            dist = 0
+            prev_stop_index = 0
+            for i in range(len(x)-1):
+                dist += conv.cartesian_distance(x[i], y[i], x[i+1], y[i+1])
+                if match[prev_stop_index+1] == i+1:
+                    u, v = stop_list[prev_stop_index]['StopId'], stop_list[prev_stop_index+1]['StopId']
+                    G.add_edge(u, v, key=(route_id, var_id), Distance=dist, Time=running_time*dist/total_dist)
+                    G.nodes[u]['x'], G.nodes[u]['y'] = x[i], y[i]
+                    G.nodes[v]['x'], G.nodes[v]['y'] = x[i+1], y[i+1]
+                    dist = 0
+                    prev_stop_index += 1
+                    if prev_stop_index == len(stop_list)-1:
+                        break
+
+
+def test_match_stops_matches_forward_scan():
+    rng = np.random.default_rng(0)
+    x, y = rng.random(200).cumsum(), rng.random(200)
+    stop_x, stop_y = x[::9] + rng.normal(0, 0.3, 23), y[::9] + rng.normal(0, 0.3, 23)
+
+    # The original loop: every stop takes the closest point after the previous match
+    expected = []
+    start = 0
+    for sx, sy in zip(stop_x, stop_y):
+        distances = [np.hypot(sx - px, sy - py) for px, py in zip(x[start:], y[start:])]
+        start += int(np.argmin(distances))
+        expected.append(start)
+        start += 1
+
+    assert match_stops(x, y, stop_x, stop_y) == expected
+    assert match_stops(x, y, stop_x, stop_y, max_cells=len(x)) == expected
+
+
+
+@pytest.mark.parametrize('workers', [2, None])
+def test_parallel_build_matches_serial(network, registries, graph, workers):
+    route_vars, _, paths = registries
+    G = nx.MultiDiGraph()
+    with contextlib.chdir(network):
+        build_graph(G, route_vars, paths, workers=workers)
+    # Results are merged in file order, so even the insertion order is the same
+    assert list(G.nodes(data=True)) == list(graph.nodes(data=True))
+    assert _edges(G) == _edges(graph)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_build_matches_baseline(tmp_path, workers):
+    # A dense polyline, where np.sqrt over the segments used to round some lengths differently
+    generate_network(str(tmp_path / 'data'), routes=30, stops_per_route=20, seed=5, polyline_density=7)
+    route_vars, paths = {}, {}
+    load_routevar(route_vars, str(tmp_path / 'data' / 'vars.json'))
+    load_path(paths, str(tmp_path / 'data' / 'paths.json'))
+
+    expected = nx.MultiDiGraph()
+    _baseline_build(expected, route_vars, paths, str(tmp_path / 'data' / 'stops.json'))
+    G = nx.MultiDiGraph()
+    with contextlib.chdir(tmp_path):
+        build_graph(G, route_vars, paths, workers=workers)
+    assert dict(G.nodes(data=True)) == dict(expected.nodes(data=True))
+    assert _edges(G) == _edges(expected)
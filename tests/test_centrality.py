@@ -0,0 +1,75 @@
+import networkx as nx
+import pytest
+
+from centrality import IncrementalStress
+from csr import CSRGraph
+from graph import (approximate_stress_centrality, approximate_stress_centrality_fibo, merge_variant, stress_centrality,
+                   stress_centrality_fibo, stress_dijkstra, withdraw_variant)
+from priority_queue import LazyHeap
+
+
+@pytest.fixture(scope='module')
+def exact(graph):
+    return {endpoint: stress_centrality(graph, endpoint=endpoint) for endpoint in (False, True)}
+
+
+@pytest.mark.parametrize('endpoint', [False, True])
+def test_csr_and_parallel_match_networkx(csr, exact, endpoint):
+    assert stress_centrality(csr, endpoint=endpoint) == pytest.approx(exact[endpoint])
+    assert stress_centrality(csr, endpoint=endpoint, workers=2) == pytest.approx(exact[endpoint])
+    # Both sum exact integers, whatever order the shards finish in
+    assert stress_centrality(csr, endpoint=endpoint, workers=2) == stress_centrality(csr, endpoint=endpoint)
+
+
+def test_approximate_is_exact_with_every_source(csr, exact):
+    stress, intervals, samples = approximate_stress_centrality(csr, epsilon=0.0, seed=0)
+    assert samples == len(csr)
+    assert stress == pytest.approx(exact[False])
+    for node, (low, high) in intervals.items():
+        assert low <= stress[node] <= high
+
+
+@pytest.mark.parametrize('method', ['uniform', 'degree'])
+def test_approximate_sample(csr, method):
+    stress, intervals, samples = approximate_stress_centrality(csr, max_samples=64, method=method, seed=0)
+    assert samples <= 64
+    assert set(stress) == set(csr.ids)
+    assert all(value >= 0 for value in stress.values())
+    assert approximate_stress_centrality(csr, max_samples=64, method=method, seed=0)[0] == stress
+
+
+def test_incremental_matches_recomputing(graph, exact):
+    G = graph.copy()
+    incremental = IncrementalStress(G)
+    assert incremental.stress() == pytest.approx(exact[False])
+
+    route_id, var_id = next(key for _, _, key in G.edges(keys=True))
+    withdrawn = [(u, v, key, data['Distance'], data['Time'])
+                 for u, v, key, data in G.edges(keys=True, data=True) if key == (route_id, var_id)]
+    withdraw_variant(G, route_id, var_id)
+    rerun = incremental.update(G)
+    assert len(rerun) < len(G)
+    assert incremental.stress() == pytest.approx(stress_centrality(G))
+
+    merge_variant(G, (withdrawn, []))
+    incremental.update(G)
+    assert incremental.stress() == pytest.approx(exact[False])
+
+
+def test_zero_weight_edge_back_to_the_source():
+    # Settling 2 ties the zero-weight edge 2 -> 1 with the source's own distance
+    G = nx.MultiDiGraph()
+    G.add_edge(1, 2, key=(1, 1), Distance=0, Time=0)
+    G.add_edge(2, 1, key=(1, 2), Distance=0, Time=0)
+    G.add_edge(2, 3, key=(1, 1), Distance=100, Time=1)
+    C = CSRGraph.from_graph(G)
+
+    expected = stress_centrality(G)
+    assert stress_centrality(C) == expected
+    assert stress_centrality(C, workers=2) == expected
+    assert approximate_stress_centrality(C, epsilon=0.0, seed=0)[0] == expected
+    assert IncrementalStress(G).stress() == expected
+    assert stress_centrality_fibo(C) == stress_centrality_fibo(G)
+    assert approximate_stress_centrality_fibo(C, epsilon=0.0, seed=0)[0] == stress_centrality_fibo(G)
+    for s in G:
+        assert stress_dijkstra(G, s, queue=LazyHeap()) == stress_dijkstra(G, s)
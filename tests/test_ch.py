@@ -0,0 +1,24 @@
+import pytest
+
+from ch import ContractionHierarchy
+
+
+@pytest.fixture(scope='module')
+def hierarchy(csr):
+    return ContractionHierarchy.build(csr)
+
+
+def test_query_matches_dijkstra(graph, hierarchy, pairs, reference, path_time):
+    for start, end in pairs:
+        path, time = hierarchy.query(start, end)
+        assert time == pytest.approx(reference(start, end))
+        if path:
+            assert path_time(graph, path, end) == pytest.approx(time)
+
+
+def test_save_and_load(tmp_path, hierarchy, pairs):
+    file_path = str(tmp_path / 'graph.ch')
+    hierarchy.save(file_path)
+    loaded = ContractionHierarchy.load(file_path)
+    for start, end in pairs:
+        assert loaded.query(start, end) == hierarchy.query(start, end)
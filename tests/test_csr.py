@@ -0,0 +1,42 @@
+import pytest
+
+from csr import CSRGraph
+from graph import (dijkstra_one_dest_shortest_path, dijkstra_shortest_path, dijkstra_shortest_path_edge,
+                   floyd_warshall)
+
+
+def test_from_graph_keeps_fastest_parallel_edge(graph, csr):
+    assert csr.ids == sorted(graph.nodes())
+    for u in csr.ids[:50]:
+        source = csr.index[u]
+        for edge in range(csr.offsets[source], csr.offsets[source+1]):
+            v = csr.ids[csr.targets[edge]]
+            assert csr.weights[edge] == min(data['Time'] for data in graph[u][v].values())
+            assert graph[u][v][csr.keys[edge]]['Time'] == csr.weights[edge]
+
+
+def test_dijkstra_shortest_path_matches_networkx(graph, csr):
+    for start in csr.ids[::25]:
+        expected, _ = dijkstra_shortest_path(graph, start)
+        distances, predecessors = dijkstra_shortest_path(csr, start)
+        assert distances == pytest.approx(expected)
+        for node, (previous, key) in predecessors.items():
+            assert distances[previous] + graph[previous][node][key]['Time'] == pytest.approx(distances[node])
+
+
+def test_single_pair_matches_networkx(graph, csr, pairs, reference, path_time):
+    for start, end in pairs:
+        path, time = dijkstra_shortest_path_edge(csr, start, end)
+        assert time == pytest.approx(reference(start, end))
+        assert dijkstra_one_dest_shortest_path(csr, start, end)[1] == pytest.approx(time)
+        if path:
+            assert path_time(graph, path, end) == pytest.approx(time)
+
+
+def test_floyd_warshall_matches_dijkstra(graph, csr):
+    distances, _ = floyd_warshall(csr)
+    for start in csr.ids[::40]:
+        expected = dict(dijkstra_shortest_path(graph, start)[0])
+        # Like the networkx version, a stop is only at a finite time from itself through a cycle
+        expected[start] = distances[start][start]
+        assert distances[start] == pytest.approx(expected)
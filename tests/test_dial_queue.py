@@ -0,0 +1,28 @@
+import pytest
+
+from graph import scaled_rounding_error, shortest_path_tree
+from priority_queue import DialQueue
+
+
+def test_dial_matches_heap_on_scaled_weights(csr):
+    scaled = csr.scaled()
+    queue = DialQueue(scaled.weights.max())
+    for source in range(0, len(csr), 40):
+        distances, _, _ = shortest_path_tree(scaled, source, queue=queue)
+        assert distances == shortest_path_tree(scaled, source)[0]
+
+
+def test_scaled_rounding_error_is_bounded(csr):
+    result = scaled_rounding_error(csr, resolution=1/60, sources=16)
+    assert result['pairs'] > 0
+    # Every hop is off by at most half a second
+    assert result['max_error'] <= len(csr) * 0.5 / 60
+    assert result['mean_error'] <= result['max_error']
+
+
+def test_dial_pops_by_priority_then_item():
+    queue = DialQueue(10)
+    for item, priority in enumerate([7, 3, 10, 3, 0]):
+        queue.push(priority, item)
+    queue.decrease_key(2, 1)
+    assert [queue.pop() for _ in range(len(queue))] == [(0, 4), (1, 2), (3, 1), (3, 3), (7, 0)]
@@ -0,0 +1,20 @@
+import math
+
+import numpy as np
+import pytest
+
+from graph import dijkstra_shortest_path, floyd_warshall_blocked
+
+
+@pytest.mark.parametrize('block_size', [64, 1000])
+def test_blocked_matches_dijkstra(graph, csr, block_size):
+    distances, predecessors = floyd_warshall_blocked(csr, block_size=block_size)
+    assert np.all(np.diag(distances) == 0)
+    for start in csr.ids[::30]:
+        expected, _ = dijkstra_shortest_path(graph, start)
+        row = csr.index[start]
+        for node, time in expected.items():
+            column = csr.index[node]
+            assert distances[row, column] == pytest.approx(time)
+            if node != start:
+                assert (predecessors[row, column] < 0) == math.isinf(time)
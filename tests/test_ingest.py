@@ -0,0 +1,52 @@
+import networkx as nx
+import pytest
+
+from graph import build_graph
+from ingest import ingest
+from main import load_path, load_routevar, load_stop
+
+
+def _edges(G):
+    return list(G.edges(keys=True, data=True))
+
+
+@pytest.fixture(scope='module')
+def loaded(files):
+    # The registries and graph as main built them before the ingestion pipeline
+    route_vars, stops, paths = {}, {}, {}
+    load_routevar(route_vars, files[0])
+    load_stop(stops, files[1])
+    load_path(paths, files[2])
+    G = nx.MultiDiGraph()
+    build_graph(G, route_vars, paths, file_path=files[1])
+    return route_vars, stops, paths, G
+
+
+def test_registries_match_loaders(registries, loaded):
+    for ingested, expected in zip(registries, loaded):
+        assert list(ingested) == list(expected)
+        assert [vars(value) for value in ingested.values()] == [vars(value) for value in expected.values()]
+
+
+@pytest.mark.parametrize('workers, window', [(1, None), (2, 3)])
+def test_graph_matches_build_graph(files, loaded, workers, window):
+    G = nx.MultiDiGraph()
+    ingest(*files, G=G, workers=workers, window=window)
+    expected = loaded[3]
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert _edges(G) == _edges(expected)
+
+
+def test_stops_alone_read_only_stops_json(tmp_path, files, loaded):
+    # What main does when the graph snapshot is fresh, the other two inputs are never opened
+    stops = {}
+    missing = str(tmp_path / 'missing.json')
+    ingest(missing, files[1], missing, stops=stops)
+    assert [vars(value) for value in stops.values()] == [vars(value) for value in loaded[1].values()]
+
+
+def test_graph_with_stops_only(files, loaded):
+    G, stops = nx.MultiDiGraph(), {}
+    ingest(*files, G=G, stops=stops)
+    assert _edges(G) == _edges(loaded[3])
+    assert [vars(value) for value in stops.values()] == [vars(value) for value in loaded[1].values()]
@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from alt import Landmarks
+from csr import CSRGraph
+from graph import (a_star, approximate_stress_centrality, bidirectional_dijkstra, bidirectional_dijkstra_edge,
+                   dijkstra_shortest_path, dijkstra_shortest_path_edge, dijkstra_shortest_path_fibo, stress_centrality,
+                   top_k)
+from priority_queue import DialQueue, FibonacciQueue, IndexedDaryHeap, LazyHeap
+
+
+QUEUES = [LazyHeap, IndexedDaryHeap, lambda: IndexedDaryHeap(d=2), FibonacciQueue]
+
+
+def _drain(queue, operations):
+    # Runs pushes and decrease-keys, popping after every few, and returns what came out
+    popped = []
+    for i, (item, priority) in enumerate(operations):
+        if item in queue:
+            queue.decrease_key(item, priority)
+        elif item not in {popped_item for _, popped_item in popped}:
+            queue.push(priority, item)
+        if i % 3 == 2 and len(queue):
+            popped.append(queue.pop())
+    while len(queue):
+        popped.append(queue.pop())
+    return popped
+
+
+@pytest.mark.parametrize('make_queue', QUEUES)
+def test_queue_order(make_queue):
+    rng = random.Random(0)
+    operations = [(rng.randrange(200), rng.randrange(1000)) for _ in range(2000)]
+    queue = make_queue()
+    popped = _drain(queue, operations)
+    # Ties break by item, so every queue pops exactly what the plain heapq does
+    assert popped == _drain(LazyHeap(), operations)
+    assert len(popped) == len({item for _, item in popped})
+    queue.clear()
+    assert len(queue) == 0
+
+
+@pytest.mark.parametrize('make_queue', QUEUES)
+def test_dijkstra_on_every_queue(graph, csr, pairs, reference, make_queue):
+    queue = make_queue()
+    for start, end in pairs[:20]:
+        assert dijkstra_shortest_path_edge(csr, start, end, queue=queue)[1] == pytest.approx(reference(start, end))
+    start = pairs[0][0]
+    assert dijkstra_shortest_path(csr, start, queue=queue)[0] == pytest.approx(dijkstra_shortest_path(graph, start)[0])
+
+
+@pytest.mark.parametrize('make_queue', QUEUES + [lambda: DialQueue(1000)])
+def test_peek(make_queue):
+    rng = random.Random(1)
+    queue = make_queue()
+    current = {}
+    # Priorities never go below the last one popped, as in Dijkstra, which DialQueue relies on
+    floor = 0
+    for step in range(600):
+        item = rng.randrange(100)
+        if item in queue:
+            current[item] = rng.randint(floor, current[item])
+            queue.decrease_key(item, current[item])
+        elif item not in current:
+            current[item] = rng.randint(floor, 900)
+            queue.push(current[item], item)
+        if step % 4 == 3 and queue:
+            head = queue.peek()
+            assert queue.peek() == head
+            assert queue.pop() == head
+            floor = head[0]
+
+
+@pytest.mark.parametrize('make_queue', QUEUES)
+def test_searches_on_every_queue(graph, csr, pairs, make_queue):
+    queue = make_queue()
+    landmarks = Landmarks.build(csr, k=8)
+    # With every coordinate at 0 the heuristic of the plain a_star is 0 and the search finishes
+    flat = graph.copy()
+    for node in flat:
+        flat.nodes[node]['x'] = flat.nodes[node]['y'] = 0.0
+    flat = CSRGraph.from_graph(flat)
+    for start, end in pairs[:30]:
+        assert bidirectional_dijkstra_edge(csr, start, end, queue=queue) == bidirectional_dijkstra_edge(csr, start, end)
+        assert bidirectional_dijkstra(graph, start, end, queue=queue) == bidirectional_dijkstra(graph, start, end)
+        assert landmarks.a_star(csr, start, end, queue=queue) == landmarks.a_star(csr, start, end)
+        assert a_star(csr, start, end, landmarks=landmarks, queue=queue) == landmarks.a_star(csr, start, end)
+        assert a_star(flat, start, end, queue=queue) == a_star(flat, start, end)
+
+
+def test_bidirectional_on_dial_queue(csr, pairs):
+    scaled = csr.scaled()
+    queue = DialQueue(scaled.weights.max())
+    for start, end in pairs[:30]:
+        assert bidirectional_dijkstra_edge(scaled, start, end, queue=queue) == bidirectional_dijkstra_edge(scaled, start, end)
+
+
+def test_stress_on_a_queue(tmp_path, graph, csr, registries):
+    # (time, predecessor) priorities, any queue but DialQueue holds them
+    expected = stress_centrality(csr)
+    assert stress_centrality(csr, queue=IndexedDaryHeap()) == expected
+    assert stress_centrality(graph, queue=FibonacciQueue(), workers=2) == expected
+    sample = approximate_stress_centrality(csr, max_samples=40, seed=0)
+    assert approximate_stress_centrality(csr, max_samples=40, seed=0, queue=IndexedDaryHeap()) == sample
+
+    options = {'max_samples': 40, 'seed': 0}
+    top_k(str(tmp_path / 'heapq.json'), csr, registries[1], k=5, approximate=options)
+    top_k(str(tmp_path / 'queue.json'), csr, registries[1], k=5, approximate=options, queue=IndexedDaryHeap())
+    assert (tmp_path / 'queue.json').read_text(encoding='utf-8') == (tmp_path / 'heapq.json').read_text(encoding='utf-8')
+
+
+def test_fibonacci_dijkstra_matches_networkx(graph, csr):
+    # Runs the heap down to a single node, which consolidate used to index past its table on
+    for start in csr.ids[::20]:
+        predecessors, distances = dijkstra_shortest_path_fibo(graph, start)
+        assert dijkstra_shortest_path_fibo(csr, start)[1] == pytest.approx(distances)
+        assert distances == pytest.approx(dijkstra_shortest_path(graph, start)[0])
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+from unidecode import unidecode
+
+from query_index import HashIndex, SortedIndex
+from stops import StopQuery
+from vars import RouteVarQuery
+
+
+@pytest.fixture(scope='module')
+def stop_query(files):
+    query = StopQuery()
+    query.load_data(files[1])
+    return query
+
+
+@pytest.fixture(scope='module')
+def route_query(files):
+    query = RouteVarQuery()
+    query.load_data(files[0])
+    return query
+
+
+def _scan_routes(route_vars, **kwargs):
+    # search_routes_by as it was before the indexes
+    for key, value in kwargs.items():
+        if type(value) == str:
+            route_vars = [route_var for route_var in route_vars
+                          if unidecode(getattr(route_var, f"get_{key}")()).lower() == unidecode(value).lower()]
+        else:
+            route_vars = [route_var for route_var in route_vars if getattr(route_var, f"get_{key}")() == value]
+    return route_vars
+
+
+def test_stop_search_matches_filters(stop_query):
+    rng = random.Random(0)
+    for _ in range(200):
+        stop = rng.choice(stop_query.stops)
+        zone, street, lat = stop.get_zone(), stop.get_street(), stop.get_lat()
+        assert stop_query.search_stops_by(zone=zone) == StopQuery.search_by_zone(stop_query.stops, zone)
+        assert stop_query.search_stops_by(street=street, zone=zone, lat=lat) == \
+            StopQuery.search_by_lat(StopQuery.search_by_zone(StopQuery.search_by_street(stop_query.stops, street), zone), lat)
+        # Name has no index and is checked on the candidates
+        assert stop_query.search_stops_by(zone=zone, name=stop.get_name()) == \
+            StopQuery.search_by_name(StopQuery.search_by_zone(stop_query.stops, zone), stop.get_name())
+
+        low, high = sorted((lat, rng.choice(stop_query.stops).get_lat()))
+        assert stop_query.search_stops_by(lat=(low, high)) == [s for s in stop_query.stops if low <= s.get_lat() <= high]
+        assert stop_query.search_stops_by(lat=(None, high), zone=zone) == \
+            [s for s in stop_query.stops if s.get_lat() <= high and s.get_zone() == zone]
+
+
+def test_route_search_matches_scan(route_query):
+    rng = random.Random(0)
+    for _ in range(100):
+        route_var = rng.choice(route_query.route_vars)
+        route_no = route_var.get_route_no()
+        for value in (route_no, route_no.upper(), unidecode(route_no)):
+            assert route_query.search_routes_by(route_no=value) == _scan_routes(route_query.route_vars, route_no=value)
+        assert route_query.search_routes_by(distance=route_var.get_distance(), var_name=route_var.get_var_name()) == \
+            _scan_routes(route_query.route_vars, distance=route_var.get_distance(), var_name=route_var.get_var_name())
+        low = route_var.get_running_time()
+        assert route_query.search_routes_by(running_time=(low, None)) == \
+            [r for r in route_query.route_vars if r.get_running_time() >= low]
+
+
+def test_values_of_another_type_match_nothing(stop_query, route_query):
+    assert stop_query.search_stops_by(lat=str(stop_query.stops[0].get_lat())) == []
+    assert stop_query.search_stops_by(lat=("10.7", None)) == []
+    assert route_query.search_routes_by(distance=None) == _scan_routes(route_query.route_vars, distance=None)
+    assert SortedIndex([1, 2.5, 'x', float('nan'), True, 2.5]).find(2.5) == [1, 5]
+    assert HashIndex(['Bến', 'ben'], normalize=lambda text: unidecode(text).lower()).find('BEN') == [0, 1]
+
+
+def test_indexes_follow_list_changes(files):
+    query = StopQuery()
+    query.load_data(files[1])
+    stop, other = query.stops[:2]
+    count = len(query.search_stops_by(zone=stop.get_zone()))
+
+    query.stops.append(stop)
+    assert len(query.search_stops_by(zone=stop.get_zone())) == count + 1
+    assert query.search_nearest_stops(stop.get_lng(), stop.get_lat(), k=2) == [stop, stop]
+
+    query.stops = [stop]
+    assert query.search_stops_by(stop_id=stop.get_stop_id()) == [stop]
+
+    # Replacing an element keeps the length, so it needs an explicit reindex
+    query.stops[0] = other
+    query.reindex()
+    assert query.search_stops_by(stop_id=other.get_stop_id()) == [other]
+    assert query.search_stops_by(stop_id=stop.get_stop_id()) == []
+
+    routes = RouteVarQuery()
+    routes.load_data(files[0])
+    routes.route_vars = routes.route_vars[:1]
+    assert routes.search_routes_by(route_no=routes.route_vars[0].get_route_no()) == routes.route_vars
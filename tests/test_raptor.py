@@ -0,0 +1,36 @@
+import pytest
+
+from graph import add_transfer_edges, dijkstra_shortest_path_edge
+from raptor import RaptorRouter
+
+
+@pytest.fixture(scope='module')
+def walking(graph, registries):
+    G = graph.copy()
+    add_transfer_edges(G, registries[1])
+    return G
+
+
+@pytest.mark.parametrize('with_walks', [False, True])
+def test_fastest_journey_matches_dijkstra(files, registries, graph, walking, pairs, with_walks, path_time):
+    route_vars, _, paths = registries
+    G = walking if with_walks else graph
+    router = RaptorRouter.build(route_vars, paths, file_path=files[1], G=G if with_walks else None)
+    for start, end in pairs:
+        path, time = router.shortest_path_edge(start, end)
+        assert time == pytest.approx(dijkstra_shortest_path_edge(G, start, end)[1])
+        if path:
+            assert path_time(G, path, end) == pytest.approx(time)
+
+
+def test_pareto_journeys(files, registries, walking, pairs, path_time):
+    route_vars, _, paths = registries
+    router = RaptorRouter.build(route_vars, paths, file_path=files[1], G=walking)
+    for start, end in pairs:
+        journeys = router.query(start, end)
+        for (time, transfers, path), (next_time, next_transfers, _) in zip(journeys, journeys[1:]):
+            assert transfers < next_transfers
+            assert next_time < time
+        for time, transfers, path in journeys:
+            assert path_time(walking, path, end) == pytest.approx(time)
+            assert router.shortest_path_edge(start, end, max_transfers=transfers)[1] <= time
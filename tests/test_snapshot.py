@@ -0,0 +1,45 @@
+import shutil
+
+import networkx as nx
+import numpy as np
+
+from snapshot import load_or_build, load_snapshot, save_snapshot
+
+
+def test_snapshot_round_trip(tmp_path, files, graph, csr):
+    file_path = str(tmp_path / 'graph.snap')
+    save_snapshot(file_path, graph, files)
+    snapshot = load_snapshot(file_path, files)
+
+    G = snapshot.to_graph()
+    assert list(G.nodes(data=True)) == list(graph.nodes(data=True))
+    assert list(G.edges(keys=True, data=True)) == list(graph.edges(keys=True, data=True))
+
+    view = snapshot.to_csr()
+    assert view.ids == csr.ids
+    assert view.keys == csr.keys
+    for name in ('offsets', 'targets', 'weights'):
+        assert np.array_equal(getattr(view, name), getattr(csr, name))
+
+
+def test_snapshot_rebuilt_when_inputs_change(tmp_path, files, graph):
+    sources = [str(tmp_path / name) for name in ('vars.json', 'stops.json', 'paths.json')]
+    for source, target in zip(files, sources):
+        shutil.copy(source, target)
+    file_path = str(tmp_path / 'graph.snap')
+    builds = []
+
+    def build():
+        builds.append(1)
+        return graph
+
+    load_or_build(file_path, sources, build)
+    load_or_build(file_path, sources, build)
+    assert len(builds) == 1
+
+    with open(sources[0], 'a', encoding='utf-8') as file:
+        file.write('\n')
+    assert load_snapshot(file_path, sources) is None
+    load_or_build(file_path, sources, build)
+    assert len(builds) == 2
+    assert load_snapshot(str(tmp_path / 'missing.snap')) is None
@@ -0,0 +1,68 @@
+import math
+import random
+
+import pytest
+
+from convert import Converter
+from spatial import StopIndex
+from stops import StopQuery
+
+
+@pytest.fixture(scope='module')
+def stop_list(registries):
+    return list(registries[1].values())
+
+
+@pytest.fixture(scope='module')
+def points(stop_list):
+    # Query points around and between the stops, a few of them outside the network
+    rng = random.Random(0)
+    lngs = [stop.get_lng() for stop in stop_list]
+    lats = [stop.get_lat() for stop in stop_list]
+    return [(rng.uniform(min(lngs) - 0.01, max(lngs) + 0.01), rng.uniform(min(lats) - 0.01, max(lats) + 0.01))
+            for _ in range(40)]
+
+
+@pytest.fixture(scope='module')
+def brute_force(stop_list):
+    # brute_force(lng, lat) is [(distance, position in stop_list), ...] to every stop, sorted
+    converter = Converter()
+    stop_xy = [converter.convert(stop.get_lng(), stop.get_lat()) for stop in stop_list]
+
+    def distances(lng, lat):
+        x, y = converter.convert(lng, lat)
+        return sorted((math.hypot(sx - x, sy - y), i) for i, (sx, sy) in enumerate(stop_xy))
+
+    return distances
+
+
+@pytest.mark.parametrize('cell_size', [100.0, 250.0, 5000.0])
+def test_queries_match_brute_force(stop_list, points, brute_force, cell_size):
+    index = StopIndex(stop_list, cell_size=cell_size)
+    for lng, lat in points:
+        expected = brute_force(lng, lat)
+        nearest = index.nearest(lng, lat, k=5)
+        assert [distance for distance, _ in nearest] == pytest.approx([distance for distance, _ in expected[:5]])
+
+        within = index.within(lng, lat, 600.0)
+        assert [stop_list.index(stop) for _, stop in within] == [i for distance, i in expected if distance <= 600.0]
+
+        box = (lng - 0.005, lat - 0.005, lng + 0.005, lat + 0.005)
+        assert index.in_bbox(*box) == [stop for stop in stop_list
+                                       if box[0] <= stop.get_lng() <= box[2] and box[1] <= stop.get_lat() <= box[3]]
+
+
+def test_empty_and_small_indexes(stop_list):
+    assert StopIndex([]).nearest(106.7, 10.78, k=3) == []
+    assert StopIndex([]).within(106.7, 10.78, 100.0) == []
+    assert len(StopIndex(stop_list[:2]).nearest(106.7, 10.78, k=5)) == 2
+
+
+def test_stop_query_uses_index(files, stop_list, points):
+    query = StopQuery()
+    query.load_data(files[1])
+    lng, lat = points[0]
+    nearest = query.search_nearest_stops(lng, lat, k=3)
+    assert [stop.get_stop_id() for stop in nearest] == \
+        [stop.get_stop_id() for _, stop in StopIndex(query.stops).nearest(lng, lat, k=3)]
+    assert query.search_stops_within(lng, lat, 0.0) == []
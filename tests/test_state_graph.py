@@ -0,0 +1,62 @@
+import networkx as nx
+import pytest
+
+from graph import TRANSFER_KEY, add_transfer_edges, dijkstra_shortest_path_edge
+from state_graph import StateGraph
+
+
+@pytest.fixture(scope='module')
+def walking(graph, registries):
+    G = graph.copy()
+    add_transfer_edges(G, registries[1])
+    return G
+
+
+def test_zero_penalties_match_dijkstra(walking, pairs, path_time):
+    states = StateGraph.build(walking, board_penalty=0.0, transfer_penalty=0.0)
+    for start, end in pairs:
+        path, time = states.shortest_path_edge(start, end)
+        assert time == pytest.approx(dijkstra_shortest_path_edge(walking, start, end)[1])
+        if path:
+            assert path_time(walking, path, end) == pytest.approx(time)
+
+
+def test_penalties_trade_time_for_transfers(walking, pairs, path_time):
+    states = StateGraph.build(walking)
+    for start, end in pairs:
+        fastest = dijkstra_shortest_path_edge(walking, start, end)[1]
+        previous = None
+        for penalty in (0.0, 5.0, 60.0):
+            path, time, transfers = states.query(start, end, transfer_penalty=penalty)
+            assert time >= fastest - 1e-9
+            if path:
+                assert path_time(walking, path, end) == pytest.approx(time)
+            if previous is not None:
+                assert transfers <= previous
+            previous = transfers
+
+
+def _line_graph(edges):
+    G = nx.MultiDiGraph()
+    for u, v, key, time in edges:
+        G.add_edge(u, v, key=key, Distance=time * 100, Time=time)
+    return StateGraph.build(G, board_penalty=1.0, transfer_penalty=5.0)
+
+
+def test_walking_off_the_last_bus_is_not_a_transfer():
+    # Riding to 2 and walking to 3 takes 12 minutes, the direct bus 14. Getting off the last
+    # bus is free, so the walk wins by 2 minutes even with a 5 minute transfer penalty
+    states = _line_graph([(1, 2, (1, 1), 10.0), (2, 3, TRANSFER_KEY, 2.0), (1, 3, (2, 1), 14.0)])
+    assert states.query(1, 3) == ([(1, (1, 1)), (2, TRANSFER_KEY)], 12.0, 0)
+
+
+def test_changing_buses_is_charged_on_boarding():
+    # Changing at 2 takes 20 minutes and the direct bus 23, the change costs 5 more
+    states = _line_graph([(1, 2, (1, 1), 10.0), (2, 3, (2, 1), 10.0), (1, 3, (3, 1), 23.0)])
+    assert states.query(1, 3) == ([(1, (3, 1))], 23.0, 0)
+    assert states.query(1, 3, transfer_penalty=2.0) == ([(1, (1, 1)), (2, (2, 1))], 20.0, 1)
+    # Walking between the two buses is still a change
+    states = _line_graph([(1, 2, (1, 1), 10.0), (2, 4, TRANSFER_KEY, 1.0), (4, 3, (2, 1), 9.0),
+                          (1, 3, (3, 1), 23.0)])
+    assert states.query(1, 3) == ([(1, (3, 1))], 23.0, 0)
+    assert states.query(1, 3, transfer_penalty=2.0)[1:] == (20.0, 1)
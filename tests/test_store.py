@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from apsp import all_pair_shortest_paths_parallel
+from store import DistanceStore
+
+
+def _crash_after_first_chunk(file_path, G):
+    # The whole run dies at its first progress report, workers included, without closing
+    # or flushing anything
+    def crash(done, total):
+        for child in multiprocessing.active_children():
+            child.kill()
+        os._exit(3)
+
+    all_pair_shortest_paths_parallel(G, workers=2, chunk_size=8, store=DistanceStore.open(file_path, 'r+'),
+                                     progress=crash)
+
+
+def test_store_matches_dijkstra(tmp_path, csr, pairs, reference):
+    file_path = str(tmp_path / 'all_pair.dist')
+    store = DistanceStore.create(file_path, csr.ids)
+    assert store.pending() == list(range(len(csr)))
+    all_pair_shortest_paths_parallel(csr, workers=2, store=store)
+    assert store.pending() == []
+    store.close()
+
+    with DistanceStore.open(file_path) as store:
+        assert store.ids == csr.ids
+        for start, end in pairs:
+            # The store holds float32 travel times
+            assert store.distance(start, end) == pytest.approx(reference(start, end), rel=1e-6)
+        distances, _ = store.row(pairs[0][0])
+        assert distances[csr.index[pairs[0][1]]] == store.distance(*pairs[0])
+
+
+def test_interrupted_run_resumes(tmp_path, csr, reference):
+    file_path = str(tmp_path / 'all_pair.dist')
+    DistanceStore.create(file_path, csr.ids).close()
+    process = multiprocessing.get_context('fork').Process(target=_crash_after_first_chunk, args=(file_path, csr))
+    process.start()
+    process.join(60)
+    assert process.exitcode == 3
+
+    store = DistanceStore.open(file_path, 'r+')
+    pending = store.pending()
+    assert 0 < len(pending) < len(csr)
+    # Every row marked done before the crash is complete
+    for source in np.flatnonzero(store.done).tolist():
+        start = csr.ids[source]
+        assert store.row(start)[0].tolist() == pytest.approx([reference(start, end) for end in csr.ids], rel=1e-6)
+
+    reports = []
+    all_pair_shortest_paths_parallel(csr, workers=2, chunk_size=8, store=store,
+                                     progress=lambda done, total: reports.append(done))
+    # Only the pending sources ran again
+    assert reports[0] > len(csr) - len(pending)
+    assert reports[-1] == len(csr)
+    assert store.pending() == []
+    for start in csr.ids[::10]:
+        assert store.row(start)[0].tolist() == pytest.approx([reference(start, end) for end in csr.ids], rel=1e-6)
+    store.close()
+
+
+def test_store_rejects_other_graph(tmp_path, csr):
+    store = DistanceStore.create(str(tmp_path / 'other.dist'), csr.ids[:-1])
+    with pytest.raises(ValueError):
+        all_pair_shortest_paths_parallel(csr, workers=1, store=store)
+    store.close()
@@ -0,0 +1,45 @@
+import contextlib
+
+import networkx as nx
+
+from graph import build_graph
+from main import load_path, load_routevar
+from synthetic import generate_network
+
+
+def _read(directory):
+    return [(directory / name).read_bytes() for name in ('vars.json', 'stops.json', 'paths.json')]
+
+
+def test_same_seed_same_files(tmp_path):
+    counts = generate_network(str(tmp_path / 'a'), routes=5, stops_per_route=10, seed=3)
+    assert generate_network(str(tmp_path / 'b'), routes=5, stops_per_route=10, seed=3) == counts
+    assert _read(tmp_path / 'a') == _read(tmp_path / 'b')
+    generate_network(str(tmp_path / 'c'), routes=5, stops_per_route=10, seed=4)
+    assert _read(tmp_path / 'a') != _read(tmp_path / 'c')
+
+
+def test_counts_match_loaded_network(tmp_path, registries, graph):
+    # The arguments the network of conftest.py is generated with
+    counts = generate_network(str(tmp_path), routes=20, stops_per_route=15, seed=0)
+    route_vars, stops, paths = registries
+    assert counts == {'routes': 20, 'variants': len(route_vars), 'stops': len(stops),
+                      'edges': graph.number_of_edges()}
+    assert len(paths) == len(route_vars)
+    assert graph.number_of_nodes() == len(stops)
+
+
+def test_overlap_joins_routes(tmp_path):
+    components = []
+    for overlap in (0.0, 1.0):
+        generate_network(str(tmp_path / str(overlap) / 'data'), routes=10, stops_per_route=10, overlap=overlap, seed=0)
+        route_vars, paths = {}, {}
+        load_routevar(route_vars, str(tmp_path / str(overlap) / 'data' / 'vars.json'))
+        load_path(paths, str(tmp_path / str(overlap) / 'data' / 'paths.json'))
+        G = nx.MultiDiGraph()
+        with contextlib.chdir(tmp_path / str(overlap)):
+            build_graph(G, route_vars, paths)
+        components.append(nx.number_weakly_connected_components(G))
+    # Without overlap no two routes share a stop
+    assert components[0] >= 10
+    assert components[1] < components[0]
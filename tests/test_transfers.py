@@ -0,0 +1,39 @@
+import math
+
+import pytest
+
+from convert import Converter
+from graph import TRANSFER_KEY, add_transfer_edges, dijkstra_shortest_path_edge, withdraw_variant
+from spatial import StopIndex
+
+
+def test_pairs_within_matches_brute_force(registries):
+    stop_list = list(registries[1].values())
+    converter = Converter()
+    xy = [converter.convert(stop.get_lng(), stop.get_lat()) for stop in stop_list]
+    expected = sorted((i, j) for i in range(len(xy)) for j in range(i + 1, len(xy))
+                      if math.hypot(xy[i][0] - xy[j][0], xy[i][1] - xy[j][1]) <= 400.0)
+    found = StopIndex(stop_list, cell_size=150.0).pairs_within(400.0)
+    assert [(stop_list.index(a), stop_list.index(b)) for a, b, _ in found] == expected
+
+
+def test_transfer_edges(graph, registries, pairs, reference):
+    stops = registries[1]
+    G = graph.copy()
+    added = add_transfer_edges(G, stops, radius=250.0, walk_speed=1.2, detour=1.3, transfer_time=2.0)
+    walks = [(u, v, data) for u, v, key, data in G.edges(keys=True, data=True) if key == TRANSFER_KEY]
+    assert added == len(walks) > 0
+
+    pairs_within = StopIndex(list(stops.values())).pairs_within(250.0)
+    assert len(walks) == 2 * len(pairs_within)
+    for u, v, data in walks:
+        assert G.has_edge(v, u, TRANSFER_KEY)
+        assert data['Distance'] <= 250.0 * 1.3 + 1e-9
+        assert data['Time'] == pytest.approx(2.0 + data['Distance'] / 1.2 / 60)
+
+    # Walking can only make trips faster
+    for start, end in pairs:
+        assert dijkstra_shortest_path_edge(G, start, end)[1] <= reference(start, end) + 1e-9
+
+    withdraw_variant(G, *TRANSFER_KEY)
+    assert sorted(G.edges(keys=True)) == sorted(graph.edges(keys=True))
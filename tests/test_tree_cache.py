@@ -0,0 +1,49 @@
+import pytest
+
+from graph import add_transfer_edges, dijkstra_shortest_path_edge, withdraw_variant
+from tree_cache import ShortestPathTreeCache
+
+
+@pytest.mark.parametrize('policy', ['lru', 'cost'])
+def test_cached_answers_match_dijkstra(csr, pairs, reference, policy):
+    cache = ShortestPathTreeCache(csr, policy=policy)
+    for _ in range(2):
+        for start, end in pairs:
+            assert dijkstra_shortest_path_edge(csr, start, end, cache=cache) == dijkstra_shortest_path_edge(csr, start, end)
+            assert cache.one_dest_shortest_path(csr, start, end)[1] == pytest.approx(reference(start, end))
+    assert cache.hits > 0
+    assert cache.misses == len({start for start, _ in pairs})
+
+
+def test_memory_cap(csr, pairs):
+    cache = ShortestPathTreeCache(csr)
+    cache.tree(csr, pairs[0][0])
+    cache = ShortestPathTreeCache(csr, max_bytes=cache.nbytes * 3)
+    for start, end in pairs:
+        cache.shortest_path_edge(csr, start, end)
+        assert cache.nbytes <= cache.max_bytes
+
+
+
+def test_other_graph_drops_trees(graph, csr, pairs):
+    cache = ShortestPathTreeCache(csr)
+    cache.tree(csr, pairs[0][0])
+    G = graph.copy()
+    G.remove_edges_from(list(G.edges(keys=True))[::2])
+    for start, end in pairs:
+        assert cache.shortest_path_edge(G, start, end) == dijkstra_shortest_path_edge(G, start, end)
+
+
+def test_in_place_changes_drop_trees(graph, registries, pairs):
+    G = graph.copy()
+    cache = ShortestPathTreeCache(G)
+    for start, end in pairs:
+        cache.shortest_path_edge(G, start, end)
+
+    add_transfer_edges(G, registries[1])
+    for start, end in pairs:
+        assert cache.shortest_path_edge(G, start, end) == dijkstra_shortest_path_edge(G, start, end)
+
+    withdraw_variant(G, *next(key for _, _, key in G.edges(keys=True)))
+    for start, end in pairs:
+        assert cache.shortest_path_edge(G, start, end) == dijkstra_shortest_path_edge(G, start, end)